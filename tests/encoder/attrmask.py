@@ -34,6 +34,14 @@ def test_attrmask_encoder():
     new_model = AttrMaskMolecularEncoder()
     new_model.load_from_local(save_path)
     print("Model loaded successfully")
+
+    # Invalid SMILES get NaN representations instead of raising
+    print("\n=== Testing encoding with invalid SMILES ===")
+    vectors = new_model.encode(molecules[:2] + ["invalid_smiles"] + molecules[2:], return_type="np")
+    assert vectors.shape[0] == len(molecules) + 1
+    assert np.isnan(vectors[2]).all() and not np.isnan(np.delete(vectors, 2, axis=0)).any()
+    assert np.allclose(np.delete(vectors, 2, axis=0), new_model.encode(molecules, return_type="np"), atol=1e-5)
+    print("Invalid SMILES encoded as NaN rows")
     
     # Clean up
     import os
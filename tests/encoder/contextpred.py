@@ -1,5 +1,9 @@
 import numpy as np
+import torch
+import networkx as nx
+from torch_geometric.data import Batch
 from torch_molecule import ContextPredMolecularEncoder
+from torch_molecule.encoder.contextpred.utils import ExtractSubstructureContextPair
 
 def test_contextpred_encoder():
     # Test molecules (simple examples)
@@ -43,5 +47,41 @@ def test_contextpred_encoder():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+def test_batched_extraction():
+    molecules = ["CC(=O)Oc1ccccc1C(=O)O", "CCO", "C", "c1ccccc1CCN(C)CC(=O)NC1CCCCC1", "CCN"]
+    model = ContextPredMolecularEncoder(verbose="none")
+    graphs = model._convert_to_pytorch_data(molecules)
+    batch = Batch.from_data_list(graphs)
+    k, l1, l2 = 2, 1, 4
+    roots = [0, 2, 0, 5, 1]
+    root_idx = batch.ptr[:-1] + torch.tensor(roots)
+    batch = ExtractSubstructureContextPair(k, l1, l2)(batch, root_idx=root_idx)
+
+    # compare the node sets with a shortest path search on each graph
+    kept = 0
+    for graph, root in zip(graphs, roots):
+        G = nx.Graph(graph.edge_index.t().tolist())
+        G.add_nodes_from(range(graph.num_nodes))
+        dist = nx.single_source_shortest_path_length(G, root)
+        substruct = sorted(n for n, d in dist.items() if d <= k)
+        context = sorted(n for n, d in dist.items() if l1 < d <= l2)
+        if not context:
+            continue
+        assert torch.equal(batch.x_substruct[batch.batch_substruct == kept], graph.x[substruct, :2])
+        assert torch.equal(batch.x_context[batch.batch_context == kept], graph.x[context, :2])
+        overlap = [context.index(n) for n in substruct if n in context]
+        offset = int((batch.batch_context < kept).sum())
+        assert sorted((batch.overlap_context_substruct_idx[batch.batch_overlapped_context == kept] - offset).tolist()) == overlap
+        assert batch.overlapped_context_size[kept] == len(overlap)
+        center = batch.center_substruct_idx[kept] - int((batch.batch_substruct < kept).sum())
+        assert center == substruct.index(root)
+        kept += 1
+    assert kept == len(batch.center_substruct_idx) == 3
+    # edges stay within the extracted subgraphs
+    assert (batch.batch_substruct[batch.edge_index_substruct[0]] == batch.batch_substruct[batch.edge_index_substruct[1]]).all()
+    assert batch.edge_index_substruct.size(1) == batch.edge_attr_substruct.size(0)
+    print("Batched substructure/context extraction matches shortest paths")
+
 if __name__ == "__main__":
+    test_batched_extraction()
     test_contextpred_encoder()
\ No newline at end of file
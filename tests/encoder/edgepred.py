@@ -1,5 +1,8 @@
 import numpy as np
+import torch
+from torch_geometric.data import Batch
 from torch_molecule import EdgePredMolecularEncoder
+from torch_molecule.encoder.edgepred.model import sample_negative_edges
 
 def test_edgepred_encoder():
     # Test molecules (simple examples)
@@ -41,5 +44,17 @@ def test_edgepred_encoder():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+    # Negative edge sampling test
+    print("\n=== Testing negative edge sampling ===")
+    batch = Batch.from_data_list(new_model._convert_to_pytorch_data(molecules))
+    negatives = sample_negative_edges(batch.edge_index, batch.batch, num_samples=1000)
+    edges = set(map(tuple, batch.edge_index.t().tolist()))
+    pairs = list(map(tuple, negatives.t().tolist()))
+    assert len(pairs) == len(set(pairs)) and not edges & set(pairs)
+    assert all(u != v and batch.batch[u] == batch.batch[v] for u, v in pairs)
+    half = sample_negative_edges(batch.edge_index, batch.batch, num_samples=batch.num_edges // 2)
+    assert half.size(1) <= batch.num_edges // 2
+    print(f"Sampled {negatives.size(1)} valid negative edges")
+
 if __name__ == "__main__":
     test_edgepred_encoder()
\ No newline at end of file
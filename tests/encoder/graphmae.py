@@ -1,7 +1,9 @@
 import numpy as np
 import csv
 import os
+import torch
 from torch_molecule import GraphMAEMolecularEncoder
+from torch_molecule.encoder.graphmae.dataloader import DataLoaderMaskingPred
 
 EPOCHS = 5
 
@@ -134,7 +136,40 @@ def test_graphmae_with_edge_masking():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+def test_batch_masking():
+    molecules = ["CC(=O)O", "CCO", "CCCC", "c1ccccc1", "CCN", "C"]
+    model = GraphMAEMolecularEncoder(mask_edge=True)
+    dataset = model._convert_to_pytorch_data(molecules)
+    loader = DataLoaderMaskingPred(dataset, batch_size=len(molecules), shuffle=False, mask_rate=0.3, mask_edge=True)
+    batch = next(iter(loader))
+    original_x = torch.cat([data.x for data in dataset])
+    original_edge_attr = torch.cat([data.edge_attr for data in dataset])
+
+    # int(num_atoms * mask_rate + 1) distinct atoms masked per graph
+    masked = batch.masked_atom_indices
+    counts = torch.bincount(batch.batch[masked], minlength=len(molecules))
+    expected = torch.tensor([int(data.num_nodes * 0.3 + 1) for data in dataset])
+    assert torch.equal(counts, expected) and len(masked.unique()) == len(masked)
+    assert torch.equal(batch.mask_node_label, original_x[masked])
+    assert (batch.x[masked, 0] == 118).all() and (batch.x[masked, 1:] == 0).all()
+    unmasked = torch.ones(batch.num_nodes, dtype=torch.bool)
+    unmasked[masked] = False
+    assert torch.equal(batch.x[unmasked], original_x[unmasked])
+    # the dataset is not modified
+    assert torch.equal(torch.cat([data.x for data in dataset]), original_x)
+
+    # every edge touching a masked atom is masked, one label per undirected edge
+    touching = torch.isin(batch.edge_index, masked).any(dim=0)
+    assert (batch.edge_attr[touching, 0] == 4).all()
+    assert torch.equal(batch.edge_attr[~touching], original_edge_attr[~touching])
+    assert torch.equal(batch.connected_edge_indices, torch.nonzero(touching).view(-1)[::2])
+    assert torch.equal(batch.mask_edge_label, original_edge_attr[batch.connected_edge_indices])
+    print("Batched masking is consistent")
+
 if __name__ == "__main__":
+    print("\n=== Testing batched masking ===")
+    test_batch_masking()
+    
     print("=== Testing GraphMAE Encoder (Default Configuration) ===")
     test_graphmae_encoder()
     
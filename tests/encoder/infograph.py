@@ -1,4 +1,5 @@
 import numpy as np
+import torch
 from torch_molecule import InfoGraphMolecularEncoder
 
 def test_infograph_encoder():
@@ -57,5 +58,25 @@ def test_infograph_encoder():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+def test_local_global_loss():
+    from torch_molecule.encoder.infograph.loss_function import (
+        local_global_loss_, get_positive_expectation, get_negative_expectation
+    )
+    torch.manual_seed(0)
+    batch = torch.tensor([0, 0, 0, 1, 1, 2, 2, 2, 2, 3])
+    l_enc = torch.randn(len(batch), 8)
+    g_enc = torch.randn(4, 8)
+
+    # dense node x graph masks
+    pos_mask = torch.nn.functional.one_hot(batch, 4).float()
+    neg_mask = 1 - pos_mask
+    res = l_enc @ g_enc.t()
+    for measure in ['GAN', 'JSD', 'X2', 'KL', 'RKL', 'DV', 'H2', 'W1']:
+        E_pos = get_positive_expectation(res * pos_mask, measure, average=False).sum() / len(batch)
+        E_neg = get_negative_expectation(res * neg_mask, measure, average=False).sum() / (len(batch) * 3)
+        assert torch.allclose(local_global_loss_(l_enc, g_enc, batch, measure), E_neg - E_pos, atol=1e-5), measure
+    print("Local-global loss test passed")
+
 if __name__ == "__main__":
+    test_local_global_loss()
     test_infograph_encoder()
\ No newline at end of file
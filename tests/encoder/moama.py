@@ -1,5 +1,9 @@
 import numpy as np
+import torch
+from rdkit import Chem, DataStructs
+from torch_geometric.data import Batch
 from torch_molecule import MoamaMolecularEncoder
+from torch_molecule.encoder.moama.utils import get_fingerprint_loss, get_mask_indices
 from torch_molecule.utils.search import ParameterType, ParameterSpec
 
 def test_moama_encoder():
@@ -66,6 +70,33 @@ def test_moama_encoder_polymers():
     print(f"Representation shape: {vectors.shape}")
     print(f"Representation for new molecule: {vectors[0]}")
 
+def test_moama_precomputed_motifs():
+    molecules = ["CC(=O)Oc1ccccc1C(=O)O", "CCO", "C", "c1ccccc1CCN(C)CC(=O)NC1CCCCC1", "CCN"]
+    model = MoamaMolecularEncoder(verbose="none")
+    mols = [Chem.MolFromSmiles(smiles) for smiles in molecules]
+    batch = Batch.from_data_list(model._convert_to_pytorch_data(mols, with_motifs=True))
+
+    # masked atoms fill int(num_atoms * mask_rate + 1) atoms per graph
+    for mask_rate in (0.15, 0.5):
+        masked = get_mask_indices(batch, mask_rate)
+        counts = torch.bincount(batch.batch[masked], minlength=len(molecules))
+        expected = torch.tensor([int(mol.GetNumAtoms() * mask_rate + 1) for mol in mols])
+        assert torch.equal(counts, expected) and len(masked.unique()) == len(masked)
+
+    # the batched loss matches the pairwise Tanimoto/cosine loss
+    h_rep = torch.randn(len(molecules), 16)
+    fingerprints = [Chem.RDKFingerprint(mol) for mol in mols]
+    expected = 0
+    for i in range(len(mols)):
+        for j in range(i + 1, len(mols)):
+            finger_sim = DataStructs.FingerprintSimilarity(fingerprints[i], fingerprints[j])
+            emb_sim = (torch.nn.functional.cosine_similarity(h_rep[i], h_rep[j], dim=0) + 1) / 2
+            expected += (finger_sim - emb_sim) ** 2
+    bits = torch.tensor([[int(b) for b in fp.ToBitString()] for fp in fingerprints])
+    assert torch.allclose(get_fingerprint_loss(bits, h_rep), expected, atol=1e-5)
+    print("Precomputed motifs and batched fingerprint loss test passed")
+
 if __name__ == "__main__":
+    test_moama_precomputed_motifs()
     test_moama_encoder_polymers()
     test_moama_encoder()
@@ -125,5 +125,55 @@ def test_graph_ga_generator():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+def test_cached_oracle():
+    from torch_molecule.generator.graph_ga.oracle import Oracle, CachedOracle
+
+    smiles_list = ['CCO', 'c1ccccc1O', 'CC(=O)Oc1ccccc1C(=O)O', 'CCN(CC)CC', 'CC(C)Cc1ccc(cc1)C(C)C(=O)O'] * 4
+    y = np.array([[len(s), s.count('C')] for s in smiles_list], dtype=float)
+    oracle = Oracle(num_task=2).fit(smiles_list, y)
+    mols = [Chem.MolFromSmiles(s) for s in smiles_list]
+
+    cached = CachedOracle(oracle)
+    for target in (np.array([[10.0, 3.0]]), np.array([[20.0, np.nan]])):
+        expected = oracle(mols, target)
+        assert np.allclose(cached(mols, target), expected)
+    # predictions are memoized once per molecule and shared by all targets
+    assert len(cached) == 5
+
+    # custom oracles are memoized per target
+    calls = []
+    def custom_oracle(molecules, target_values):
+        calls.append(len(molecules))
+        return [m.GetNumAtoms() - target_values[0][0] for m in molecules]
+    cached = CachedOracle(custom_oracle)
+    scores = cached(mols, np.array([[3.0]]))
+    assert scores == custom_oracle(mols, np.array([[3.0]]))
+    cached(mols[:3], np.array([[3.0]]))
+    cached(mols[:3], np.array([[4.0]]))
+    assert calls == [5, 20, 3] and len(cached) == 8
+    print("Cached oracle test passed")
+
+def test_worker_pool():
+    smiles_list = [
+        'CC1=CC=C(C=C1)C2=CC(=NN2C3=CC=C(C=C3)S(=O)(=O)N)C(F)(F)F',
+        'CC(=O)Oc1ccccc1C(=O)OCCN(C)C',
+        'CCOC(=O)c1ccc(NC(=O)CCN2CCOCC2)cc1',
+        'COc1ccc(CCNC(=O)c2ccc(Cl)cc2)cc1OC',
+    ] * 10
+    y = np.array([[rdMolDescriptors.CalcExactMolWt(Chem.MolFromSmiles(s))] for s in smiles_list])
+    model = GraphGAMolecularGenerator(num_task=1, population_size=20, offspring_size=10, iteration=2, n_jobs=2)
+    model.fit(smiles_list, y)
+    labels = np.array([[300.0], [350.0], [400.0]])
+    generated = model.generate(labels=labels)
+    assert len(generated) == len(labels)
+    assert all(Chem.MolFromSmiles(s) is not None for s in generated)
+    # the oracle is received by the workers and is not scored in the parent process
+    assert getattr(model, "_cached_oracle", None) is None
+    generated = model.generate(num_samples=3)
+    assert len(generated) == 3
+    print("Worker pool test passed")
+
 if __name__ == "__main__":
+    test_cached_oracle()
+    test_worker_pool()
     test_graph_ga_generator()
\ No newline at end of file
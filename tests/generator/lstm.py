@@ -5,6 +5,7 @@ from tqdm import tqdm
 
 import torch
 from torch_molecule.generator.lstm import LSTMMolecularGenerator
+from torch_molecule.generator.lstm.action_sampler import ActionSampler
 
 # EPOCHS = 1000  # Reduced for faster testing
 EPOCHS = 5
@@ -133,5 +134,34 @@ def test_lstm_generator():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+    # 9. Early-stopping sampling test
+    print("\n=== Testing early-stopping LSTM sampling ===")
+    tokenizer = new_prop_conditional_model.tokenizer
+    class Greedy:
+        # deterministic choice favoring the end token, so that sequences end at different steps
+        def __init__(self, probs):
+            self.probs = probs.clone()
+            self.probs[..., tokenizer.end_idx] *= 3
+        def sample(self):
+            return self.probs.argmax(dim=-1)
+
+    labels = torch.tensor(target_properties, dtype=torch.float, device=new_prop_conditional_model.device)
+    model = new_prop_conditional_model.model
+    with torch.no_grad():
+        actions = []
+        for compact in (True, False):
+            sampler = ActionSampler(max_batch_size=len(labels), max_seq_length=new_prop_conditional_model.max_len,
+                                    device=new_prop_conditional_model.device, distribution_cls=Greedy, compact=compact)
+            actions.append(sampler.sample(model, num_samples=len(labels), target=labels))
+    assert torch.equal(actions[0], actions[1])
+    lengths = []
+    for row in actions[0]:
+        ends = (row == tokenizer.end_idx).nonzero()
+        lengths.append(ends[0, 0].item() if len(ends) else len(row))
+        if len(ends):
+            assert (row[ends[0, 0] + 1:] == tokenizer.pad_idx).all()
+    print("Sampled lengths:", lengths)
+    print("Compacted and full greedy sampling match:", tokenizer.matrix_to_smiles(actions[0])[:2])
+
 if __name__ == "__main__":
     test_lstm_generator()
\ No newline at end of file
@@ -222,5 +222,49 @@ def test_molgpt_generator():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+    # 17. Incremental decoding with the key/value cache
+    print("\n=== Testing KV-cached decoding ===")
+    model = new_combined_conditional_model.model
+    model.eval()
+    device = new_combined_conditional_model.device
+    x = torch.randint(0, model.config.vocab_size, (2, 20), device=device)
+    prop = torch.tensor(target_properties, dtype=torch.float, device=device)
+    scaffold = torch.randint(0, model.config.vocab_size, (2, new_combined_conditional_model.scaffold_maxlen), device=device)
+    with torch.no_grad():
+        full_logits, _ = model(x, prop=prop, scaffold=scaffold)
+        cache = model.new_cache(x.size(0))
+        logits, _ = model(x[:, :1], prop=prop, scaffold=scaffold, cache=cache)
+        step_logits = [logits[:, -1]]
+        for t in range(1, x.size(1)):
+            logits, _ = model(x[:, t:t + 1], prop=prop, scaffold=scaffold, cache=cache)
+            step_logits.append(logits[:, -1])
+    assert torch.allclose(torch.stack(step_logits, dim=1), full_logits, atol=1e-4)
+    context = torch.zeros((2, 1), dtype=torch.long, device=device)
+    torch.manual_seed(0)
+    cached = new_combined_conditional_model.sample(context, 30, prop=prop, scaffold=scaffold)
+    torch.manual_seed(0)
+    uncached = new_combined_conditional_model.sample(context, 30, prop=prop, scaffold=scaffold, use_cache=False)
+    assert torch.equal(cached, uncached)
+    print("Cached and full decoding match")
+
+    # 18. Early-stopping sampling test
+    print("\n=== Testing early-stopping sampling ===")
+    end_token = int(cached[0, 3])
+    expected = cached.clone()
+    for row in expected:
+        ends = (row[1:] == end_token).nonzero()
+        if len(ends):
+            row[ends[0, 0] + 1:] = end_token
+    torch.manual_seed(0)
+    stopped = new_combined_conditional_model.sample(context, 30, prop=prop, scaffold=scaffold, end_token=end_token, compact=False)
+    assert torch.equal(stopped, expected[:, :stopped.size(1)])
+    assert (expected[:, stopped.size(1):] == end_token).all()
+    compacted = new_combined_conditional_model.sample(context, 30, prop=prop, scaffold=scaffold, end_token=end_token)
+    for row in compacted:
+        ends = (row[1:] == end_token).nonzero()
+        if len(ends):
+            assert (row[ends[0, 0] + 1:] == end_token).all()
+    print(f"Stopped after {stopped.size(1)} tokens instead of 31")
+
 if __name__ == "__main__":
     test_molgpt_generator()
\ No newline at end of file
@@ -241,6 +241,29 @@ def test_dir_upload():
         os.remove("test_dir_model.pt")
         print("Cleaned up test_dir_model.pt")
 
+def test_segment_topk_mask():
+    import torch
+    from torch_molecule.predictor.dir.utils import segment_topk_mask
+
+    torch.manual_seed(0)
+    num_edges = [6, 0, 1, 13, 8]
+    segment = torch.repeat_interleave(torch.arange(len(num_edges)), torch.tensor(num_edges))
+    score = torch.randn(segment.size(0))
+    ratio = 0.8
+    mask = segment_topk_mask(score, segment, ratio)
+
+    start = 0
+    for N in num_edges:
+        n_reserve = int(ratio * N)
+        rank = np.argpartition(-score[start:start + N].numpy(), n_reserve) if N > 0 else np.array([], dtype=int)
+        expected = np.zeros(N, dtype=bool)
+        expected[rank[:n_reserve]] = True
+        assert np.array_equal(mask[start:start + N].numpy(), expected)
+        start += N
+    assert segment_topk_mask(score[:0], segment[:0], ratio).numel() == 0
+    print("Segment top-k test passed")
+
 if __name__ == "__main__":
+    test_segment_topk_mask()
     test_dir_predictor()
     # test_dir_upload()
\ No newline at end of file
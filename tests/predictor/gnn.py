@@ -1,5 +1,6 @@
 import numpy as np
 from torch_molecule import GNNMolecularPredictor
+from torch_molecule.utils.checker import MolecularInputChecker
 from torch_molecule.utils.search import ParameterType, ParameterSpec
 
 def test_gnn_predictor():
@@ -85,6 +86,68 @@ def test_gnn_predictor():
     new_model.load_from_local(save_path)
     print("Model loaded successfully")
 
+    # 6. Streaming prediction test
+    print("\n=== Testing streaming prediction ===")
+    stream_smiles = smiles_list + ['invalid_smiles'] + smiles_list[:2]
+    chunks = list(new_model.predict_stream(iter(stream_smiles), chunk_size=3))
+    assert [len(chunk['index']) for chunk in chunks] == [3, 3, 1]
+    index = np.concatenate([chunk['index'] for chunk in chunks])
+    valid = np.concatenate([chunk['valid'] for chunk in chunks])
+    streamed = np.concatenate([chunk['prediction'] for chunk in chunks])
+    assert np.array_equal(index, np.arange(len(stream_smiles)))
+    assert not valid[4] and valid.sum() == len(stream_smiles) - 1
+    assert np.isnan(streamed[4]).all()
+    expected = new_model.predict([s for s, v in zip(stream_smiles, valid) if v])['prediction']
+    assert np.allclose(streamed[valid], expected, atol=1e-5)
+    print(f"Streamed predictions: {streamed.ravel()}")
+
+    # chunks where every SMILES is invalid carry the same outputs as the others
+    stream_smiles = ['invalid_smiles', ''] + smiles_list[:2] + ['invalid_smiles', 'C1CC']
+    chunks = list(new_model.predict_stream(stream_smiles, chunk_size=2))
+    assert [chunk['valid'].any() for chunk in chunks] == [False, True, False]
+    assert all(chunk.keys() == chunks[1].keys() for chunk in chunks)
+    for chunk in (chunks[0], chunks[2]):
+        assert chunk['prediction'].shape == (2, 1) and np.isnan(chunk['prediction']).all()
+
+    # 7. Invalid SMILES handling test
+    print("\n=== Testing invalid SMILES handling ===")
+    mols, valid, error_codes = MolecularInputChecker.validate_smiles_batch(['CC', '', 'invalid_smiles', None])
+    assert valid.tolist() == [True, False, False, False]
+    assert error_codes.tolist() == [
+        MolecularInputChecker.VALID,
+        MolecularInputChecker.EMPTY_SMILES,
+        MolecularInputChecker.INVALID_STRUCTURE,
+        MolecularInputChecker.INVALID_TYPE,
+    ]
+    assert mols[0] is not None and mols[1] is None
+    predictions = new_model.predict(['invalid_smiles'] + smiles_list[3:])['prediction']
+    assert np.isnan(predictions[0]).all()
+    assert np.allclose(predictions[1:], new_model.predict(smiles_list[3:])['prediction'], atol=1e-5)
+    print(f"Predictions with an invalid SMILES: {predictions.ravel()}")
+
+    # 8. Loader settings test
+    print("\n=== Testing data loader settings ===")
+    reference = new_model.predict(smiles_list)['prediction']
+    new_model.set_params(num_workers=2, prefetch_factor=2, persistent_workers=True, pin_memory=False, non_blocking=True)
+    assert new_model._loader_kwargs() == {
+        'num_workers': 2, 'pin_memory': False, 'persistent_workers': True, 'prefetch_factor': 2
+    }
+    assert 'num_workers' not in new_model.get_params()
+    assert np.allclose(new_model.predict(smiles_list)['prediction'], reference, atol=1e-5)
+    new_model.set_params(epochs=1)
+    new_model.fit(smiles_list[:3], properties[:3])
+    print("Fitting and prediction with worker processes completed")
+
+    # runtime settings are also accepted by the constructor
+    runtime_model = GNNMolecularPredictor(num_task=1, n_jobs=2, num_workers=1, pin_memory=True)
+    assert (runtime_model.n_jobs, runtime_model.num_workers, runtime_model.pin_memory) == (2, 1, True)
+    assert 'n_jobs' not in runtime_model.get_params()
+    try:
+        GNNMolecularPredictor(num_task=1, unknown_setting=1)
+        raise AssertionError("Expected a TypeError for an unknown keyword argument")
+    except TypeError:
+        pass
+
     # Clean up
     import os
     if os.path.exists(save_path):
@@ -148,6 +148,12 @@ def test_grea_predictor():
     except Exception as e:
         print(f"Invalid SMILES handled with error: {str(e)}")
 
+    # every chunk of a stream has the keys of predict, even without valid SMILES
+    chunks = list(model.predict_stream(['INVALID_SMILES', 'CC', 'CCO'], chunk_size=1))
+    expected_keys = set(model.predict(['CC']).keys()) | {'index', 'valid'}
+    assert all(set(chunk.keys()) == expected_keys for chunk in chunks)
+    assert np.isnan(chunks[0]['variance']).all() and chunks[0]['node_importance'] == [None]
+
     # 7. Test error handling for invalid search parameters
     print("\n=== Testing invalid search parameters handling ===")
     try:
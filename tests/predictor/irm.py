@@ -188,5 +188,36 @@ def test_irm_gnn_predictor():
         os.remove(save_path)
         print(f"Cleaned up {save_path}")
 
+def test_irm_penalty():
+    from torch_geometric.data import Batch
+    smiles_list = ['CCO', 'c1ccccc1O', 'CC(=O)Oc1ccccc1C(=O)O', 'CCN(CC)CC', 'CCCl', 'C1CCCCC1'] * 5
+    properties = np.random.rand(len(smiles_list), 2)
+    properties[::7, 1] = np.nan
+    environments = [7, 3, 100, 3, 42, 7] * 5
+    model = IRMMolecularPredictor(num_task=2, num_layer=2, hidden_size=32, epochs=1, IRM_environment=environments)
+    model.fit(smiles_list, properties)
+    irm = model.model.eval()
+
+    batch = Batch.from_data_list(model._convert_to_pytorch_data(smiles_list, properties)).to(model.device)
+    batch.environment = torch.tensor(environments, device=model.device).view(-1, 1)
+    criterion = torch.nn.MSELoss(reduction="none")
+    loss, loss_erm, penalty = irm.compute_loss(batch, criterion, scale=1.0, penalty_weight=1.0)
+
+    # one gradient per environment
+    prediction = irm(batch)["prediction"]
+    is_labeled = batch.y == batch.y
+    env = batch.environment.expand(-1, 2)[is_labeled]
+    expected = 0
+    for e in env.unique():
+        dummy = torch.tensor([1.0], device=model.device, requires_grad=True)
+        env_loss = criterion(prediction[is_labeled][env == e] * dummy, batch.y[is_labeled][env == e].float()).mean()
+        expected = expected + torch.autograd.grad(env_loss, dummy)[0].pow(2).sum()
+    assert torch.allclose(penalty, expected, rtol=1e-4)
+    assert torch.allclose(loss, loss_erm + penalty)
+    # the penalty is differentiable
+    penalty.backward()
+    print("IRM penalty test passed")
+
 if __name__ == "__main__":
+    test_irm_penalty()
     test_irm_gnn_predictor()
@@ -92,5 +92,44 @@ def train_rpgnn_predictor():
     if os.path.exists(save_path):
         os.remove(save_path)
 
+def test_stacked_permutations():
+    smiles_list = ['CCO', 'c1ccccc1O', 'CC(=O)Oc1ccccc1C(=O)O', 'CCN(CC)CC', 'C'] * 4
+    properties = np.arange(len(smiles_list), dtype=float)
+    model = RPGNNMolecularPredictor(num_perm=4, fixed_size=5, num_layer=2, hidden_size=32, epochs=1, batch_size=8)
+    model.fit(smiles_list, properties)
+    rpgnn = model.model.eval()
+
+    # every permutation gives the nodes of a graph distinct positions
+    batch = torch.tensor([0, 0, 0, 1, 2, 2, 2, 2, 2, 2, 2])
+    node_ids = rpgnn.permuted_node_ids(batch, 3)
+    assert node_ids.shape == (3, len(batch), 5)
+    for perm_ids in node_ids:
+        for graph in range(3):
+            ids = perm_ids[batch == graph].argmax(dim=1)
+            n = len(ids)
+            assert sorted(ids.tolist()) == sorted((torch.arange(n) % 5).tolist())
+
+    # stacking the permutations into one batch gives the same predictions
+    data = model._convert_to_pytorch_data(smiles_list)
+    from torch_geometric.data import Batch
+    batched_data = Batch.from_data_list(data).to(model.device)
+    with torch.no_grad():
+        torch.manual_seed(0)
+        sequential = rpgnn(batched_data)["prediction"]
+        rpgnn.stack_perm = True
+        torch.manual_seed(0)
+        stacked = rpgnn(batched_data)["prediction"]
+    assert torch.allclose(sequential, stacked, atol=1e-4)
+
+    # the runtime setting reaches the fitted model
+    model.set_params(stack_perm=False)
+    assert rpgnn.stack_perm is False
+    model.set_params(stack_perm=True)
+    assert rpgnn.stack_perm is True and "stack_perm" not in model.get_params()
+    assert model.predict(smiles_list)["prediction"].shape == (len(smiles_list), 1)
+    model.fit(smiles_list, properties)
+    print("Stacked permutation test passed")
+
 if __name__ == "__main__":
+    test_stacked_permutations()
     train_rpgnn_predictor()
\ No newline at end of file
@@ -1,5 +1,12 @@
 import numpy as np
+import torch
 from torch_molecule import SGIRMolecularPredictor
+from torch_molecule.utils import PackedGraphDataset
+from torch_molecule.predictor.sgir.strategy import (
+    PseudoLabelPool,
+    build_selection_dataset,
+    build_augmentation_dataset,
+)
 from torch_molecule.utils.search import ParameterType, ParameterSpec
 import os
 
@@ -95,5 +102,56 @@ def test_sgir_predictor():
     if os.path.exists(save_path):
         os.remove(save_path)
 
+def test_pseudo_label_pool():
+    labeled_smiles = ['CCO', 'c1ccccc1O', 'CC(=O)Oc1ccccc1C(=O)O', 'CCN(CC)CC']
+    unlabeled_smiles = ['CCCC', 'O=C(O)c1ccccc1', 'CCOC(=O)C', 'c1ccncc1', 'CC(C)O', 'CNC(=O)C', 'OCCO', 'CCCl']
+    labeled = PackedGraphDataset.from_smiles(labeled_smiles, [1.0, 2.0, 3.0, 4.0])
+    unlabeled = PackedGraphDataset.from_smiles(unlabeled_smiles)
+    model = SGIRMolecularPredictor(num_layer=2, hidden_size=16, device="cpu")
+    model._initialize_model(model.model_class)
+    model.model.initialize_parameters(seed=0)
+
+    def predict_unlabeled():
+        model.model.eval()
+        with torch.no_grad():
+            return model.model(unlabeled[list(range(len(unlabeled)))])['prediction'].view(-1)
+
+    # the first refresh scores every unlabeled graph
+    pool = PseudoLabelPool(labeled, unlabeled, batch_size=3, refresh_ratio=0.25)
+    pool.refresh(model.model, model.device)
+    assert pool.scored.all()
+    first = pool.prediction.clone()
+    assert torch.allclose(first, predict_unlabeled(), atol=1e-5)
+
+    # later refreshes re-score a rolling window of the unlabeled graphs
+    with torch.no_grad():
+        for param in model.model.parameters():
+            param.add_(0.1)
+    pool.refresh(model.model, model.device)
+    current = predict_unlabeled()
+    assert torch.allclose(pool.prediction[:2], current[:2], atol=1e-5)
+    assert torch.equal(pool.prediction[2:], first[2:])
+    pool.refresh(model.model, model.device)
+    assert torch.allclose(pool.prediction[:4], current[:4], atol=1e-5)
+
+    # selected graphs are pseudo-labeled with bucket centers, labeled graphs keep their targets
+    pool.prediction = torch.linspace(1.0, 4.0, len(unlabeled_smiles))
+    pool.variance = torch.zeros(len(unlabeled_smiles))
+    loader = build_selection_dataset(pool, batch_size=3, num_anchor=3, threshold=1.0)
+    targets = torch.cat([batch.y.view(-1) for batch in loader])
+    num_graphs = sum(batch.num_graphs for batch in loader)
+    assert num_graphs == len(targets) > len(labeled_smiles)
+    values = sorted(targets.tolist())
+    labeled_targets = [1.0, 2.0, 3.0, 4.0]
+    for target in labeled_targets:
+        values.remove(target)
+    assert set(values) <= {1.5, 2.5, 3.5}
+
+    augmented = build_augmentation_dataset(pool, num_anchor=3, device=model.device)
+    assert augmented['representations'].size(1) == pool.labeled_representation.size(1)
+    assert augmented['representations'].size(0) == augmented['labels'].size(0)
+    print(f"Pseudo-label pool test passed ({len(values)} pseudo-labeled graphs)")
+
 if __name__ == "__main__":
+    test_pseudo_label_pool()
     test_sgir_predictor()
\ No newline at end of file
@@ -92,5 +92,56 @@ def train_ssr_predictor():
     if os.path.exists(save_path):
         os.remove(save_path)
 
+def test_batched_coarsening():
+    smiles_list = ['CCO', 'OCC', 'c1ccccc1O', 'CC(=O)Oc1ccccc1C(=O)O', 'CC(=O)Oc1ccccc1C(=O)N', 'CCCCCCCCCO', 'C']
+    model = SSRMolecularPredictor(coarse_ratios=[0.3, 0.5], verbose="none")
+    graphs = model._convert_to_pytorch_data(smiles_list)
+    for g in graphs:
+        for ratio in model.coarse_ratios:
+            postfix = str(int(ratio * 100))
+            num_clusters = max(1, int(g.num_nodes * ratio))
+            clusters = getattr(g, f"clusters_{postfix}")
+            assert clusters.shape == (g.num_nodes,)
+            if num_clusters < g.num_nodes - 1:
+                # every cluster is used
+                assert torch.equal(torch.unique(clusters), torch.arange(num_clusters))
+            # one pair of opposite edges per pair of connected clusters, with mean attributes
+            expected = {}
+            for (u, v), attr in zip(g.edge_index.t().tolist(), g.edge_attr.float()):
+                cu, cv = int(clusters[u]), int(clusters[v])
+                if cu != cv:
+                    expected.setdefault((min(cu, cv), max(cu, cv)), []).append(attr)
+            coarse_edge_index = getattr(g, f"coarsened_edge_index_{postfix}")
+            coarse_edge_attr = getattr(g, f"coarsened_edge_attr_{postfix}")
+            assert coarse_edge_index.size(1) == 2 * len(expected) == coarse_edge_attr.size(0)
+            for (cu, cv), attr in zip(coarse_edge_index.t().tolist(), coarse_edge_attr):
+                assert torch.allclose(attr, torch.stack(expected[(min(cu, cv), max(cu, cv))]).mean(dim=0))
+
+    # the single-graph method agrees with the batched conversion
+    g = graphs[3]
+    edge_index, edge_attr, clusters = model.spectral_graph_coarsening(g, max(1, int(g.num_nodes * 0.5)))
+    assert torch.equal(clusters, g.clusters_50) and torch.equal(edge_index, g.coarsened_edge_index_50)
+
+    # coarsening results are reused for molecules already seen
+    cache_size = len(model._coarsening_cache)
+    model._convert_to_pytorch_data(smiles_list[:3])
+    assert len(model._coarsening_cache) == cache_size
+
+    # the cache keeps at most coarsening_cache_size graphs, evicting the least recently used
+    model.set_params(coarsening_cache_size=4)
+    bounded = model._convert_to_pytorch_data(smiles_list)
+    assert len(model._coarsening_cache) == 4
+    [phenol] = model._convert_to_pytorch_data(smiles_list[2:3])
+    assert list(model._coarsening_cache)[-1] == (model._coarsening_key(phenol), max(1, int(phenol.num_nodes * 0.5)))
+    uncached_model = SSRMolecularPredictor(coarse_ratios=[0.3, 0.5], coarsening_cache_size=0)
+    uncached = uncached_model._convert_to_pytorch_data(smiles_list)
+    assert len(uncached_model._coarsening_cache) == 0
+    for g, expected_g in zip(bounded, uncached):
+        assert torch.equal(g.clusters_30, expected_g.clusters_30)
+        assert torch.equal(g.coarsened_edge_index_50, expected_g.coarsened_edge_index_50)
+    assert "coarsening_cache_size" not in model.get_params()
+    print("Batched coarsening test passed")
+
 if __name__ == "__main__":
+    test_batched_coarsening()
     train_ssr_predictor()
\ No newline at end of file
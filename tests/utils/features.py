@@ -0,0 +1,57 @@
+import numpy as np
+from rdkit import Chem
+from torch_molecule.utils.graph.features import (
+    atom_to_feature_vector,
+    bond_to_feature_vector,
+    mol_to_feature_arrays,
+    mols_to_feature_arrays,
+)
+
+SMILES_LIST = [
+    'CNC[C@H]1OCc2cnnn2CCCC(=O)N([C@H](C)CO)C[C@@H]1C',
+    'CC1=CC=C(C=C1)C2=CC(=NN2C3=CC=C(C=C3)S(=O)(=O)N)C(F)(F)F',
+    'Cl[C@H](/C=C/C)Br',
+    '[Na+].[Cl-]',
+    '*CC(*)c1ccccc1',
+    '[CH2]C',
+    '[Fe+6]',
+    'F[P-](F)(F)(F)(F)F',
+    'C',
+    '[2H]C([2H])([2H])[Og]',
+    'C[N+](C)(C)C.[O-]C(=O)c1ccccc1',
+]
+
+def reference_arrays(mol):
+    x = np.array([atom_to_feature_vector(atom) for atom in mol.GetAtoms()], dtype=np.int64)
+    edges, edge_feats = [], []
+    for bond in mol.GetBonds():
+        i, j = bond.GetBeginAtomIdx(), bond.GetEndAtomIdx()
+        feat = bond_to_feature_vector(bond)
+        edges += [(i, j), (j, i)]
+        edge_feats += [feat, feat]
+    if edges:
+        edge_index = np.array(edges, dtype=np.int64).T
+        edge_attr = np.array(edge_feats, dtype=np.int64)
+    else:
+        edge_index = np.empty((2, 0), dtype=np.int64)
+        edge_attr = np.empty((0, 3), dtype=np.int64)
+    return x, edge_index, edge_attr
+
+def test_vectorized_features():
+    mols = [Chem.MolFromSmiles(smiles) for smiles in SMILES_LIST]
+    references = [reference_arrays(mol) for mol in mols]
+    for mol, reference in zip(mols, references):
+        for array, expected in zip(mol_to_feature_arrays(mol), reference):
+            assert array.dtype == expected.dtype
+            np.testing.assert_array_equal(array, expected)
+
+    node_feat, edge_index, edge_feat, num_nodes, num_edges = mols_to_feature_arrays(mols)
+    np.testing.assert_array_equal(node_feat, np.concatenate([ref[0] for ref in references]))
+    np.testing.assert_array_equal(edge_index, np.concatenate([ref[1] for ref in references], axis=1))
+    np.testing.assert_array_equal(edge_feat, np.concatenate([ref[2] for ref in references]))
+    np.testing.assert_array_equal(num_nodes, [mol.GetNumAtoms() for mol in mols])
+    np.testing.assert_array_equal(num_edges, [2 * mol.GetNumBonds() for mol in mols])
+    print("Vectorized feature test passed")
+
+if __name__ == "__main__":
+    test_vectorized_features()
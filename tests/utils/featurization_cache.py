@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+import numpy as np
+from unittest.mock import patch
+from rdkit import Chem
+from torch_molecule.utils import graph_from_smiles, FeaturizationCache
+
+SMILES_LIST = [
+    'CNC[C@H]1OCc2cnnn2CCCC(=O)N([C@H](C)CO)C[C@@H]1C',
+    'CC1=CC=C(C=C1)C2=CC(=NN2C3=CC=C(C=C3)S(=O)(=O)N)C(F)(F)F',
+    'C',
+    '[Na+].[Cl-]',
+]
+
+def test_featurization_cache():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = FeaturizationCache(cache_dir)
+        for smiles in SMILES_LIST:
+            expected = graph_from_smiles(smiles, [1.0], ["morgan", "maccs"], ["logP"], cache=False)
+            first = graph_from_smiles(smiles, [1.0], ["morgan", "maccs"], ["logP"], cache=cache)
+            # a cache hit must not featurize the molecule again
+            with patch("torch_molecule.utils.graph.graph_from_smiles.featurize_mol") as featurize:
+                second = graph_from_smiles(smiles, [1.0], ["morgan", "maccs"], ["logP"], cache=cache)
+                featurize.assert_not_called()
+            for graph in (first, second):
+                assert graph.keys() == expected.keys()
+                for key, value in expected.items():
+                    if isinstance(value, np.ndarray):
+                        assert graph[key].dtype == value.dtype
+                        np.testing.assert_array_equal(graph[key], value)
+                    else:
+                        assert graph[key] == value
+        assert cache.hits == len(SMILES_LIST)
+        assert len(cache) == len(SMILES_LIST)
+
+        # a hit on a SMILES string does not parse it
+        with patch("torch_molecule.utils.graph.graph_from_smiles.to_mol") as parse:
+            graph_from_smiles(SMILES_LIST[0], [1.0], ["morgan", "maccs"], ["logP"], cache=cache)
+            parse.assert_not_called()
+
+        # other atom orders of a cached molecule keep their own atom order
+        for inputs in (["CCO", "OCC"], [Chem.MolFromSmiles("CCO"), Chem.MolFromSmiles("OCC")]):
+            for smiles_or_mol in inputs:
+                expected = graph_from_smiles(smiles_or_mol, None, cache=False)
+                graph = graph_from_smiles(smiles_or_mol, None, cache=cache)
+                np.testing.assert_array_equal(graph["node_feat"], expected["node_feat"])
+                np.testing.assert_array_equal(graph["edge_index"], expected["edge_index"])
+        num_entries = len(cache)
+        graph_from_smiles(Chem.MolFromSmiles("OCC"), None, cache=cache)
+        assert len(cache) == num_entries
+
+        # a different feature set is a different entry
+        graph_from_smiles(SMILES_LIST[0], None, ["morgan"], cache=cache)
+        assert len(cache) == num_entries + 1
+
+        # least recently used entries are evicted once the size budget is exceeded
+        small_cache = FeaturizationCache(cache_dir + "/small", max_size_mb=0.006)
+        for smiles in SMILES_LIST:
+            graph_from_smiles(smiles, None, ["morgan", "maccs"], cache=small_cache)
+        assert 0 < len(small_cache) < len(SMILES_LIST)
+        print("Featurization cache test passed")
+    finally:
+        shutil.rmtree(cache_dir)
+
+if __name__ == "__main__":
+    test_featurization_cache()
@@ -0,0 +1,58 @@
+import numpy as np
+import torch
+from rdkit import Chem
+from rdkit.Chem import AllChem
+from torch_molecule.utils import graph_from_smiles, graphs_from_smiles
+from torch_molecule.utils.graph.fingerprints import fingerprint_matrix, unpack_fingerprints, FINGERPRINT_NUM_BITS
+
+SMILES_LIST = [
+    'CNC[C@H]1OCc2cnnn2CCCC(=O)N([C@H](C)CO)C[C@@H]1C',
+    'CC1=CC=C(C=C1)C2=CC(=NN2C3=CC=C(C=C3)S(=O)(=O)N)C(F)(F)F',
+    'C',
+    '[Na+].[Cl-]',
+    'c1ccccc1O',
+] * 10
+
+def assert_graph_equal(graph, expected):
+    assert graph.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, np.ndarray):
+            assert graph[key].dtype == value.dtype, key
+            np.testing.assert_array_equal(graph[key], value)
+        else:
+            assert graph[key] == value, key
+
+def test_parallel_featurization():
+    mols = [Chem.MolFromSmiles(smiles) for smiles in SMILES_LIST]
+    y = np.random.rand(len(mols), 2).astype(np.float32)
+    expected = [graph_from_smiles(mol, y[i], ["morgan", "maccs"], cache=False) for i, mol in enumerate(mols)]
+
+    for n_jobs in (1, 2):
+        graphs = graphs_from_smiles(mols, y, ["morgan", "maccs"], n_jobs=n_jobs, chunk_size=7, cache=False)
+        assert len(graphs) == len(expected)
+        for graph, expected_graph in zip(graphs, expected):
+            assert_graph_equal(graph, expected_graph)
+    print("Parallel featurization test passed")
+
+def test_fingerprints():
+    mols = [Chem.MolFromSmiles(smiles) for smiles in SMILES_LIST[:5]]
+    expected = {
+        "morgan": np.array([list(AllChem.GetMorganFingerprintAsBitVect(mol, 2, nBits=1024)) for mol in mols]),
+        "maccs": np.array([[int(b) for b in AllChem.GetMACCSKeysFingerprint(mol).ToBitString()] for mol in mols]),
+        "rdkit": np.array([[int(b) for b in Chem.RDKFingerprint(mol).ToBitString()] for mol in mols]),
+    }
+    for kind, bits in expected.items():
+        np.testing.assert_array_equal(fingerprint_matrix(mols, kind, packed=False), bits)
+        packed = fingerprint_matrix(mols + [None], kind)
+        assert packed.dtype == np.uint8 and packed.shape == (len(mols) + 1, (FINGERPRINT_NUM_BITS[kind] + 7) // 8)
+        assert not packed[-1].any()
+        unpacked = unpack_fingerprints(torch.from_numpy(packed), FINGERPRINT_NUM_BITS[kind])
+        np.testing.assert_array_equal(unpacked[:-1].numpy(), bits)
+        if kind != "rdkit":
+            graph = graph_from_smiles(mols[0], None, [kind], cache=False)
+            np.testing.assert_array_equal(graph[kind], packed[:1])
+    print("Fingerprint test passed")
+
+if __name__ == "__main__":
+    test_parallel_featurization()
+    test_fingerprints()
@@ -0,0 +1,77 @@
+import numpy as np
+import torch
+from rdkit import Chem
+from torch_molecule.utils import graph_to_smiles
+from torch_molecule.utils.graph.graph_to_smiles import (
+    ATOM_VALENCY,
+    bond_dict,
+    build_molecule_with_partial_charges,
+    check_valency,
+)
+
+ATOM_DECODER = ['C', 'N', 'O', 'F', 'P', 'S', 'Cl', 'Br', 'I', 'B']
+
+def build_molecule_reference(atom_types, edge_types, atom_decoder):
+    """Sanitize after every bond, as done before valences were tracked."""
+    mol = Chem.RWMol()
+    for atom in atom_types:
+        mol.AddAtom(Chem.Atom(atom_decoder[atom.item()]))
+    edge_types = torch.triu(edge_types)
+    for bond in torch.nonzero(edge_types):
+        if bond[0].item() == bond[1].item():
+            continue
+        mol.AddBond(bond[0].item(), bond[1].item(), bond_dict[edge_types[bond[0], bond[1]].item()])
+        flag, atomid_valence = check_valency(mol)
+        if not flag and len(atomid_valence) == 2:
+            idx, v = atomid_valence
+            an = mol.GetAtomWithIdx(idx).GetAtomicNum()
+            if an in (7, 8, 16) and (v - ATOM_VALENCY[an]) == 1:
+                mol.GetAtomWithIdx(idx).SetFormalCharge(1)
+    return mol
+
+def random_graphs(num_graphs, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    graphs = []
+    for _ in range(num_graphs):
+        n = int(torch.randint(1, 15, (1,), generator=generator))
+        atom_types = torch.randint(0, len(ATOM_DECODER), (n,), generator=generator)
+        # mostly carbon, nitrogen and oxygen, with sparse random bonds
+        atom_types[torch.rand(n, generator=generator) < 0.6] = torch.randint(0, 3, (1,), generator=generator)
+        edge_types = torch.randint(1, 5, (n, n), generator=generator)
+        edge_types[torch.rand(n, n, generator=generator) > 0.35] = 0
+        edge_types = torch.triu(edge_types, diagonal=1)
+        graphs.append((atom_types, edge_types + edge_types.t()))
+    return graphs
+
+def test_incremental_valence():
+    graphs = random_graphs(500)
+    num_charged = 0
+    for atom_types, edge_types in graphs:
+        mol = build_molecule_with_partial_charges(atom_types, edge_types, ATOM_DECODER)
+        expected = build_molecule_reference(atom_types, edge_types, ATOM_DECODER)
+        assert Chem.MolToSmiles(mol, canonical=False) == Chem.MolToSmiles(expected, canonical=False)
+        charges = [atom.GetFormalCharge() for atom in mol.GetAtoms()]
+        assert charges == [atom.GetFormalCharge() for atom in expected.GetAtoms()]
+        num_charged += sum(charges)
+    # the random graphs exercise the charge adjustment
+    assert num_charged > 0
+    # numpy inputs give the same molecule
+    atom_types, edge_types = graphs[0]
+    mol = build_molecule_with_partial_charges(atom_types.numpy(), edge_types.numpy(), ATOM_DECODER)
+    assert Chem.MolToSmiles(mol) == Chem.MolToSmiles(
+        build_molecule_with_partial_charges(atom_types, edge_types, ATOM_DECODER)
+    )
+    print(f"Incremental valence test passed ({num_charged} charged atoms)")
+
+def test_parallel_decoding():
+    graphs = random_graphs(200, seed=1)
+    expected = graph_to_smiles(graphs, ATOM_DECODER)
+    assert len(expected) == len(graphs)
+    assert any(smiles is not None for smiles in expected)
+    for n_jobs, chunk_size in ((2, None), (3, 7)):
+        assert graph_to_smiles(graphs, ATOM_DECODER, n_jobs=n_jobs, chunk_size=chunk_size) == expected
+    print("Parallel decoding test passed")
+
+if __name__ == "__main__":
+    test_incremental_valence()
+    test_parallel_decoding()
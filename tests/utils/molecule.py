@@ -0,0 +1,85 @@
+import pickle
+import shutil
+import tempfile
+import numpy as np
+from unittest.mock import patch
+from rdkit import Chem
+
+from torch_molecule import GNNMolecularPredictor, GraphGAMolecularGenerator
+from torch_molecule.utils import (
+    MoleculeHandle, FeaturizationCache, graph_from_smiles, graphs_from_smiles, set_featurization_cache
+)
+from torch_molecule.utils.checker import MolecularInputChecker
+
+SMILES_LIST = ['OCC', 'c1ccccc1O', 'CC(=O)Oc1ccccc1C(=O)O', 'CCN(CC)CC', 'O=C(O)c1ccccc1', 'CCCC']
+
+def test_molecule_handle():
+    handle = MoleculeHandle('OCC')
+    assert handle == 'OCC' and isinstance(handle, str)
+    assert handle.mol is handle.mol
+    assert handle.canonical_smiles == 'CCO'
+    restored = pickle.loads(pickle.dumps(handle))
+    assert isinstance(restored, MoleculeHandle) and restored._mol is not None
+    assert MoleculeHandle('invalid_smiles').mol is None
+
+    # validation returns handles that do not hold the molecules parsed for validation
+    handles, _ = MolecularInputChecker.validate_inputs(SMILES_LIST, return_rdkit_mol=False)
+    assert all(isinstance(h, MoleculeHandle) and h._mol is None for h in handles)
+
+    # a handle holding its molecule is featurized without parsing
+    handle = MoleculeHandle(SMILES_LIST[2], Chem.MolFromSmiles(SMILES_LIST[2]))
+    with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+        graph = graph_from_smiles(handle, None)
+        assert parse.call_count == 0
+    np.testing.assert_array_equal(graph["node_feat"], graph_from_smiles(SMILES_LIST[2], None)["node_feat"])
+
+    # each molecule is parsed exactly once per fit and per predict call
+    model = GNNMolecularPredictor(num_task=1, epochs=1, batch_size=3)
+    with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+        model.fit(SMILES_LIST, np.random.rand(len(SMILES_LIST)))
+        assert parse.call_count == len(SMILES_LIST)
+    with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+        model.predict(SMILES_LIST)
+        assert parse.call_count == len(SMILES_LIST)
+
+    # the same holds with a featurization cache, whose keys do not need parsing
+    cache_dir = tempfile.mkdtemp()
+    try:
+        with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+            for _ in range(2):
+                graphs = graphs_from_smiles(SMILES_LIST, None, cache=FeaturizationCache(cache_dir))
+            assert parse.call_count == len(SMILES_LIST)
+        assert len(graphs) == len(SMILES_LIST)
+
+        # with a warm cache, fit and predict skip RDKit for the cached SMILES
+        set_featurization_cache(FeaturizationCache(cache_dir + "/estimator"))
+        model = GNNMolecularPredictor(num_task=1, epochs=1, batch_size=3)
+        with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+            model.fit(SMILES_LIST, np.random.rand(len(SMILES_LIST)))
+            assert parse.call_count == len(SMILES_LIST)
+        with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+            model.fit(SMILES_LIST, np.random.rand(len(SMILES_LIST)))
+            warm = model.predict(SMILES_LIST)["prediction"]
+            assert parse.call_count == 0
+        # SMILES strings that are not cached are still validated
+        with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+            valid = model.predict(SMILES_LIST + ['invalid_smiles'])["prediction"]
+            assert parse.call_count == 1
+        assert np.isnan(valid[-1]).all() and not np.isnan(valid[:-1]).any()
+        # cached graphs give the same predictions as featurizing again
+        set_featurization_cache(None)
+        np.testing.assert_allclose(model.predict(SMILES_LIST)["prediction"], warm, atol=1e-5)
+    finally:
+        set_featurization_cache(None)
+        shutil.rmtree(cache_dir)
+
+    # GraphGA keeps its training molecules as plain strings
+    generator = GraphGAMolecularGenerator(num_task=1)
+    with patch("rdkit.Chem.MolFromSmiles", wraps=Chem.MolFromSmiles) as parse:
+        generator.fit(SMILES_LIST, np.random.rand(len(SMILES_LIST)))
+        assert parse.call_count == len(SMILES_LIST)
+    assert all(type(smiles) is str for smiles in generator.X_train)
+    print("Each molecule is parsed once per call")
+
+if __name__ == "__main__":
+    test_molecule_handle()
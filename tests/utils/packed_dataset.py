@@ -0,0 +1,125 @@
+import shutil
+import pickle
+import tempfile
+import numpy as np
+import torch
+from torch_geometric.loader import DataLoader
+
+from torch_molecule import GNNMolecularPredictor
+from torch_molecule.utils import PackedGraphDataset
+from torch_molecule.utils.graph.packed_dataset import _ConcatPackedGraphDataset
+
+SMILES_LIST = [
+    'CNC[C@H]1OCc2cnnn2CCCC(=O)N([C@H](C)CO)C[C@@H]1C',
+    'CC1=CC=C(C=C1)C2=CC(=NN2C3=CC=C(C=C3)S(=O)(=O)N)C(F)(F)F',
+    'C',
+    '[Na+].[Cl-]',
+    'c1ccccc1O',
+    'CC(=O)Oc1ccccc1C(=O)O',
+    'CCN(CC)CC',
+    'O=C(O)c1ccccc1',
+]
+Y = np.arange(len(SMILES_LIST), dtype=np.float32).reshape(-1, 1)
+
+def _assert_batches_equal(batch, expected):
+    for key in ("x", "edge_index", "edge_attr", "y", "batch", "ptr", "morgan", "maccs"):
+        assert batch[key].dtype == expected[key].dtype, key
+        assert torch.equal(batch[key], expected[key]), key
+    assert batch.num_graphs == expected.num_graphs
+
+def test_packed_dataset():
+    model = GNNMolecularPredictor(num_task=1, augmented_feature=["morgan", "maccs"])
+    reference = model._convert_to_pytorch_data(SMILES_LIST, Y)
+    dataset = PackedGraphDataset.from_smiles(SMILES_LIST, Y, ["morgan", "maccs"], chunk_size=3)
+    assert len(dataset) == len(SMILES_LIST)
+
+    # batches collated from the packed arrays match collating Data objects
+    indices = [5, 0, 3, 2]
+    expected = next(iter(DataLoader([reference[i] for i in indices], batch_size=len(indices))))
+    _assert_batches_equal(dataset[indices], expected)
+    expected = next(iter(DataLoader(reference, batch_size=len(reference))))
+    _assert_batches_equal(dataset[list(range(len(dataset)))], expected)
+    for i, graph in enumerate(reference):
+        assert torch.equal(dataset[i].x, graph.x)
+        assert torch.equal(dataset[i].edge_index, graph.edge_index)
+
+    # memory-mapped round trip
+    path = tempfile.mkdtemp()
+    try:
+        dataset.save(path)
+        loaded = PackedGraphDataset.load(path)
+        assert isinstance(loaded.node_feat, np.memmap)
+        _assert_batches_equal(loaded[indices], dataset[indices])
+        restored = pickle.loads(pickle.dumps(loaded))
+        assert isinstance(restored.node_feat, np.memmap)
+        _assert_batches_equal(restored[indices], dataset[indices])
+
+        # estimators accept packed datasets in fit and predict
+        model = GNNMolecularPredictor(
+            num_task=1, augmented_feature=["morgan", "maccs"], epochs=2, batch_size=4, verbose="none"
+        )
+        model.fit(loaded)
+        packed_prediction = model.predict(loaded)["prediction"]
+        smiles_prediction = model.predict(SMILES_LIST)["prediction"]
+        assert packed_prediction.shape == (len(SMILES_LIST), 1)
+        np.testing.assert_allclose(packed_prediction, smiles_prediction, rtol=1e-5, atol=1e-5)
+        print("Packed and SMILES predictions match:", packed_prediction[:3].ravel())
+
+        # fingerprints requested by the model must be stored in the dataset
+        try:
+            GNNMolecularPredictor(num_task=1, augmented_feature=["morgan"], epochs=1).fit(
+                PackedGraphDataset.from_smiles(SMILES_LIST, Y)
+            )
+            raise AssertionError("Expected a ValueError for missing augmented features")
+        except ValueError:
+            pass
+
+        # targets are required for SMILES inputs
+        try:
+            GNNMolecularPredictor(num_task=1, epochs=1).fit(SMILES_LIST)
+            raise AssertionError("Expected a ValueError for missing targets")
+        except ValueError:
+            pass
+    finally:
+        shutil.rmtree(path)
+
+def test_concat():
+    dataset = PackedGraphDataset.from_smiles(SMILES_LIST, Y, ["morgan"])
+    parts = [PackedGraphDataset.from_smiles(SMILES_LIST[:3], Y[:3], ["morgan"]),
+             PackedGraphDataset.from_smiles(SMILES_LIST[3:], Y[3:], ["morgan"])]
+    path = tempfile.mkdtemp()
+    try:
+        parts[1].save(path)
+        parts[1] = PackedGraphDataset.load(path)
+        combined = _ConcatPackedGraphDataset(parts)
+        assert len(combined) == len(dataset)
+        # the graph arrays are read from the memory-mapped dataset, not copied
+        assert combined.datasets[1].node_feat is parts[1].node_feat
+        np.testing.assert_array_equal(combined.num_nodes, dataset.num_nodes)
+
+        # graphs of several datasets are collated in the order of the indices
+        indices = [7, 1, 3, 4, 0]
+        expected = dataset[indices]
+        for batch in (combined[indices], pickle.loads(pickle.dumps(combined))[indices]):
+            for key in ("x", "edge_index", "edge_attr", "y", "batch", "ptr", "morgan"):
+                assert torch.equal(batch[key], expected[key]), key
+        assert torch.equal(combined[5].x, dataset[5].x)
+
+        # targets are replaced without touching the graphs
+        relabeled = combined.with_targets(-Y)
+        assert torch.equal(relabeled[indices].y, torch.from_numpy(-Y[indices]))
+        assert torch.equal(relabeled[6].y, torch.from_numpy(-Y[6:7]))
+        batches = list(relabeled.loader(batch_size=3, shuffle=True))
+        assert sum(batch.num_graphs for batch in batches) == len(dataset)
+    finally:
+        shutil.rmtree(path)
+    try:
+        _ConcatPackedGraphDataset([parts[0], PackedGraphDataset.from_smiles(SMILES_LIST[3:], Y[3:])])
+        raise AssertionError("Expected a ValueError for different augmented features")
+    except ValueError:
+        pass
+    print("Concatenated datasets match")
+
+if __name__ == "__main__":
+    test_packed_dataset()
+    test_concat()
@@ -0,0 +1,70 @@
+import numpy as np
+
+from torch_molecule import GNNMolecularPredictor, LSTMMolecularPredictor, DigressMolecularGenerator
+from torch_molecule.utils import BucketBatchSampler, PackedGraphDataset
+
+SMILES_LIST = [
+    'CNC[C@H]1OCc2cnnn2CCCC(=O)N([C@H](C)CO)C[C@@H]1C',
+    'CC1=CC=C(C=C1)C2=CC(=NN2C3=CC=C(C=C3)S(=O)(=O)N)C(F)(F)F',
+    'C',
+    'CCO',
+    'c1ccccc1O',
+    'CC(=O)Oc1ccccc1C(=O)O',
+    'CCN(CC)CC',
+    'O=C(O)c1ccccc1',
+]
+Y = np.arange(len(SMILES_LIST), dtype=np.float32).reshape(-1, 1)
+
+def test_bucket_batch_sampler():
+    sizes = np.random.RandomState(0).randint(1, 40, size=200)
+
+    # every index is visited once and the budgets hold
+    for padded in (False, True):
+        for shuffle in (False, True):
+            sampler = BucketBatchSampler(sizes, batch_size=16, max_size=120, padded=padded, shuffle=shuffle, seed=0)
+            batches = list(sampler)
+            assert sorted(np.concatenate(batches).tolist()) == list(range(len(sizes)))
+            for batch in batches:
+                assert len(batch) <= 16
+                cost = len(batch) * sizes[batch].max() if padded else sizes[batch].sum()
+                assert cost <= 120 or len(batch) == 1
+    print("Budgets respected")
+
+    # without shuffling batches are sorted by size and stable
+    sampler = BucketBatchSampler(sizes, batch_size=16)
+    assert np.array_equal(sampler.order(), np.argsort(sizes, kind="stable"))
+    assert [list(b) for b in sampler] == [list(b) for b in sampler]
+    assert len(sampler) == len(list(sampler))
+
+    # shuffled epochs differ and __len__ matches the next epoch
+    sampler = BucketBatchSampler(sizes, max_size=100, shuffle=True, seed=0)
+    n_batches = len(sampler)
+    first = list(sampler)
+    assert len(first) == n_batches
+    assert first != list(sampler)
+
+    # predictions with bucketed batches keep the input order
+    model = GNNMolecularPredictor(num_task=1, epochs=2, batch_size=3, verbose="none")
+    model.fit(SMILES_LIST, Y)
+    expected = model.predict(SMILES_LIST)["prediction"]
+    model.set_params(max_batch_tokens=60)
+    np.testing.assert_allclose(model.predict(SMILES_LIST)["prediction"], expected, rtol=1e-5, atol=1e-5)
+    packed = PackedGraphDataset.from_smiles(SMILES_LIST, Y)
+    np.testing.assert_allclose(model.predict(packed)["prediction"], expected, rtol=1e-5, atol=1e-5)
+    model.fit(SMILES_LIST, Y)
+    print("GNN predictions with bucketing match")
+
+    model = LSTMMolecularPredictor(num_task=1, epochs=1, batch_size=3, verbose="none")
+    model.fit(SMILES_LIST, Y)
+    expected = model.predict(SMILES_LIST)["prediction"]
+    model.set_params(bucket_batches=True)
+    np.testing.assert_allclose(model.predict(SMILES_LIST)["prediction"], expected, rtol=1e-5, atol=1e-5)
+    print("LSTM predictions with bucketing match")
+
+    model = DigressMolecularGenerator(epochs=1, batch_size=3, verbose="none")
+    model.set_params(max_batch_tokens=40)
+    model.fit(SMILES_LIST)
+    print("Generated with bucketed training:", model.generate(batch_size=2))
+
+if __name__ == "__main__":
+    test_bucket_batch_sampler()
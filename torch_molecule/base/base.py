@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Optional, Dict, List, Type, Any, Union, Tuple
+from typing import Optional, Dict, List, Type, Any, Union, Tuple, Sequence
 import torch
 import os
+import warnings
 import numpy as np
+from rdkit import Chem
 from ..utils.checkpoint import LocalCheckpointManager, HuggingFaceCheckpointManager
 from ..utils.checker import MolecularInputChecker
+from ..utils.molecule import MoleculeHandle
+from ..utils.generic.sampler import BucketBatchSampler
 
 class BaseModel(ABC):
     """Base class for molecular models with shared functionality.
@@ -22,6 +26,9 @@ class BaseModel(ABC):
         String identifier for the model name which can be specified by the user.
     verbose : str, default="none"
         Whether to display progress info. Options are: "none", "progress_bar", "print_statement". If any other, "none" is automatically chosen.
+    **runtime_params
+        Initial values of the runtime settings listed below (e.g. ``n_jobs=8``,
+        ``num_workers=4``). Subclasses accept them as keyword arguments as well.
         
     Attributes
     ----------
@@ -31,8 +38,43 @@ class BaseModel(ABC):
         The fitted model instance if the model has been trained, None otherwise.
     is_fitted_ : bool
         Whether the model has been fitted/trained. False by default.
+    n_jobs : int
+        Number of processes used to convert molecules to graphs (and generated graphs
+        back to SMILES). -1 means using all processors. Defaults to 1. It is a runtime setting that can be passed to the
+        constructor or changed with ``set_params``, and is not saved with the model checkpoint.
+    num_workers : int
+        Number of worker processes used by the data loaders to collate batches, so
+        that collation overlaps with model computation. 0 collates in the main
+        process. Defaults to 0. Like the other loader settings below, it is a runtime
+        setting that can be passed to the constructor or changed with ``set_params``.
+    pin_memory : bool
+        Whether the data loaders copy batches into pinned (page-locked) memory, which
+        speeds up host-to-GPU transfers. Defaults to False.
+    prefetch_factor : int or None
+        Number of batches loaded in advance by each worker. Only used when
+        ``num_workers > 0``; None uses the PyTorch default. Defaults to None.
+    persistent_workers : bool
+        Whether the loader workers are kept alive between epochs instead of being
+        restarted. Only used when ``num_workers > 0``. Defaults to False.
+    non_blocking : bool
+        Whether batches are moved to ``device`` asynchronously. Most useful together
+        with ``pin_memory=True``. Defaults to False.
+    bucket_batches : bool
+        Whether the data loaders of models that support it form batches of molecules
+        of similar size (atoms for graph models, tokens for SMILES models) to reduce
+        padding. Outputs of ``predict`` keep the input order. Defaults to False.
+    max_batch_tokens : int or None
+        Size budget of each batch for bucketed batches, in atoms for graph models and
+        tokens for SMILES models; ``batch_size`` still bounds the number of molecules.
+        Setting it enables bucketing. Defaults to None.
     """
-    def __init__(self, device: Optional[torch.device] = None, model_name: str = "BaseModel", verbose: str = "none"):
+    def __init__(
+        self,
+        device: Optional[torch.device] = None,
+        model_name: str = "BaseModel",
+        verbose: str = "none",
+        **runtime_params,
+    ):
         self.device = device
         self.model_name = model_name # string of the model name which could be specified by the user
             
@@ -44,6 +86,20 @@ class BaseModel(ABC):
         self.is_fitted_ = False # whether the model is fitted
         self.model = None # the fitted model if not None
         self.model_class = None # the class of the model used to initialize the model
+        self.n_jobs = 1 # number of processes used to convert molecules to graphs and back
+        # data loader settings
+        self.num_workers = 0
+        self.pin_memory = False
+        self.prefetch_factor = None
+        self.persistent_workers = False
+        self.non_blocking = False
+        self.bucket_batches = False
+        self.max_batch_tokens = None
+        runtime_names = self._get_runtime_param_names()
+        for key, value in runtime_params.items():
+            if key not in runtime_names:
+                raise TypeError(f"{type(self).__name__}.__init__() got an unexpected keyword argument '{key}'")
+            setattr(self, key, value)
 
         self.verbose = verbose
         if self.verbose not in ["none", "progress_bar", "print_statement"]:
@@ -107,6 +163,127 @@ class BaseModel(ABC):
         # return ["model_name", "model_class", "is_fitted_"]
         return ["model_name", "is_fitted_"]
 
+    @staticmethod
+    def _get_runtime_param_names() -> List[str]:
+        """Get names of runtime settings shared by all models.
+
+        Runtime settings only affect how data is processed, not the fitted model,
+        so they are accepted by ``set_params`` but not saved with checkpoints.
+
+        Returns
+        -------
+        List[str]
+            List of runtime setting names
+        """
+        return [
+            "n_jobs", "num_workers", "pin_memory", "prefetch_factor", "persistent_workers", "non_blocking",
+            "bucket_batches", "max_batch_tokens",
+        ]
+
+    def _loader_kwargs(self) -> Dict[str, Any]:
+        """Get keyword arguments for ``DataLoader`` from the loader settings.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Keyword arguments shared by all data loaders of the model
+        """
+        kwargs = {"num_workers": self.num_workers, "pin_memory": self.pin_memory}
+        if self.num_workers > 0:
+            # only valid with worker processes
+            kwargs["persistent_workers"] = self.persistent_workers
+            if self.prefetch_factor is not None:
+                kwargs["prefetch_factor"] = self.prefetch_factor
+        return kwargs
+
+    def _bucket_sampler(
+        self, sizes: Sequence[int], shuffle: bool = False, padded: bool = False
+    ) -> Optional[BucketBatchSampler]:
+        """Get the size-bucketing batch sampler for a dataset, or None if bucketing is disabled.
+
+        Parameters
+        ----------
+        sizes : Sequence[int]
+            Size of each molecule (atoms or tokens)
+        shuffle : bool, default=False
+            Whether the batches are shuffled every epoch
+        padded : bool, default=False
+            Whether batches are padded to their largest molecule
+
+        Returns
+        -------
+        Optional[BucketBatchSampler]
+            The batch sampler, to be passed as ``batch_sampler`` to the data loader
+        """
+        if not self.bucket_batches and self.max_batch_tokens is None:
+            return None
+        return BucketBatchSampler(
+            sizes,
+            batch_size=getattr(self, "batch_size", None),
+            max_size=self.max_batch_tokens,
+            padded=padded,
+            shuffle=shuffle,
+        )
+
+    def _make_bucketed_loader(
+        self, loader_class: Type, dataset, sizes: Sequence[int], shuffle: bool = False, padded: bool = False
+    ):
+        """Create a data loader that buckets batches by size when bucketing is enabled.
+
+        Parameters
+        ----------
+        loader_class : Type
+            Data loader class, e.g. ``torch_geometric.loader.DataLoader``
+        dataset : Dataset
+            Dataset to load
+        sizes : Sequence[int]
+            Size of each molecule in ``dataset``
+        shuffle : bool, default=False
+            Whether to shuffle every epoch
+        padded : bool, default=False
+            Whether batches are padded to their largest molecule
+
+        Returns
+        -------
+        DataLoader
+            The data loader, using the loader settings of the model
+        """
+        batch_sampler = self._bucket_sampler(sizes, shuffle=shuffle, padded=padded)
+        if batch_sampler is not None:
+            return loader_class(dataset, batch_sampler=batch_sampler, **self._loader_kwargs())
+        return loader_class(dataset, batch_size=self.batch_size, shuffle=shuffle, **self._loader_kwargs())
+
+    @staticmethod
+    def _restore_order(value: Any, loader) -> Any:
+        """Reorder outputs computed batch by batch to the order of the dataset.
+
+        Only needed when ``loader`` uses a ``BucketBatchSampler``; otherwise ``value``
+        is returned unchanged.
+        """
+        sampler = getattr(loader, "batch_sampler", None)
+        if not isinstance(sampler, BucketBatchSampler):
+            # loaders of packed datasets pass the batch sampler as their sampler
+            sampler = getattr(loader, "sampler", None)
+            if not isinstance(sampler, BucketBatchSampler):
+                return value
+        order = sampler.order()
+        if isinstance(value, torch.Tensor):
+            restored = torch.empty_like(value)
+            restored[torch.from_numpy(order).to(value.device)] = value
+            return restored
+        if isinstance(value, np.ndarray):
+            restored = np.empty_like(value)
+            restored[order] = value
+            return restored
+        restored = [None] * len(value)
+        for i, item in zip(order.tolist(), value):
+            restored[i] = item
+        return restored
+
+    def _to_device(self, data):
+        """Move a batch (tensor or PyG batch) to ``device`` following ``non_blocking``."""
+        return data.to(self.device, non_blocking=self.non_blocking)
+
     def get_params(self, deep: bool = True) -> Dict[str, Any]:
         """Get parameters for this estimator.
         
@@ -149,8 +326,9 @@ class BaseModel(ABC):
             If an invalid parameter is provided
         """
         valid_params = self.get_params(deep=True)
+        runtime_params = self._get_runtime_param_names()
         for key, value in params.items():
-            if key not in valid_params:
+            if key not in valid_params and key not in runtime_params:
                 raise ValueError(f"Invalid parameter {key} for model {self}")
             setattr(self, key, value)
         return self
@@ -183,7 +361,8 @@ class BaseModel(ABC):
         return self.model
     
     def _validate_inputs(
-        self, X: List[str], y: Optional[Union[List, np.ndarray]] = None, num_task: int = 0, num_pretask: int = 0, return_rdkit_mol: bool = True
+        self, X: List[str], y: Optional[Union[List, np.ndarray]] = None, num_task: int = 0, num_pretask: int = 0, return_rdkit_mol: bool = True,
+        known_valid: Optional[np.ndarray] = None,
     ) -> Tuple[Union[List[str], List["Chem.Mol"]], Optional[np.ndarray]]:
         """Validate molecular inputs and targets.
         
@@ -199,13 +378,80 @@ class BaseModel(ABC):
             Number of pre-training tasks
         return_rdkit_mol : bool, default=True
             Whether to return RDKit Mol objects instead of SMILES
+        known_valid : Optional[np.ndarray], default=None
+            Mask of SMILES strings known to be valid, which are not parsed
             
         Returns
         -------
         Tuple[Union[List[str], List["Chem.Mol"]], Optional[np.ndarray]]
             Tuple of validated inputs and targets
         """
-        return MolecularInputChecker.validate_inputs(X, y, num_task, num_pretask, return_rdkit_mol)
+        return MolecularInputChecker.validate_inputs(X, y, num_task, num_pretask, return_rdkit_mol, known_valid)
+
+    def _validate_inputs_tolerant(
+        self, X: List[Union[str, "Chem.Mol"]], return_rdkit_mol: bool = True, known_valid: Optional[np.ndarray] = None
+    ) -> Tuple[Union[List[str], List["Chem.Mol"]], np.ndarray]:
+        """Validate molecular inputs for inference, skipping invalid ones instead of raising.
+
+        Each SMILES string is parsed once; already parsed RDKit molecules are kept as is.
+        A ValueError is raised only if none of the inputs is valid.
+
+        Parameters
+        ----------
+        X : List[Union[str, Chem.Mol]]
+            List of SMILES strings or RDKit molecules
+        return_rdkit_mol : bool, default=True
+            Whether to return RDKit Mol objects instead of SMILES
+        known_valid : Optional[np.ndarray], default=None
+            Mask of SMILES strings known to be valid, which are not parsed
+
+        Returns
+        -------
+        Tuple[Union[List[MoleculeHandle], List["Chem.Mol"]], np.ndarray]
+            Tuple of the valid inputs and a boolean mask of shape [n_samples] marking them
+        """
+        if not isinstance(X, list):
+            raise ValueError("X must be a list of SMILES strings.")
+        mols, valid, error_codes = MolecularInputChecker.validate_smiles_batch(X, known_valid)
+        if len(X) > 0 and not valid.any():
+            raise ValueError(f"No valid molecules found in X (error codes {np.unique(error_codes).tolist()}).")
+        if not valid.all():
+            invalid_idx = np.flatnonzero(~valid)
+            warnings.warn(
+                f"{len(invalid_idx)} invalid molecules found at indices {invalid_idx[:10].tolist()}"
+                f"{'...' if len(invalid_idx) > 10 else ''} (error codes {error_codes[invalid_idx[:10]].tolist()}). "
+                "Their outputs are filled with NaN.",
+                UserWarning,
+            )
+        if return_rdkit_mol:
+            return [mol for mol in mols if mol is not None], valid
+        return [
+            MoleculeHandle(item if isinstance(item, str) else Chem.MolToSmiles(mol))
+            for item, mol in zip(X, mols) if mol is not None
+        ], valid
+
+    @staticmethod
+    def _fill_invalid(value: Any, valid: np.ndarray) -> Any:
+        """Expand outputs computed for the valid inputs to all inputs.
+
+        Rows of invalid inputs are NaN for arrays and tensors, and None for lists.
+        """
+        if valid.all():
+            return value
+        if isinstance(value, torch.Tensor):
+            dtype = value.dtype if value.is_floating_point() else torch.float32
+            full = torch.full((len(valid),) + tuple(value.shape[1:]), float("nan"), dtype=dtype, device=value.device)
+            full[torch.from_numpy(valid).to(value.device)] = value.to(dtype)
+            return full
+        if isinstance(value, np.ndarray):
+            dtype = value.dtype if np.issubdtype(value.dtype, np.floating) else np.float64
+            full = np.full((len(valid),) + value.shape[1:], np.nan, dtype=dtype)
+            full[valid] = value
+            return full
+        full = [None] * len(valid)
+        for i, item in zip(np.flatnonzero(valid), value):
+            full[i] = item
+        return full
 
     def save_to_local(self, path: str) -> None:
         """Save model to local disk.
@@ -13,8 +13,9 @@ class BaseMolecularEncoder(BaseModel, ABC):
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "BaseMolecularEncoder",
         verbose: str = "none",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
     @abstractmethod
     def encode(self, X: List[str], return_type: Literal["np", "pt"] = "pt") -> Union[np.ndarray, torch.Tensor]:
@@ -12,8 +12,9 @@ class BaseMolecularGenerator(BaseModel, ABC):
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "BaseMolecularGenerator",
         verbose: str = "none",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
 
     @abstractmethod
     def fit(self, X: List[str], y: Optional[np.ndarray] = None) -> "BaseMolecularGenerator":
@@ -1,4 +1,6 @@
+import os
 import warnings
+import itertools
 import torch
 import numpy as np
 from ..utils import (
@@ -10,8 +12,24 @@ from ..utils import (
     r2_score,
 )
 from abc import ABC, abstractmethod
-from typing import Optional, Union, List, Tuple, Callable
+from typing import Optional, Union, List, Tuple, Callable, Iterable, Iterator, Dict, Any
 from ..base.base import BaseModel
+from ..utils.checker import MolecularInputChecker
+
+def _iter_smiles(X: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Iterate over SMILES strings from an iterable or lazily from a file.
+
+    A file is read line by line; the first whitespace-separated field of each
+    non-empty line is taken as the SMILES string (as in ``.smi`` files).
+    """
+    if isinstance(X, (str, os.PathLike)):
+        with open(X) as f:
+            for line in f:
+                fields = line.split()
+                if fields:
+                    yield fields[0]
+    else:
+        yield from X
 
 class BaseMolecularPredictor(BaseModel, ABC):
     """Base class for molecular discovery estimators."""
@@ -23,8 +41,9 @@ class BaseMolecularPredictor(BaseModel, ABC):
         num_task: int = 0,
         task_type: Optional[str] = None,
         verbose: str = "none",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         self.num_task = num_task
         self.task_type = task_type
 
@@ -52,7 +71,73 @@ class BaseMolecularPredictor(BaseModel, ABC):
     @abstractmethod
     def _evaluation_epoch(self, evaluate_loader):
         pass
-        
+
+    def predict_stream(
+        self,
+        X: Union[str, Iterable[str]],
+        chunk_size: int = 10000,
+        **predict_kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """Make predictions chunk by chunk over an iterable or a file of SMILES strings.
+
+        Parsing, featurization and inference are done one chunk at a time, so the
+        peak memory depends on ``chunk_size`` and not on the number of molecules.
+        Invalid SMILES strings are skipped instead of raising an error.
+
+        Parameters
+        ----------
+        X : Union[str, Iterable[str]]
+            Iterable (e.g. a generator) of SMILES strings, or the path to a file with
+            one molecule per line whose first field is the SMILES string
+        chunk_size : int, default=10000
+            Number of molecules read and predicted at once
+        **predict_kwargs
+            Additional arguments passed to ``predict``
+
+        Yields
+        ------
+        Dict[str, Any]
+            Outputs of ``predict`` for the chunk with one row per input molecule, plus:
+                - 'index': Positions of the molecules in the input (shape: [chunk_size])
+                - 'valid': Whether each SMILES string could be parsed (shape: [chunk_size])
+
+            Array outputs are NaN and list outputs are None for invalid molecules.
+        """
+        self._check_is_fitted()
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+        smiles_iter = _iter_smiles(X)
+        start = 0
+        # empty outputs of predict, used to fill chunks without any valid molecule
+        empty_outputs = None
+        while True:
+            chunk = list(itertools.islice(smiles_iter, chunk_size))
+            if not chunk:
+                break
+            # Parse once here; predict reuses the parsed molecules
+            mols, valid, _ = MolecularInputChecker.validate_smiles_batch(chunk)
+            result = {
+                "index": np.arange(start, start + len(chunk)),
+                "valid": valid,
+            }
+            if valid.any():
+                outputs = self.predict([mol for mol in mols if mol is not None], **predict_kwargs)
+            else:
+                if empty_outputs is None:
+                    # no valid chunk seen yet: get the output keys and shapes from a trivial molecule
+                    empty_outputs = {
+                        key: value[:0]
+                        for key, value in self.predict(["C"], **predict_kwargs).items()
+                    }
+                outputs = empty_outputs
+            for key, value in outputs.items():
+                result[key] = self._fill_invalid(value, valid)
+            if empty_outputs is None:
+                empty_outputs = {key: value[:0] for key, value in outputs.items()}
+            yield result
+            start += len(chunk)
+
     def _setup_evaluation(
         self,
         evaluate_criterion: Optional[Union[str, Callable]],
@@ -113,6 +198,7 @@ class BaseMolecularPredictor(BaseModel, ABC):
             return torch.nn.L1Loss(reduction='none')
     
     def _validate_inputs(
-        self, X: List[str], y: Optional[Union[List, np.ndarray]] = None, num_task: int = 0, num_pretask: int = 0, return_rdkit_mol: bool = True
+        self, X: List[str], y: Optional[Union[List, np.ndarray]] = None, num_task: int = 0, num_pretask: int = 0, return_rdkit_mol: bool = True,
+        known_valid: Optional[np.ndarray] = None,
     ) -> Tuple[Union[List[str], List["Chem.Mol"]], Optional[np.ndarray]]:
-        return super()._validate_inputs(X, y, self.num_task, 0, return_rdkit_mol)
\ No newline at end of file
+        return super()._validate_inputs(X, y, self.num_task, 0, return_rdkit_mol, known_valid)
\ No newline at end of file
@@ -5,8 +5,7 @@ from torch_geometric.nn import global_add_pool, global_mean_pool, global_max_poo
 from ...nn import GNN_node, GNN_node_Virtualnode, MLP
 from ...utils import init_weights
 from ...utils.graph.features import allowable_features
-
-import random
+from ..graphmae.dataloader import BatchMaskAtom
 
 class_criterion = torch.nn.CrossEntropyLoss()
 
@@ -78,27 +77,14 @@ class GNN(nn.Module):
         self.apply(reset_parameters)
 
     def compute_loss(self, batched_data):
-        masked_node_indices = list()
-
-        # select indices of masked nodes
-        for i in range(batched_data.batch[-1] + 1):
-            idx = torch.nonzero((batched_data.batch == i).float()).squeeze(-1)
-            num_node = idx.shape[0]
-            if self.mask_num == 0:
-                sample_size = int(num_node * self.mask_rate + 1)
-            else:
-                sample_size = min(self.mask_num, int(num_node * 0.5))
-            masked_node_idx = random.sample(idx.tolist(), sample_size)
-            masked_node_idx.sort()
-            masked_node_indices += masked_node_idx
-
-        batched_data.masked_node_indices = torch.tensor(masked_node_indices)
-
-        batched_data.y = batched_data.x[masked_node_indices][:, 0]
-
-        # mask nodes' features
-        for node_idx in masked_node_indices:
-            batched_data.x[node_idx] = torch.tensor([self.mask_atom_id - 1] + [0] * (batched_data.x.shape[1] - 1))
+        # batches from DataLoaderMaskingPred are masked at collate time
+        if getattr(batched_data, "masked_atom_indices", None) is None:
+            BatchMaskAtom(
+                num_atom_type=self.mask_atom_id, num_edge_type=5, mask_rate=self.mask_rate, mask_edge=False, mask_num=self.mask_num,
+                attr_label=False,
+            )(batched_data)
+        masked_node_indices = batched_data.masked_atom_indices
+        batched_data.y = batched_data.mask_node_label[:, 0]
     
         # generate predictions
         h_node, _ = self.graph_encoder(batched_data)
@@ -94,68 +94,11 @@ class GNN(nn.Module):
         self.apply(reset_parameters)
 
     def compute_loss(self, batched_data):
-        device = batched_data.x.device
-        extract_context = ExtractSubstructureContextPair(self.num_layer, self.num_layer - 1, self.num_layer + self.context_size - 1)
-        keys = ["center_substruct_idx", "edge_attr_substruct", "edge_index_substruct", "x_substruct", "overlap_context_substruct_idx", "edge_attr_context", "edge_index_context", "x_context"]
-        for key in keys:
-            batched_data[key] = []
-
-        #used for pooling the substructure
-        batched_data.batch_substruct = [] 
-        #used for pooling the context
-        batched_data.batch_context = [] 
-        batched_data.batch_overlapped_context = []
-        batched_data.overlapped_context_size = []
-        
-        cumsum_main = 0
-        cumsum_substruct = 0
-        cumsum_context = 0
-
-        i = 0
-        
-        for j in range(len(batched_data)):
-            data = batched_data[j]
-            data = extract_context(data)
-
-            if hasattr(data, "x_context"):
-                num_nodes = data.num_nodes
-                num_nodes_substruct = len(data.x_substruct)
-                num_nodes_context = len(data.x_context)
-
-                batched_data.batch_substruct.append(torch.full((len(data.substruct_node_idxes), ), i, dtype=torch.long).to(device))
-                batched_data.batch_context.append(torch.full((len(data.context_node_idxes), ), i, dtype=torch.long).to(device))
-                batched_data.batch_overlapped_context.append(torch.full((len(data.overlap_context_substruct_idx), ), i, dtype=torch.long).to(device))
-                batched_data.overlapped_context_size.append(len(data.overlap_context_substruct_idx))
-
-                ###batching for the substructure graph
-                for key in ["center_substruct_idx", "edge_attr_substruct", "edge_index_substruct", "x_substruct"]:
-                    item = data[key]
-                    item = item + cumsum_substruct if key in ["edge_index", "edge_index_substruct", "edge_index_context", "overlap_context_substruct_idx", "center_substruct_idx"] else item
-                    batched_data[key].append(item.to(device))
-                
-
-                ###batching for the context graph
-                for key in ["overlap_context_substruct_idx", "edge_attr_context", "edge_index_context", "x_context"]:
-                    item = data[key]
-                    item = item + cumsum_context if key in ["edge_index", "edge_index_substruct", "edge_index_context", "overlap_context_substruct_idx", "center_substruct_idx"] else item
-                    batched_data[key].append(item.to(device))
-
-                cumsum_main += num_nodes
-                cumsum_substruct += num_nodes_substruct   
-                cumsum_context += num_nodes_context
-                i += 1
-
-        for key in keys:
-            if key in ["edge_index", "edge_index_substruct", "edge_index_context"]:
-                dim = -1
-            else:
-                dim = 0
-            batched_data[key] = torch.cat(batched_data[key], dim=dim)
-
-        batched_data.batch_substruct = torch.cat(batched_data.batch_substruct, dim=-1).to(device)
-        batched_data.batch_context = torch.cat(batched_data.batch_context, dim=-1).to(device)
-        batched_data.batch_overlapped_context = torch.cat(batched_data.batch_overlapped_context, dim=-1).to(device)
-        batched_data.overlapped_context_size = torch.LongTensor(batched_data.overlapped_context_size).to(device)
+        # batches from DataLoaderSubstructContext are extracted at collate time
+        if getattr(batched_data, "x_substruct", None) is None:
+            ExtractSubstructureContextPair(
+                self.num_layer, self.num_layer - 1, self.num_layer + self.context_size - 1
+            )(batched_data)
 
         # generate predictions
         substruct_data = Data(x=batched_data.x_substruct, edge_index=batched_data.edge_index_substruct, edge_attr=batched_data.edge_attr_substruct, batch=batched_data.batch_substruct)
@@ -9,9 +9,10 @@ from torch_geometric.loader import DataLoader
 from torch_geometric.data import Data
 
 from .model import GNN
+from .utils import DataLoaderSubstructContext
 from ..constant import GNN_ENCODER_MODELS, GNN_ENCODER_READOUTS, GNN_ENCODER_PARAMS
 from ...base import BaseMolecularEncoder
-from ...utils import graph_from_smiles
+from ...utils import graphs_from_smiles
 
 ALLOWABLE_ENCODER_MODELS = GNN_ENCODER_MODELS
 ALLOWABLE_ENCODER_READOUTS = GNN_ENCODER_READOUTS
@@ -67,6 +68,10 @@ class ContextPredMolecularEncoder(BaseMolecularEncoder):
         Device to run the model on (CPU or GPU).
     model_name : str, default="ContextPredMolecularEncoder"
         Name of the encoder model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self,
@@ -90,9 +95,10 @@ class ContextPredMolecularEncoder(BaseMolecularEncoder):
         scheduler_patience: int = 5,
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "ContextPredMolecularEncoder"
+        model_name: str = "ContextPredMolecularEncoder",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.mode = mode
         self.context_size = context_size
@@ -147,14 +153,14 @@ class ContextPredMolecularEncoder(BaseMolecularEncoder):
     def _convert_to_pytorch_data(self, X):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, None,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            graph = graph_from_smiles(smiles_or_mol, None)
+        for idx, graph in enumerate(graphs):
             g = Data()
             g.num_nodes = graph["num_nodes"]
             g.edge_index = torch.from_numpy(graph["edge_index"])
@@ -216,11 +222,14 @@ class ContextPredMolecularEncoder(BaseMolecularEncoder):
         # Prepare datasets and loaders
         X_train, _ = self._validate_inputs(X_train, return_rdkit_mol=True)
         train_dataset = self._convert_to_pytorch_data(X_train)
-        train_loader = DataLoader(
+        train_loader = DataLoaderSubstructContext(
             train_dataset,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=0
+            k=self.num_layer,
+            l1=self.num_layer - 1,
+            l2=self.num_layer + self.context_size - 1,
+            **self._loader_kwargs()
         )
         self.fitting_loss = []
 
@@ -260,7 +269,7 @@ class ContextPredMolecularEncoder(BaseMolecularEncoder):
         losses = []
 
         for step, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
             loss = self.model.compute_loss(batch)
             loss.backward()
@@ -296,14 +305,14 @@ class ContextPredMolecularEncoder(BaseMolecularEncoder):
         Returns
         -------
         representations : ndarray or torch.Tensor
-            Molecular representations
+            Molecular representations. Rows of invalid SMILES strings are NaN.
         """
         self._check_is_fitted()
 
         # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X, return_rdkit_mol=True)
+        X, valid = self._validate_inputs_tolerant(X, return_rdkit_mol=True)
         dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False, **self._loader_kwargs())
 
         if self.model is None:
             raise RuntimeError("Model not initialized")
@@ -314,10 +323,10 @@ class ContextPredMolecularEncoder(BaseMolecularEncoder):
         encodings = []
         with torch.no_grad():
             for batch in tqdm(loader, disable=self.verbose != "progress_bar"):
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 encodings.append(out["graph"].cpu())
 
         # Concatenate and convert to requested format
-        encodings = torch.cat(encodings, dim=0)
+        encodings = self._fill_invalid(torch.cat(encodings, dim=0), valid)
         return encodings if return_type == "pt" else encodings.numpy()
\ No newline at end of file
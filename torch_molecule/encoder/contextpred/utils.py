@@ -1,10 +1,5 @@
 import torch
-import copy
-import random
-import networkx as nx
-import numpy as np
-
-from torch_geometric.data import Data
+from torch_geometric.data import Batch
 
 def cumsum(self, key, item):
         r"""If :obj:`True`, the attribute :obj:`key` with content :obj:`item`
@@ -16,14 +11,42 @@ def cumsum(self, key, item):
         """
         return key in ["edge_index", "edge_index_substruct", "edge_index_context", "overlap_context_substruct_idx", "center_substruct_idx"]
 
+class DataLoaderSubstructContext(torch.utils.data.DataLoader):
+    r"""Data loader which merges data objects from a
+    :class:`torch_geometric.data.dataset` to a mini-batch and extracts the
+    substructures and contexts of the mini-batch with
+    :class:`ExtractSubstructureContextPair`.
+    Args:
+        dataset (Dataset): The dataset from which to load the data.
+        batch_size (int, optional): How may samples per batch to load.
+            (default: :obj:`1`)
+        shuffle (bool, optional): If set to :obj:`True`, the data will be
+            reshuffled at every epoch (default: :obj:`True`)
+        k (int): Number of hops of the substructures
+        l1 (int): Inner radius of the contexts
+        l2 (int): Outer radius of the contexts
+    """
+
+    def __init__(self, dataset, batch_size=1, shuffle=True, k=1, l1=0, l2=2, **kwargs):
+        self._transform = ExtractSubstructureContextPair(k, l1, l2)
+        super(DataLoaderSubstructContext, self).__init__(
+            dataset,
+            batch_size,
+            shuffle,
+            collate_fn=self.collate_fn,
+            **kwargs)
+
+    def collate_fn(self, batches):
+        return self._transform(Batch.from_data_list(batches))
+
 class ExtractSubstructureContextPair:
     def __init__(self, k, l1, l2):
         """
-        Randomly selects a node from the data object, and adds attributes
+        Randomly selects a node from every graph of a batch, and adds attributes
         that contain the substructure that corresponds to k hop neighbours
         rooted at the node, and the context substructures that corresponds to
         the subgraph that is between l1 and l2 hops away from the
-        root node.
+        root node. A distance of 0 selects no node.
         :param k:
         :param l1:
         :param l2:
@@ -32,175 +55,104 @@ class ExtractSubstructureContextPair:
         self.l1 = l1
         self.l2 = l2
 
-        # for the special case of 0, addresses the quirk with
-        # single_source_shortest_path_length
-        if self.k == 0:
-            self.k = -1
-        if self.l1 == 0:
-            self.l1 = -1
-        if self.l2 == 0:
-            self.l2 = -1
+    def hop_distances(self, edge_index, num_nodes, root_idx, max_hops):
+        """
+        Breadth-first search from the roots of all graphs at once.
+
+        :param edge_index: edges of the batch, both directions included
+        :param num_nodes: number of nodes of the batch
+        :param root_idx: root node of each graph
+        :param max_hops: number of hops to explore
+        :return: hop distance of each node to the root of its graph (max_hops + 1
+        if farther)
+        """
+        dist = torch.full((num_nodes,), max_hops + 1, dtype=torch.long, device=edge_index.device)
+        dist[root_idx] = 0
+        visited = dist == 0
+        frontier = visited.clone()
+        for hop in range(1, max_hops + 1):
+            reached = torch.zeros_like(visited)
+            reached[edge_index[1, frontier[edge_index[0]]]] = True
+            frontier = reached & ~visited
+            if not frontier.any():
+                break
+            dist[frontier] = hop
+            visited |= frontier
+        return dist
+
+    @staticmethod
+    def _within(dist, cutoff):
+        # nodes at most cutoff hops away; a cutoff of 0 selects no node
+        if cutoff <= 0:
+            return torch.zeros_like(dist, dtype=torch.bool)
+        return dist <= cutoff
 
     def __call__(self, data, root_idx=None):
         """
 
-        :param data: pytorch geometric data object
-        :param root_idx: If None, then randomly samples an atom idx.
-        Otherwise sets atom idx of root (for debugging only)
-        :return: None. Creates new attributes in original data object:
+        :param data: batch of pytorch geometric data objects
+        :param root_idx: If None, then randomly samples an atom idx per graph.
+        Otherwise sets atom idx of the roots (for debugging only)
+        :return: the batch, with new attributes, computed for the graphs that
+        have a non empty context (numbered from 0 in batch_substruct and
+        batch_context):
         data.center_substruct_idx
         data.x_substruct
         data.edge_attr_substruct
         data.edge_index_substruct
+        data.batch_substruct
         data.x_context
         data.edge_attr_context
         data.edge_index_context
+        data.batch_context
         data.overlap_context_substruct_idx
+        data.batch_overlapped_context
+        data.overlapped_context_size
         """
-        num_atoms = data.x.size()[0]
-        if root_idx == None:
-            root_idx = random.sample(range(num_atoms), 1)[0]
-
-        G = graph_data_obj_to_nx_simple(data)  # same ordering as input data obj
-
-        # Get k-hop subgraph rooted at specified atom idx
-        substruct_node_idxes = nx.single_source_shortest_path_length(G,
-                                                                     root_idx,
-                                                                     self.k).keys()
-        if len(substruct_node_idxes) > 0:
-            substruct_G = G.subgraph(substruct_node_idxes)
-            substruct_G, substruct_node_map = reset_idxes(substruct_G)  # need
-            # to reset node idx to 0 -> num_nodes - 1, otherwise data obj does not
-            # make sense, since the node indices in data obj must start at 0
-            substruct_data = nx_to_graph_data_obj_simple(substruct_G)
-            data.substruct_node_idxes = torch.tensor(list(substruct_node_idxes))
-            data.x_substruct = substruct_data.x
-            data.edge_attr_substruct = substruct_data.edge_attr
-            data.edge_index_substruct = substruct_data.edge_index
-            data.center_substruct_idx = torch.tensor([substruct_node_map[
-                                                          root_idx]])  # need
-            # to convert center idx from original graph node ordering to the
-            # new substruct node ordering
-
-        # Get subgraphs that is between l1 and l2 hops away from the root node
-        l1_node_idxes = nx.single_source_shortest_path_length(G, root_idx,
-                                                              self.l1).keys()
-        l2_node_idxes = nx.single_source_shortest_path_length(G, root_idx,
-                                                              self.l2).keys()
-        context_node_idxes = set(l1_node_idxes).symmetric_difference(
-            set(l2_node_idxes))
-        if len(context_node_idxes) > 0:
-            context_G = G.subgraph(context_node_idxes)
-            context_G, context_node_map = reset_idxes(context_G)  # need to
-            # reset node idx to 0 -> num_nodes - 1, otherwise data obj does not
-            # make sense, since the node indices in data obj must start at 0
-            context_data = nx_to_graph_data_obj_simple(context_G)
-            data.context_node_idxes = torch.tensor(list(context_node_idxes))
-            data.x_context = context_data.x
-            data.edge_attr_context = context_data.edge_attr
-            data.edge_index_context = context_data.edge_index
-
-        # Get indices of overlapping nodes between substruct and context,
-        # WRT context ordering
-        context_substruct_overlap_idxes = list(set(
-            context_node_idxes).intersection(set(substruct_node_idxes)))
-        if len(context_substruct_overlap_idxes) > 0:
-            context_substruct_overlap_idxes_reorder = [context_node_map[old_idx]
-                                                       for
-                                                       old_idx in
-                                                       context_substruct_overlap_idxes]
-            # need to convert the overlap node idxes, which is from the
-            # original graph node ordering to the new context node ordering
-            data.overlap_context_substruct_idx = \
-                torch.tensor(context_substruct_overlap_idxes_reorder)
-
+        batch, edge_index = data.batch, data.edge_index
+        device = edge_index.device
+        num_nodes = batch.size(0)
+        num_atoms = torch.bincount(batch)
+        ptr = torch.cumsum(num_atoms, dim=0) - num_atoms
+        if root_idx is None:
+            offset = (torch.rand(num_atoms.size(0), device=device) * num_atoms).long()
+            root_idx = ptr + torch.minimum(offset, num_atoms - 1)
+        root_idx = torch.as_tensor(root_idx, dtype=torch.long, device=device)
+
+        dist = self.hop_distances(edge_index, num_nodes, root_idx, max(self.k, self.l1, self.l2, 0))
+        substruct_mask = self._within(dist, self.k)
+        context_mask = self._within(dist, self.l2) & ~self._within(dist, self.l1)
+
+        # only graphs with a context are kept
+        keep_graph = torch.zeros(num_atoms.size(0), dtype=torch.bool, device=device)
+        keep_graph[batch[context_mask]] = True
+        graph_rank = torch.cumsum(keep_graph, dim=0) - 1
+        substruct_mask &= keep_graph[batch]
+        context_mask &= keep_graph[batch]
+
+        # node features are simplified to atom type and chirality tag, and edge
+        # features to bond type and bond direction
+        substruct_idx, data.x_substruct, data.edge_index_substruct, data.edge_attr_substruct = \
+            self._subgraph(data, substruct_mask)
+        context_idx, data.x_context, data.edge_index_context, data.edge_attr_context = \
+            self._subgraph(data, context_mask)
+        data.batch_substruct = graph_rank[batch[substruct_mask]]
+        data.batch_context = graph_rank[batch[context_mask]]
+        data.center_substruct_idx = substruct_idx[root_idx[keep_graph]]
+
+        # indices of overlapping nodes between substruct and context, WRT context ordering
+        overlap_mask = substruct_mask & context_mask
+        data.overlap_context_substruct_idx = context_idx[overlap_mask]
+        data.batch_overlapped_context = graph_rank[batch[overlap_mask]]
+        data.overlapped_context_size = torch.bincount(
+            data.batch_overlapped_context, minlength=int(keep_graph.sum())
+        )
         return data
-    
-def reset_idxes(G):
-    """
-    Resets node indices such that they are numbered from 0 to num_nodes - 1
-    :param G:
-    :return: copy of G with relabelled node indices, mapping
-    """
-    mapping = {}
-    for new_idx, old_idx in enumerate(G.nodes()):
-        mapping[old_idx] = new_idx
-    new_G = nx.relabel_nodes(G, mapping, copy=True)
-    return new_G, mapping
-
-def graph_data_obj_to_nx_simple(data):
-    """
-    Converts graph Data object required by the pytorch geometric package to
-    network x data object. NB: Uses simplified atom and bond features,
-    and represent as indices. NB: possible issues with recapitulating relative
-    stereochemistry since the edges in the nx object are unordered.
-    :param data: pytorch geometric Data object
-    :return: network x object
-    """
-    G = nx.Graph()
-
-    # atoms
-    atom_features = data.x.cpu().numpy()
-    num_atoms = atom_features.shape[0]
-    for i in range(num_atoms):
-        atomic_num_idx, chirality_tag_idx, _, _, _, _, _, _, _ = atom_features[i]
-        G.add_node(i, atom_num_idx=atomic_num_idx, chirality_tag_idx=chirality_tag_idx)
-        pass
-
-    # bonds
-    edge_index = data.edge_index.cpu().numpy()
-    edge_attr = data.edge_attr.cpu().numpy()
-    num_bonds = edge_index.shape[1]
-    for j in range(0, num_bonds, 2):
-        begin_idx = int(edge_index[0, j])
-        end_idx = int(edge_index[1, j])
-        bond_type_idx, bond_dir_idx, _ = edge_attr[j]
-        if not G.has_edge(begin_idx, end_idx):
-            G.add_edge(begin_idx, end_idx, bond_type_idx=bond_type_idx,
-                       bond_dir_idx=bond_dir_idx)
-
-    return G
-
-def nx_to_graph_data_obj_simple(G):
-    """
-    Converts nx graph to pytorch geometric Data object. Assume node indices
-    are numbered from 0 to num_nodes - 1. NB: Uses simplified atom and bond
-    features, and represent as indices. NB: possible issues with
-    recapitulating relative stereochemistry since the edges in the nx
-    object are unordered.
-    :param G: nx graph obj
-    :return: pytorch geometric Data object
-    """
-    # atoms
-    num_atom_features = 2  # atom type,  chirality tag
-    atom_features_list = []
-    for _, node in G.nodes(data=True):
-        atom_feature = [node['atom_num_idx'], node['chirality_tag_idx']]
-        atom_features_list.append(atom_feature)
-    x = torch.tensor(np.array(atom_features_list), dtype=torch.long)
-
-    # bonds
-    num_bond_features = 2  # bond type, bond direction
-    if len(G.edges()) > 0:  # mol has bonds
-        edges_list = []
-        edge_features_list = []
-        for i, j, edge in G.edges(data=True):
-            edge_feature = [edge['bond_type_idx'], edge['bond_dir_idx']]
-            edges_list.append((i, j))
-            edge_features_list.append(edge_feature)
-            edges_list.append((j, i))
-            edge_features_list.append(edge_feature)
-
-        # data.edge_index: Graph connectivity in COO format with shape [2, num_edges]
-        edge_index = torch.tensor(np.array(edges_list).T, dtype=torch.long)
-
-        # data.edge_attr: Edge feature matrix with shape [num_edges, num_edge_features]
-        edge_attr = torch.tensor(np.array(edge_features_list),
-                                 dtype=torch.long)
-    else:   # mol has no bonds
-        edge_index = torch.empty((2, 0), dtype=torch.long)
-        edge_attr = torch.empty((0, num_bond_features), dtype=torch.long)
-
-    data = Data(x=x, edge_index=edge_index, edge_attr=edge_attr)
 
-    return data
\ No newline at end of file
+    @staticmethod
+    def _subgraph(data, node_mask):
+        """Node-induced subgraph of the batch, with nodes numbered in batch order."""
+        new_idx = torch.cumsum(node_mask, dim=0) - 1
+        edge_mask = node_mask[data.edge_index[0]] & node_mask[data.edge_index[1]]
+        edge_index = new_idx[data.edge_index[:, edge_mask]]
+        return new_idx, data.x[node_mask, :2], edge_index, data.edge_attr[edge_mask, :2]
@@ -7,6 +7,53 @@ from ...utils import init_weights
 
 criterion = torch.nn.BCEWithLogitsLoss()
 
+def sample_negative_edges(edge_index, batch, num_samples, num_candidates=None):
+    """
+    Sample node pairs of the same graph that are not connected.
+
+    Candidate pairs are drawn in one batch: the first node uniformly over all nodes and
+    the second node uniformly over the nodes of the same graph. Node pairs are hashed as
+    int64 keys to reject self-loops, existing edges and duplicates on the device.
+
+    Args:
+        edge_index (torch.Tensor): Edges of the batch, of shape [2, num_edges]
+        batch (torch.Tensor): Graph index of each node
+        num_samples (int): Maximum number of negative edges to return
+        num_candidates (int, optional): Number of candidate pairs. Defaults to 5 * num_edges.
+
+    Returns:
+        torch.Tensor: Negative edges of shape [2, n] with n <= num_samples, in sampling order
+    """
+    device = batch.device
+    num_nodes = batch.size(0)
+    if num_candidates is None:
+        num_candidates = 5 * edge_index.size(1)
+    if num_nodes == 0 or num_samples <= 0 or num_candidates <= 0:
+        return torch.zeros((2, 0), dtype=torch.long, device=device)
+
+    # first node of each graph and number of nodes per graph
+    counts = torch.bincount(batch)
+    ptr = torch.cumsum(counts, dim=0) - counts
+
+    node1 = torch.randint(0, num_nodes, (num_candidates,), device=device)
+    graph = batch[node1]
+    offset = (torch.rand(num_candidates, device=device) * counts[graph]).long()
+    node2 = ptr[graph] + torch.minimum(offset, counts[graph] - 1)
+
+    keys = node1 * num_nodes + node2
+    edge_keys = edge_index[0] * num_nodes + edge_index[1]
+    valid = (node1 != node2) & ~torch.isin(keys, edge_keys)
+
+    # keep the first occurrence of each pair
+    position = torch.arange(num_candidates, device=device)
+    unique_keys, inverse = torch.unique(keys, return_inverse=True)
+    first = torch.full((unique_keys.size(0),), num_candidates, dtype=torch.long, device=device)
+    first = first.scatter_reduce(0, inverse, position, reduce="amin")
+    valid &= first[inverse] == position
+
+    selected = position[valid][:num_samples]
+    return torch.stack([node1[selected], node2[selected]])
+
 class GNN(nn.Module):
     def __init__(
         self,
@@ -65,27 +112,10 @@ class GNN(nn.Module):
         self.apply(reset_parameters)
 
     def compute_loss(self, batched_data):
-        # sample negative edges
-        num_nodes = batched_data.num_nodes
-        num_edges = batched_data.num_edges
-
-        edge_set = set([str(batched_data.edge_index[0, i].cpu().item()) + "," + str(
-            batched_data.edge_index[1, i].cpu().item()) for i in range(batched_data.edge_index.shape[1])])
-
-        redandunt_sample = torch.randint(0, num_nodes, (2, 5 * num_edges))
-        sampled_ind = []
-        sampled_edge_set = set([])
-        for i in range(5 * num_edges):
-            node1 = redandunt_sample[0, i].cpu().item()
-            node2 = redandunt_sample[1, i].cpu().item()
-            edge_str = str(node1) + "," + str(node2)
-            if not edge_str in edge_set and not edge_str in sampled_edge_set and not node1 == node2:
-                sampled_edge_set.add(edge_str)
-                sampled_ind.append(i)
-            if len(sampled_ind) == num_edges / 2:
-                break
-
-        batched_data.negative_edge_index = redandunt_sample[:, sampled_ind]
+        # sample one negative edge per positive (undirected) edge
+        batched_data.negative_edge_index = sample_negative_edges(
+            batched_data.edge_index, batched_data.batch, (batched_data.edge_index.size(1) + 1) // 2
+        )
     
         # generate predictions
         h_node, _ = self.graph_encoder(batched_data)
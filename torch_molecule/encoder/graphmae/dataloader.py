@@ -1,206 +1,142 @@
-import random
-import copy
 import torch
 import torch.nn.functional as F
-from torch_geometric.data import Data
+from torch_geometric.data import Batch
 
 class DataLoaderMaskingPred(torch.utils.data.DataLoader):
     r"""Data loader which merges data objects from a
-    :class:`torch_geometric.data.dataset` to a mini-batch.
+    :class:`torch_geometric.data.dataset` to a mini-batch and masks atoms
+    of the mini-batch with :class:`BatchMaskAtom`.
     Args:
         dataset (Dataset): The dataset from which to load the data.
         batch_size (int, optional): How may samples per batch to load.
             (default: :obj:`1`)
         shuffle (bool, optional): If set to :obj:`True`, the data will be
             reshuffled at every epoch (default: :obj:`True`)
+        mask_rate (float, optional): Fraction of atoms to mask per graph
+        mask_num (int, optional): If positive, number of atoms to mask per
+            graph (at most half of the atoms) instead of :obj:`mask_rate`
+        mask_edge (bool, optional): If set to :obj:`True`, also mask the
+            edges connected to the masked atoms
+        attr_label (bool, optional): If set to :obj:`True`, add the one-hot
+            labels of the masked atoms and edges used by GraphMAE
     """
 
-    def __init__(self, dataset, batch_size=1, shuffle=True, mask_rate=0.0, mask_edge=False, **kwargs):
-        self._transform = MaskAtom(num_atom_type = 119, num_edge_type = 5, mask_rate = mask_rate, mask_edge=mask_edge)
+    def __init__(self, dataset, batch_size=1, shuffle=True, mask_rate=0.0, mask_edge=False, mask_num=0, attr_label=True, **kwargs):
+        self._transform = BatchMaskAtom(num_atom_type = 119, num_edge_type = 5, mask_rate = mask_rate, mask_edge=mask_edge, mask_num=mask_num, attr_label=attr_label)
         super(DataLoaderMaskingPred, self).__init__(
             dataset,
             batch_size,
             shuffle,
             collate_fn=self.collate_fn,
             **kwargs)
-    
+
     def collate_fn(self, batches):
-        batchs = [self._transform(x) for x in batches]
-        return BatchMasking.from_data_list(batchs)
+        return self._transform(Batch.from_data_list(batches))
 
-class MaskAtom:
-    def __init__(self, num_atom_type, num_edge_type, mask_rate, mask_edge=True):
+class BatchMaskAtom:
+    def __init__(self, num_atom_type, num_edge_type, mask_rate, mask_edge=True, mask_num=0, attr_label=True):
         """
-        Randomly masks an atom, and optionally masks edges connecting to it.
-        The mask atom type index is num_possible_atom_type
-        The mask edge type index in num_possible_edge_type
+        Randomly masks atoms of every graph of a batch, and optionally masks
+        edges connecting to them.
+        The mask atom type index is num_possible_atom_type - 1
+        The mask edge type index in num_possible_edge_type - 1
         :param num_atom_type:
         :param num_edge_type:
-        :param mask_rate: % of atoms to be masked
+        :param mask_rate: % of atoms to be masked, at least one atom per graph
         :param mask_edge: If True, also mask the edges that connect to the
         masked atoms
+        :param mask_num: If positive, number of atoms to mask per graph (at
+        most half of the atoms) instead of mask_rate
+        :param attr_label: If True, add the one-hot labels of the masked atoms
+        and edges (node_attr_label and edge_attr_label)
         """
         self.num_atom_type = num_atom_type
         self.num_edge_type = num_edge_type
         self.mask_rate = mask_rate
         self.mask_edge = mask_edge
-        # self.num_chirality_tag = 3
-        # self.num_bond_direction = 3 
+        self.mask_num = mask_num
+        self.attr_label = attr_label
+
+    def sample_atoms(self, batch):
+        """
+        Sample distinct atoms of every graph with a single sort.
 
-    def __call__(self, input_data, masked_atom_indices=None):
+        :param batch: graph index of each node
+        :return: sorted indices of the masked atoms
+        """
+        num_atoms = torch.bincount(batch)
+        if self.mask_num == 0:
+            sample_size = (num_atoms * self.mask_rate + 1).long()
+        else:
+            sample_size = torch.clamp(num_atoms // 2, max=self.mask_num)
+        # random order of the atoms within each graph: graphs stay contiguous
+        # since the random keys are in [0, 1)
+        order = torch.argsort(batch.double() + torch.rand(batch.size(0), dtype=torch.double, device=batch.device))
+        ptr = torch.cumsum(num_atoms, dim=0) - num_atoms
+        rank = torch.arange(batch.size(0), device=batch.device) - ptr[batch[order]]
+        selected = order[rank < sample_size[batch[order]]]
+        return torch.sort(selected).values
+
+    def __call__(self, data, masked_atom_indices=None):
         """
 
-        :param data: pytorch geometric data object. Assume that the edge
-        ordering is the default pytorch geometric ordering, where the two
+        :param data: batch of pytorch geometric data objects. Assume that the
+        edge ordering is the default pytorch geometric ordering, where the two
         directions of a single edge occur in pairs.
         Eg. data.edge_index = tensor([[0, 1, 1, 2, 2, 3],
                                      [1, 0, 2, 1, 3, 2]])
+        The node and edge features are modified in place, so the batch must
+        not share them with the dataset (a freshly collated batch does not).
         :param masked_atom_indices: If None, then randomly samples num_atoms
-        * mask rate number of atom indices
-        Otherwise a list of atom idx that sets the atoms to be masked (for
+        * mask rate number of atom indices per graph
+        Otherwise a tensor of atom idx that sets the atoms to be masked (for
         debugging only)
-        :return: None, Creates new attributes in original data object:
-        data.mask_node_idx
+        :return: the batch, with new attributes:
+        data.masked_atom_indices
         data.mask_node_label
-        data.mask_edge_idx
+        data.node_attr_label
+        data.connected_edge_indices
         data.mask_edge_label
+        data.edge_attr_label
         """
-        data = copy.deepcopy(input_data)
-        if masked_atom_indices == None:
-            # sample x distinct atoms to be masked, based on mask rate. But
-            # will sample at least 1 atom
-            num_atoms = data.x.size()[0]
-            sample_size = int(num_atoms * self.mask_rate + 1)
-            masked_atom_indices = random.sample(range(num_atoms), sample_size)
+        if masked_atom_indices is None:
+            masked_atom_indices = self.sample_atoms(data.batch)
+        masked_atom_indices = torch.as_tensor(masked_atom_indices, dtype=torch.long, device=data.x.device)
 
         # create mask node label by copying atom feature of mask atom
-        mask_node_labels_list = []
-        for atom_idx in masked_atom_indices:
-            mask_node_labels_list.append(data.x[atom_idx].view(1, -1))
-        data.mask_node_label = torch.cat(mask_node_labels_list, dim=0)
-        data.masked_atom_indices = torch.tensor(masked_atom_indices)
+        data.mask_node_label = data.x[masked_atom_indices]
+        data.masked_atom_indices = masked_atom_indices
 
         # ----------- graphMAE -----------
-        atom_type = F.one_hot(data.mask_node_label[:, 0], num_classes=self.num_atom_type).float()
-        # atom_chirality = F.one_hot(data.mask_node_label[:, 1], num_classes=self.num_chirality_tag).float()
-        # data.node_attr_label = torch.cat((atom_type,atom_chirality), dim=1)
-        data.node_attr_label = atom_type
+        if self.attr_label:
+            data.node_attr_label = F.one_hot(data.mask_node_label[:, 0], num_classes=self.num_atom_type).float()
 
         # modify the original node feature of the masked node
-        for atom_idx in masked_atom_indices:
-            feat_dim = data.x[atom_idx].shape[0]
-            data.x[atom_idx] = torch.zeros(feat_dim)
-            data.x[atom_idx][0] = self.num_atom_type - 1
+        data.x[masked_atom_indices] = 0
+        data.x[masked_atom_indices, 0] = self.num_atom_type - 1
 
         if self.mask_edge:
-            # create mask edge labels by copying edge features of edges that are bonded to
-            # mask atoms
-            connected_edge_indices = []
-            for bond_idx, (u, v) in enumerate(data.edge_index.cpu().numpy().T):
-                for atom_idx in masked_atom_indices:
-                    if atom_idx in set((u, v)) and \
-                        bond_idx not in connected_edge_indices:
-                        connected_edge_indices.append(bond_idx)
-
-            if len(connected_edge_indices) > 0:
-                # create mask edge labels by copying bond features of the bonds connected to
-                # the mask atoms
-                mask_edge_labels_list = []
-                for bond_idx in connected_edge_indices[::2]: # because the
-                    # edge ordering is such that two directions of a single
-                    # edge occur in pairs, so to get the unique undirected
-                    # edge indices, we take every 2nd edge index from list
-                    mask_edge_labels_list.append(
-                        data.edge_attr[bond_idx].view(1, -1))
-
-                data.mask_edge_label = torch.cat(mask_edge_labels_list, dim=0)
-                # modify the original bond features of the bonds connected to the mask atoms
-                for bond_idx in connected_edge_indices:
-                    feat_dim = data.edge_attr[bond_idx].shape[0]
-                    data.edge_attr[bond_idx] = torch.zeros(feat_dim)
-                    data.edge_attr[bond_idx][0] = self.num_edge_type - 1
-                    # print('feat_dim', feat_dim, 'data.edge_attr[bond_idx].shape', data.edge_attr[bond_idx].shape)
-
-                data.connected_edge_indices = torch.tensor(
-                    connected_edge_indices[::2])
-            else:
-                data.mask_edge_label = torch.empty((0, 2)).to(torch.int64)
-                data.connected_edge_indices = torch.tensor(
-                    connected_edge_indices).to(torch.int64)
-
-            edge_type = F.one_hot(data.mask_edge_label[:, 0], num_classes=self.num_edge_type).float()
-            # bond_direction = F.one_hot(data.mask_edge_label[:, 1], num_classes=self.num_bond_direction).float()
-            data.edge_attr_label = edge_type
-            # data.edge_attr_label = edge_type
+            is_masked = torch.zeros(data.num_nodes, dtype=torch.bool, device=data.x.device)
+            is_masked[masked_atom_indices] = True
+            connected_edge_indices = torch.nonzero(
+                is_masked[data.edge_index[0]] | is_masked[data.edge_index[1]]
+            ).view(-1)
+            # the two directions of a single edge occur in pairs, so to get the
+            # unique undirected edge indices, we take every 2nd edge index
+            data.connected_edge_indices = connected_edge_indices[::2]
+            # create mask edge labels by copying bond features of the bonds connected to
+            # the mask atoms
+            data.mask_edge_label = data.edge_attr[data.connected_edge_indices]
+            if self.attr_label:
+                data.edge_attr_label = F.one_hot(data.mask_edge_label[:, 0], num_classes=self.num_edge_type).float()
+
+            # modify the original bond features of the bonds connected to the mask atoms
+            data.edge_attr[connected_edge_indices] = 0
+            data.edge_attr[connected_edge_indices, 0] = self.num_edge_type - 1
 
         return data
 
     def __repr__(self):
-        return '{}(num_atom_type={}, num_edge_type={}, mask_rate={}, mask_edge={})'.format(
+        return '{}(num_atom_type={}, num_edge_type={}, mask_rate={}, mask_edge={}, mask_num={})'.format(
             self.__class__.__name__, self.num_atom_type, self.num_edge_type,
-            self.mask_rate, self.mask_edge)
-
-class BatchMasking(Data):
-    r"""A plain old python object modeling a batch of graphs as one big
-    (dicconnected) graph. With :class:`torch_geometric.data.Data` being the
-    base class, all its methods can also be used here.
-    In addition, single graphs can be reconstructed via the assignment vector
-    :obj:`batch`, which maps each node to its respective graph identifier.
-    """
-
-    def __init__(self, batch=None, **kwargs):
-        super(BatchMasking, self).__init__(**kwargs)
-        self.batch = batch
-
-    @staticmethod
-    def from_data_list(data_list):
-        r"""Constructs a batch object from a python list holding
-        :class:`torch_geometric.data.Data` objects.
-        The assignment vector :obj:`batch` is created on the fly."""
-        keys = [set(data.keys()) for data in data_list]
-        keys = list(set.union(*keys))
-        assert 'batch' not in keys
-
-        batch = BatchMasking()
-
-        for key in keys:
-            batch[key] = []
-        batch.batch = []
-
-        cumsum_node = 0
-        cumsum_edge = 0
-
-        for i, data in enumerate(data_list):
-            num_nodes = data.num_nodes
-            batch.batch.append(torch.full((num_nodes, ), i, dtype=torch.long))
-            for key in data.keys():
-                item = data[key]
-                if key in ['edge_index', 'masked_atom_indices']:
-                    item = item + cumsum_node
-                elif key  == 'connected_edge_indices':
-                    item = item + cumsum_edge
-                batch[key].append(item)
-
-            cumsum_node += num_nodes
-            cumsum_edge += data.edge_index.shape[1]
-
-        for key in keys:
-            batch[key] = torch.cat(
-                batch[key], dim=data_list[0].__cat_dim__(key, batch[key][0]))
-        batch.batch = torch.cat(batch.batch, dim=-1)
-        return batch.contiguous()
-
-    def cumsum(self, key, item):
-        r"""If :obj:`True`, the attribute :obj:`key` with content :obj:`item`
-        should be added up cumulatively before concatenated together.
-        .. note::
-            This method is for internal use only, and should only be overridden
-            if the batch concatenation process is corrupted for a specific data
-            attribute.
-        """
-        return key in ['edge_index', 'face', 'masked_atom_indices', 'connected_edge_indices']
-
-    @property
-    def num_graphs(self):
-        """Returns the number of graphs in the batch."""
-        return self.batch[-1].item() + 1
+            self.mask_rate, self.mask_edge, self.mask_num)
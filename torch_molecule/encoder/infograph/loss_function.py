@@ -5,27 +5,34 @@ import math
 
 def local_global_loss_(l_enc, g_enc, batch, measure):
     '''
+    Scores every node against every graph of the batch: a node and its own graph
+    form a positive pair, the node and any other graph a negative pair. Positive
+    scores are gathered with ``batch`` and positive pairs are zeroed in the score
+    matrix with a scatter, so no node x graph masks are built and the loss runs on
+    the device of the inputs.
+
     Args:
-        l: Local feature map.
-        g: Global features.
+        l_enc: Local (node) features of shape [num_nodes, hidden_size].
+        g_enc: Global (graph) features of shape [num_graphs, hidden_size].
+        batch: Graph index of each node.
         measure: Type of f-divergence. For use with mode `fd`
     Returns:
         torch.Tensor: Loss.
     '''
     num_graphs = g_enc.shape[0]
     num_nodes = l_enc.shape[0]
-
-    pos_mask = torch.zeros((num_nodes, num_graphs)).cuda()
-    neg_mask = torch.ones((num_nodes, num_graphs)).cuda()
-    for nodeidx, graphidx in enumerate(batch):
-        pos_mask[nodeidx][graphidx] = 1.
-        neg_mask[nodeidx][graphidx] = 0.
+    batch = batch.view(-1, 1)
 
     res = torch.mm(l_enc, g_enc.t())
+    pos_scores = res.gather(1, batch)
+    neg_scores = res.scatter(1, batch, 0.)
 
-    E_pos = get_positive_expectation(res * pos_mask, measure, average=False).sum()
+    # scores of the negative pairs count as zeros in the positive expectation
+    zero = res.new_zeros(())
+    E_pos = get_positive_expectation(pos_scores, measure, average=False).sum()
+    E_pos = E_pos + num_nodes * (num_graphs - 1) * get_positive_expectation(zero, measure, average=False)
     E_pos = E_pos / num_nodes
-    E_neg = get_negative_expectation(res * neg_mask, measure, average=False).sum()
+    E_neg = get_negative_expectation(neg_scores, measure, average=False).sum()
     E_neg = E_neg / (num_nodes * (num_graphs - 1))
 
     return E_neg - E_pos
@@ -9,7 +9,7 @@ from torch_geometric.data import Data
 from .model import GNN
 from ..constant import GNN_ENCODER_MODELS, GNN_ENCODER_READOUTS, GNN_ENCODER_PARAMS
 from ...base import BaseMolecularEncoder
-from ...utils import graph_from_smiles
+from ...utils import graphs_from_smiles
 
 ALLOWABLE_ENCODER_MODELS = GNN_ENCODER_MODELS
 ALLOWABLE_ENCODER_READOUTS = GNN_ENCODER_READOUTS
@@ -62,6 +62,10 @@ class InfoGraphMolecularEncoder(BaseMolecularEncoder):
         Device to run the model on (CPU or GPU).
     model_name : str, default="InfoGraphMolecularEncoder"
         Name identifier for the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -84,8 +88,9 @@ class InfoGraphMolecularEncoder(BaseMolecularEncoder):
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "InfoGraphMolecularEncoder",
         verbose: str = "none", 
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.lw_prior = lw_prior
         self.embedding_dim = embedding_dim
@@ -147,17 +152,16 @@ class InfoGraphMolecularEncoder(BaseMolecularEncoder):
     def _convert_to_pytorch_data(self, X):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs, preparing data for training...")
-            iterator = enumerate(X)
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, None,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            graph = graph_from_smiles(smiles_or_mol, None)
+        for idx, graph in enumerate(graphs):
             g = Data()
             g.num_nodes = graph["num_nodes"]
             g.edge_index = torch.from_numpy(graph["edge_index"])
@@ -221,7 +225,7 @@ class InfoGraphMolecularEncoder(BaseMolecularEncoder):
             train_dataset,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=0
+            **self._loader_kwargs()
         )
         self.fitting_loss = []
 
@@ -256,7 +260,7 @@ class InfoGraphMolecularEncoder(BaseMolecularEncoder):
         losses = []
 
         for step, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
             local_global_loss, prior_loss = self.model.compute_loss(batch, self.lw_prior)
             loss = local_global_loss + prior_loss
@@ -293,14 +297,14 @@ class InfoGraphMolecularEncoder(BaseMolecularEncoder):
         Returns
         -------
         representations : ndarray or torch.Tensor
-            Molecular representations
+            Molecular representations. Rows of invalid SMILES strings are NaN.
         """
         self._check_is_fitted()
 
         # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X, return_rdkit_mol=True)
+        X, valid = self._validate_inputs_tolerant(X, return_rdkit_mol=True)
         dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False, **self._loader_kwargs())
 
         if self.model is None:
             raise RuntimeError("Model not initialized")
@@ -311,10 +315,10 @@ class InfoGraphMolecularEncoder(BaseMolecularEncoder):
         encodings = []
         with torch.no_grad():
             for batch in tqdm(loader, disable=self.verbose != "progress_bar"):
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 encodings.append(out["graph"].cpu())
 
         # Concatenate and convert to requested format
-        encodings = torch.cat(encodings, dim=0)
+        encodings = self._fill_invalid(torch.cat(encodings, dim=0), valid)
         return encodings if return_type == "pt" else encodings.numpy()
\ No newline at end of file
@@ -7,6 +7,7 @@ from ...utils import init_weights
 
 from .utils import get_mask_indices, get_fingerprint_loss
 from ...utils.graph.features import allowable_features
+from ...utils.graph.fingerprints import unpack_fingerprints, FINGERPRINT_NUM_BITS
 
 class_criterion = torch.nn.CrossEntropyLoss()
 
@@ -80,12 +81,12 @@ class GNN(nn.Module):
 
     def compute_loss(self, batched_data):
         masked_node_indices = get_mask_indices(batched_data, self.mask_rate)
-        batched_data.masked_node_indices = torch.tensor(masked_node_indices)
+        batched_data.masked_node_indices = masked_node_indices
         batched_data.y = batched_data.x[masked_node_indices][:, 0]
 
         # mask nodes' features
-        for node_idx in masked_node_indices:
-            batched_data.x[node_idx] = torch.tensor([self.mask_atom_id - 1] + [0] * (batched_data.x.shape[1] - 1))
+        batched_data.x[masked_node_indices] = 0
+        batched_data.x[masked_node_indices, 0] = self.mask_atom_id - 1
     
         # generate predictions
         h_node, _ = self.graph_encoder(batched_data)
@@ -96,7 +97,8 @@ class GNN(nn.Module):
         # target_class = batched_data.y.to(torch.float32)
         loss_class = class_criterion(prediction_class.to(torch.float32), batched_data.y.long())
         
-        fingerprint_loss = get_fingerprint_loss(batched_data.smiles, h_rep)
+        fingerprints = unpack_fingerprints(batched_data.rdkit_fp, FINGERPRINT_NUM_BITS["rdkit"])
+        fingerprint_loss = get_fingerprint_loss(fingerprints, h_rep)
                 
         loss = self.lw_rec * loss_class + (1 - self.lw_rec) * fingerprint_loss
 
@@ -8,9 +8,12 @@ from torch_geometric.loader import DataLoader
 from torch_geometric.data import Data
 
 from .model import GNN
+from .utils import get_motif_assignment
 from ..constant import GNN_ENCODER_MODELS, GNN_ENCODER_READOUTS, GNN_ENCODER_PARAMS
 from ...base import BaseMolecularEncoder
-from ...utils import graph_from_smiles
+from ...utils import graphs_from_smiles
+from ...utils.molecule import to_mol
+from ...utils.graph.fingerprints import fingerprint_matrix
 
 ALLOWABLE_ENCODER_MODELS = GNN_ENCODER_MODELS
 ALLOWABLE_ENCODER_READOUTS = GNN_ENCODER_READOUTS
@@ -64,6 +67,10 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
         Device to run the model on (CPU or GPU).
     model_name : str, default="MoamaMolecularEncoder"
         Name identifier for the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -87,8 +94,9 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "MoamaMolecularEncoder",
         verbose: str = "none", 
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.mask_rate = mask_rate
         self.lw_rec = lw_rec
@@ -145,20 +153,22 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
             
         return params
         
-    def _convert_to_pytorch_data(self, X):
+    def _convert_to_pytorch_data(self, X, with_motifs=False):
         """Convert numpy arrays to PyTorch Geometric data format.
+
+        With ``with_motifs``, the BRICS motifs and the RDKit fingerprint used by the
+        pretraining losses are computed once and stored on each graph.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs, preparing data for training...")
-            iterator = enumerate(X)
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, None,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            graph = graph_from_smiles(smiles_or_mol, None)
+        for idx, graph in enumerate(graphs):
             g = Data()
             g.num_nodes = graph["num_nodes"]
             g.edge_index = torch.from_numpy(graph["edge_index"])
@@ -176,6 +186,16 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
 
             pyg_graph_list.append(g)
 
+        if with_motifs:
+            mols = [to_mol(mol) for mol in X]
+            fingerprints = torch.from_numpy(fingerprint_matrix(mols, "rdkit"))
+            for g, mol, fingerprint in zip(pyg_graph_list, mols, fingerprints):
+                motif, motif_keep, num_motifs = get_motif_assignment(mol)
+                g.motif = torch.from_numpy(motif)
+                g.motif_keep = torch.from_numpy(motif_keep)
+                g.num_motifs = torch.tensor([num_motifs])
+                g.rdkit_fp = fingerprint.unsqueeze(0)
+
         return pyg_graph_list
     
     def _setup_optimizers(self) -> Tuple[torch.optim.Optimizer, Optional[Any]]:
@@ -218,16 +238,13 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
         optimizer, scheduler = self._setup_optimizers()
         
         # Prepare datasets and loaders
-        smiles = X_train
         X_train, _ = self._validate_inputs(X_train, return_rdkit_mol=True)
-        train_dataset = self._convert_to_pytorch_data(X_train)
-        for i in range(len(X_train)):
-            train_dataset[i].smiles = smiles[i]
+        train_dataset = self._convert_to_pytorch_data(X_train, with_motifs=True)
         train_loader = DataLoader(
             train_dataset,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=0
+            **self._loader_kwargs()
         )
         self.fitting_loss = []
 
@@ -265,7 +282,7 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
         losses = []
 
         for step, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
             loss = self.model.compute_loss(batch)
             loss.backward()
@@ -301,14 +318,14 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
         Returns
         -------
         representations : ndarray or torch.Tensor
-            Molecular representations
+            Molecular representations. Rows of invalid SMILES strings are NaN.
         """
         self._check_is_fitted()
 
         # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X, return_rdkit_mol=True)
+        X, valid = self._validate_inputs_tolerant(X, return_rdkit_mol=True)
         dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False, **self._loader_kwargs())
 
         if self.model is None:
             raise RuntimeError("Model not initialized")
@@ -319,10 +336,10 @@ class MoamaMolecularEncoder(BaseMolecularEncoder):
         encodings = []
         with torch.no_grad():
             for batch in tqdm(loader, disable=self.verbose != "progress_bar"):
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 encodings.append(out["graph"].cpu())
 
         # Concatenate and convert to requested format
-        encodings = torch.cat(encodings, dim=0)
+        encodings = self._fill_invalid(torch.cat(encodings, dim=0), valid)
         return encodings if return_type == "pt" else encodings.numpy()
\ No newline at end of file
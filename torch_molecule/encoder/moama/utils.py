@@ -1,60 +1,113 @@
+import numpy as np
 import torch
-import random
-import torch.nn as nn
-from rdkit import Chem, DataStructs
+from rdkit import Chem
 from rdkit.Chem import BRICS
 
-def get_fingerprint_loss(smiles, h_rep):
-    cos = nn.CosineSimilarity(dim=0, eps=1e-6)
-    fingerprint_list = [Chem.RDKFingerprint(Chem.MolFromSmiles(x)) for x in smiles]
-    fingerprint_loss = 0
-    
-    for i in range(len(h_rep)):
-        for j in range(len(h_rep)-i-1):
-            finger_sim = DataStructs.FingerprintSimilarity(fingerprint_list[i], fingerprint_list[i+j+1]) #* 10
-            emb_sim = (cos(h_rep[i], h_rep[i+j+1]) + 1)/2
-            fingerprint_loss += (finger_sim - emb_sim)**2
+def get_fingerprint_loss(fingerprints, h_rep):
+    """Squared difference between the Tanimoto similarities of the fingerprints and
+    the (rescaled) cosine similarities of the representations, summed over pairs.
 
-    return fingerprint_loss
+    Args:
+        fingerprints: 0/1 fingerprints of shape [batch_size, num_bits]
+        h_rep: graph representations of shape [batch_size, hidden_size]
+    """
+    fingerprints = fingerprints.to(h_rep.dtype)
+    intersection = fingerprints @ fingerprints.t()
+    counts = fingerprints.sum(dim=1)
+    union = counts.unsqueeze(0) + counts.unsqueeze(1) - intersection
+    finger_sim = torch.where(union > 0, intersection / union.clamp(min=1), torch.zeros_like(union))
+
+    h_norm = h_rep / h_rep.norm(dim=1, keepdim=True).clamp(min=1e-6)
+    emb_sim = (h_norm @ h_norm.t() + 1) / 2
+
+    pairs = torch.triu_indices(len(h_rep), len(h_rep), offset=1, device=h_rep.device)
+    diff = (finger_sim - emb_sim)[pairs[0], pairs[1]]
+    return (diff ** 2).sum()
+
+def get_motif_assignment(mol):
+    """Assign the atoms of a molecule to its BRICS motifs.
+
+    Atoms are ordered by index within each motif. In motifs of more than 9 atoms,
+    every 6th atom is not masked together with its motif.
+
+    Returns:
+        motif: motif index of each atom (-1 for atoms without motif)
+        motif_keep: whether each atom is masked with its motif
+        num_motifs: number of motifs
+    """
+    motifs_list, _ = get_motifs_edges(mol)
+    motif = np.full(mol.GetNumAtoms(), -1, dtype=np.int64)
+    motif_keep = np.ones(mol.GetNumAtoms(), dtype=bool)
+    for i, atoms in enumerate(motifs_list):
+        atoms = sorted(atoms)
+        motif[atoms] = i
+        if len(atoms) > 9:
+            motif_keep[atoms[5::6]] = False
+    return motif, motif_keep, len(motifs_list)
+
+def _rank_in_groups(group, valid):
+    """Random rank of each valid element within its group (invalid elements rank last)."""
+    keys = group.double() + torch.rand(group.size(0), dtype=torch.double, device=group.device)
+    keys = torch.where(valid, keys, keys.new_full(keys.shape, float("inf")))
+    order = torch.argsort(keys)
+    num_groups = int(group.max()) + 1 if group.numel() > 0 else 0
+    counts = torch.bincount(group[valid], minlength=num_groups)
+    ptr = torch.cumsum(counts, dim=0) - counts
+    rank = torch.empty_like(order)
+    rank[order] = torch.arange(order.size(0), device=group.device)
+    return torch.where(valid, rank - ptr[group], torch.full_like(rank, order.size(0)))
 
 def get_mask_indices(batched_data, mask_rate=0.15):
-    masked_node_indices_full = list()
-    offset = 0
-    
-    for i in range(len(batched_data)):
-        masked_node_indices = list()
-        data = batched_data[i]
-        mol = Chem.MolFromSmiles(data.smiles)
-        motifs_list, edges = get_motifs_edges(mol)
-        random.shuffle(motifs_list)
-        num_atoms = mol.GetNumAtoms()
-        sample_size = int(num_atoms * mask_rate + 1)
-        
-        for motif in motifs_list:
-            edge_index_mask = sum(data.edge_index[0]==x for x in motif).bool()
-            neigh = torch.masked_select(data.edge_index[1], edge_index_mask)
-
-            if any(x in neigh for x in masked_node_indices):
-                continue
-
-            if len(masked_node_indices) + len(motif) > sample_size:
-                break
-            if len(motif) > 9:
-                del motif[5::6]
-            for atom in motif:
-                masked_node_indices.append(atom + offset)
-            
-        atom_candidates = [x for x in range(0, num_atoms) if x not in masked_node_indices]
-        random.shuffle(atom_candidates)
-        if len(masked_node_indices) < sample_size:
-            for atom in atom_candidates[:sample_size-len(masked_node_indices)]:
-                masked_node_indices.append(atom + offset)
-                
-        offset += num_atoms
-            
-        masked_node_indices_full += masked_node_indices
-
-    return masked_node_indices_full
+    """Sample atoms to mask, by whole motifs first and then by single atoms.
+
+    Motifs of each graph are visited in random order, all graphs of the batch at
+    once. A motif is skipped if it neighbors a masked atom, and the visit of a graph
+    stops when its next motif would exceed int(num_atoms * mask_rate + 1) atoms. The
+    remaining budget is filled with random atoms. Motifs are read from the
+    precomputed ``motif``/``motif_keep``/``num_motifs`` attributes of the batch.
+    """
+    batch, edge_index = batched_data.batch, batched_data.edge_index
+    device = batch.device
+    num_graphs = batched_data.num_graphs
+    num_atoms = torch.bincount(batch, minlength=num_graphs)
+    sample_size = (num_atoms * mask_rate + 1).long()
+
+    # global motif index of each atom
+    num_motifs = batched_data.num_motifs.view(-1)
+    motif_ptr = torch.cumsum(num_motifs, dim=0) - num_motifs
+    has_motif = batched_data.motif >= 0
+    motif = torch.where(has_motif, batched_data.motif + motif_ptr[batch], torch.full_like(batch, -1))
+    total_motifs = int(num_motifs.sum())
+    motif_graph = torch.repeat_interleave(torch.arange(num_graphs, device=device), num_motifs)
+    motif_size = torch.bincount(motif[has_motif], minlength=total_motifs)
+    motif_rank = _rank_in_groups(motif_graph, torch.ones_like(motif_graph, dtype=torch.bool))
+
+    masked = torch.zeros(batch.size(0), dtype=torch.bool, device=device)
+    num_masked = torch.zeros(num_graphs, dtype=torch.long, device=device)
+    active = torch.ones(num_graphs, dtype=torch.bool, device=device)
+    max_motifs = int(num_motifs.max()) if num_graphs > 0 else 0
+    for step in range(max_motifs):
+        current = (motif_rank == step) & active[motif_graph]
+        if not current.any():
+            break
+        # skip motifs with an atom bonded to a masked atom
+        in_current = has_motif & current[motif.clamp(min=0)]
+        edge_conflict = in_current[edge_index[0]] & masked[edge_index[1]]
+        conflict = torch.zeros(total_motifs, dtype=torch.bool, device=device)
+        conflict[motif[edge_index[0, edge_conflict]]] = True
+        candidate = current & ~conflict
+        # stop graphs whose budget would be exceeded
+        overflow = candidate & (num_masked[motif_graph] + motif_size > sample_size[motif_graph])
+        active[motif_graph[overflow]] = False
+        selected = candidate & ~overflow
+        new_atoms = has_motif & selected[motif.clamp(min=0)] & batched_data.motif_keep
+        masked |= new_atoms
+        num_masked += torch.bincount(batch[new_atoms], minlength=num_graphs)
+
+    # fill the budget with random atoms
+    rank = _rank_in_groups(batch, ~masked)
+    masked |= rank < (sample_size - num_masked)[batch]
+    return torch.nonzero(masked).view(-1)
 
 def get_motifs_edges(data):
     Chem.SanitizeMol(data)
@@ -95,6 +95,10 @@ class HFPretrainedMolecularEncoder(BaseMolecularEncoder):
         Device to run the model on (CPU or GPU).
     model_name : str, default="HFPretrainedMolecularEncoder"
         Name identifier for the model instance.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
 
     def __init__(
@@ -107,8 +111,9 @@ class HFPretrainedMolecularEncoder(BaseMolecularEncoder):
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "HFPretrainedMolecularEncoder",
         verbose: str = "none", 
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.repo_id = repo_id
         self.max_length = max_length
@@ -208,12 +213,12 @@ class HFPretrainedMolecularEncoder(BaseMolecularEncoder):
         Returns
         -------
         representations : ndarray or torch.Tensor
-            Molecular representations
+            Molecular representations. Rows of invalid SMILES strings are NaN.
         """
         self._require_transformers()
         self._check_is_fitted()
-        X, _ = self._validate_inputs(X, return_rdkit_mol=False)
-        
+        X, valid = self._validate_inputs_tolerant(X, return_rdkit_mol=False)
+
         # Process in batches
         all_embeddings = []
         if self.verbose == "progress_bar" or self.verbose == "print_statement":
@@ -258,7 +263,7 @@ class HFPretrainedMolecularEncoder(BaseMolecularEncoder):
             all_embeddings.append(batch_embeddings)
         
         # Concatenate all batch embeddings
-        embeddings = torch.cat(all_embeddings, dim=0)
+        embeddings = self._fill_invalid(torch.cat(all_embeddings, dim=0), valid)
         
         return embeddings if return_type == "pt" else embeddings.cpu().numpy()
 
@@ -9,7 +9,7 @@ from torch_geometric.data import Data
 from .model import GNN
 from ..constant import GNN_ENCODER_MODELS, GNN_ENCODER_READOUTS, GNN_ENCODER_PARAMS
 from ...base import BaseMolecularEncoder
-from ...utils import graph_from_smiles
+from ...utils import graphs_from_smiles
 from ...utils import PSEUDOTASK
 
 ALLOWABLE_ENCODER_MODELS = GNN_ENCODER_MODELS
@@ -58,6 +58,10 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
         Device to use for computation. Inherited from BaseMolecularEncoder.
     model_name : str, default="SupervisedMolecularEncoder"
         Name of the model. Inherited from BaseMolecularEncoder.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -80,8 +84,9 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "SupervisedMolecularEncoder",
         verbose: str = "none", 
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.num_task = num_task
         self.predefined_task = predefined_task
@@ -164,21 +169,16 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs, preparing data for training...")
-            iterator = enumerate(X)
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, y, augmented_properties=self.predefined_task,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            if y is not None:
-                properties = y[idx]
-            else: 
-                properties = None
-            graph = graph_from_smiles(smiles_or_mol, properties, augmented_properties = self.predefined_task)
+        for idx, graph in enumerate(graphs):
             g = Data()
             g.num_nodes = graph["num_nodes"]
             g.edge_index = torch.from_numpy(graph["edge_index"])
@@ -199,11 +199,11 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
                 del graph["y"]
    
             if graph["morgan"] is not None:
-                g.morgan = torch.tensor(graph["morgan"], dtype=torch.int8).view(1, -1)
+                g.morgan = torch.from_numpy(graph["morgan"]).view(1, -1)
                 del graph["morgan"]
             
             if graph["maccs"] is not None:
-                g.maccs = torch.tensor(graph["maccs"], dtype=torch.int8).view(1, -1)
+                g.maccs = torch.from_numpy(graph["maccs"]).view(1, -1)
                 del graph["maccs"]
 
             pyg_graph_list.append(g)
@@ -267,7 +267,7 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
             train_dataset,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=0
+            **self._loader_kwargs()
         )
         self.fitting_loss = []
         if user_defined_task > 0:
@@ -318,7 +318,7 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
         losses = []
 
         for batch in train_loader:
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
             loss = self.model.compute_loss(batch, is_class)
             loss.backward()
@@ -353,14 +353,14 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
         Returns
         -------
         representations : ndarray or torch.Tensor
-            Molecular representations
+            Molecular representations. Rows of invalid SMILES strings are NaN.
         """
         self._check_is_fitted()
 
         # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X, return_rdkit_mol=True)
+        X, valid = self._validate_inputs_tolerant(X, return_rdkit_mol=True)
         dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False, **self._loader_kwargs())
 
         if self.model is None:
             raise RuntimeError("Model not initialized")
@@ -371,10 +371,10 @@ class SupervisedMolecularEncoder(BaseMolecularEncoder):
         encodings = []
         with torch.no_grad():
             for batch in tqdm(loader, disable=not self.verbose):
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 encodings.append(out["graph"].cpu())
 
         # Concatenate and convert to requested format
-        encodings = torch.cat(encodings, dim=0)
+        encodings = self._fill_invalid(torch.cat(encodings, dim=0), valid)
         return encodings if return_type == "pt" else encodings.numpy()
\ No newline at end of file
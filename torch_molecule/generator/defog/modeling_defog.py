@@ -15,7 +15,7 @@ from .flow_matching import NoiseDistribution, TimeDistorter, p_xt_g_x1, RateMatr
 from .extra_features import ExtraFeatures
 
 from ...base import BaseMolecularGenerator
-from ...utils import graph_from_smiles, graph_to_smiles
+from ...utils import graphs_from_smiles, graph_to_smiles
 
 class DeFoGMolecularGenerator(BaseMolecularGenerator):
     """
@@ -88,6 +88,10 @@ class DeFoGMolecularGenerator(BaseMolecularGenerator):
         Device to run the model on (CPU or GPU)
     model_name : str, default="DeFoGMolecularGenerator"
         Name identifier for the model
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
 
     def __init__(
@@ -119,8 +123,9 @@ class DeFoGMolecularGenerator(BaseMolecularGenerator):
         *,
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "DeFoGMolecularGenerator",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
 
         # Defaults for dict/list parameters
         if hidden_mlp_dims is None:
@@ -240,19 +245,17 @@ class DeFoGMolecularGenerator(BaseMolecularGenerator):
 
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert numpy arrays to PyTorch Geometric data format."""
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs, preparing data for training...")
-            iterator = enumerate(X)
-        else:
-            iterator = enumerate(X)
+        # For unconditional models, properties should be None
+        graphs = graphs_from_smiles(
+            X, y if len(self.task_type) > 0 else None,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            # For unconditional models, properties should be None
-            properties = y[idx] if y is not None and len(self.task_type) > 0 else None
-            graph = graph_from_smiles(smiles_or_mol, properties)
+        for idx, graph in enumerate(graphs):
             g = Data()
             
             node_type = torch.from_numpy(graph['node_feat'][:, 0] - 1)
@@ -398,7 +401,9 @@ class DeFoGMolecularGenerator(BaseMolecularGenerator):
 
         optimizer, scheduler = self._setup_optimizers()
         train_dataset = self._convert_to_pytorch_data(X_train, y_train)
-        train_loader = DataLoader(train_dataset, batch_size=self.batch_size, shuffle=True)
+        train_loader = self._make_bucketed_loader(
+            DataLoader, train_dataset, [data.num_nodes for data in train_dataset], shuffle=True, padded=True
+        )
 
         # Calculate total steps for global progress bar
         total_steps = self.epochs * len(train_loader)
@@ -425,7 +430,7 @@ class DeFoGMolecularGenerator(BaseMolecularGenerator):
 
         active_index = self.dataset_info["active_index"]
         for batched_data in train_loader:
-            batched_data = batched_data.to(self.device)
+            batched_data = self._to_device(batched_data)
             optimizer.zero_grad()
             
             data_x = F.one_hot(batched_data.x, num_classes=118).float()[:, active_index]
@@ -624,7 +629,7 @@ class DeFoGMolecularGenerator(BaseMolecularGenerator):
             edge_types = E_final[i, :n, :n].cpu()
             molecule_list.append([atom_types, edge_types])
             
-        return graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"])
+        return graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"], n_jobs=self.n_jobs)
 
     def _sample_step(self, t, s, X_t, E_t, y_t, node_mask):
         dt = (s - t)[0]
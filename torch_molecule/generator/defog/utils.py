@@ -5,6 +5,7 @@ import torch_geometric.utils
 from torch_geometric.utils import to_dense_adj, to_dense_batch
 import torch
 from rdkit import Chem
+from ...utils.molecule import to_mol
 
 
 
@@ -166,10 +167,7 @@ def compute_dataset_info(smiles_or_mol_list, cache_path=None):
     n_atoms_per_mol_count = {}
     max_node = 0
     for i, sms_or_mol in enumerate(smiles_or_mol_list):
-        if isinstance(sms_or_mol, str):
-            mol = Chem.MolFromSmiles(sms_or_mol)
-        else:
-            mol = sms_or_mol
+        mol = to_mol(sms_or_mol)
 
         n_atom = mol.GetNumHeavyAtoms()
         n_bond = mol.GetNumBonds()
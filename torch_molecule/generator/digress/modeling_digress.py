@@ -12,7 +12,7 @@ from .utils import PlaceHolder, to_dense, compute_dataset_info
 from .diffusion import NoiseScheduleDiscrete, MarginalTransition, sample_discrete_features, sample_discrete_feature_noise, compute_batched_over0_posterior_distribution
 
 from ...base import BaseMolecularGenerator
-from ...utils import graph_from_smiles, graph_to_smiles
+from ...utils import graphs_from_smiles, graph_to_smiles, BucketBatchSampler
 
 class DigressMolecularGenerator(BaseMolecularGenerator):
     """
@@ -64,6 +64,10 @@ class DigressMolecularGenerator(BaseMolecularGenerator):
         Device to use for computation (cuda/cpu)
     model_name : str, optional
         Name of the model, defaults to "DigressMolecularGenerator"
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -85,12 +89,14 @@ class DigressMolecularGenerator(BaseMolecularGenerator):
         scheduler_patience: int = 5, 
         verbose: str = "none", 
         device: Optional[Union[torch.device, str]] = None, 
-        model_name: str = "DigressMolecularGenerator"
+        model_name: str = "DigressMolecularGenerator",
+        **kwargs,
     ):
         super().__init__(
             device=device,
             model_name=model_name,
             verbose=verbose,
+            **kwargs,
         )
         
         self.hidden_size_X = hidden_size_X
@@ -151,21 +157,16 @@ class DigressMolecularGenerator(BaseMolecularGenerator):
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs, preparing data for training...")
-            iterator = enumerate(X)
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, y,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            if y is not None:
-                properties = y[idx]
-            else: 
-                properties = None
-            graph = graph_from_smiles(smiles_or_mol, properties)
+        for idx, graph in enumerate(graphs):
             g = Data()
             
             # No H, first heavy atom has type 0
@@ -278,18 +279,15 @@ class DigressMolecularGenerator(BaseMolecularGenerator):
 
     def fit(self, X_train: List[str]) -> "DigressMolecularGenerator":
         num_task = 0 if self.input_dim_y is None else self.input_dim_y
-        X_train, _ = self._validate_inputs(X_train, num_task=num_task, return_rdkit_mol=False)
+        X_train, _ = self._validate_inputs(X_train, num_task=num_task)
         self._setup_diffusion_params(X_train)
         self._initialize_model(self.model_class)
         self.model.initialize_parameters()
 
         optimizer, scheduler = self._setup_optimizers()
         train_dataset = self._convert_to_pytorch_data(X_train)
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0
+        train_loader = self._make_bucketed_loader(
+            DataLoader, train_dataset, [data.num_nodes for data in train_dataset], shuffle=True, padded=True
         )
 
         # Calculate total steps for global progress bar
@@ -354,13 +352,15 @@ class DigressMolecularGenerator(BaseMolecularGenerator):
         losses = []
         
         active_index = self.dataset_info["active_index"]
+        # bucketed batches are padded to their largest molecule instead of max_node
+        max_num_nodes = None if isinstance(train_loader.batch_sampler, BucketBatchSampler) else self.max_node
         for step, batched_data in enumerate(train_loader):
-            batched_data = batched_data.to(self.device)
+            batched_data = self._to_device(batched_data)
             optimizer.zero_grad()
 
             data_x = F.one_hot(batched_data.x, num_classes=118).float()[:, active_index]
             data_edge_attr = F.one_hot(batched_data.edge_attr, num_classes=5).float()
-            dense_data, node_mask = to_dense(data_x, batched_data.edge_index, data_edge_attr, batched_data.batch, self.max_node)
+            dense_data, node_mask = to_dense(data_x, batched_data.edge_index, data_edge_attr, batched_data.batch, max_num_nodes)
             dense_data = dense_data.mask(node_mask)
             X, E = dense_data.X, dense_data.E
             noisy_data = self.apply_noise(X, E, batched_data.y, node_mask)
@@ -499,7 +499,7 @@ class DigressMolecularGenerator(BaseMolecularGenerator):
             edge_types = E[i, :n, :n].cpu()
             molecule_list.append([atom_types, edge_types])
 
-        smiles_list = graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"])
+        smiles_list = graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"], n_jobs=self.n_jobs)
         return smiles_list
 
     def sample_p_zs_given_zt(
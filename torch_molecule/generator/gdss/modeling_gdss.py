@@ -14,7 +14,7 @@ from .model import GDSSModel, get_sde_loss_fn
 from .utils import compute_dataset_info, to_dense, quantize_mol
 
 from ...base import BaseMolecularGenerator
-from ...utils import graph_from_smiles, graph_to_smiles
+from ...utils import graphs_from_smiles, graph_to_smiles
 
 class GDSSMolecularGenerator(BaseMolecularGenerator):
     """This generator implements "Score-based Generative Modeling of Graphs via the System of Stochastic Differential Equations"
@@ -91,6 +91,10 @@ class GDSSMolecularGenerator(BaseMolecularGenerator):
         Device to use for computation (cuda/cpu)
     model_name : str, optional
         Name of the model, defaults to "GDSSMolecularGenerator"
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
         
     """
     def __init__(
@@ -127,12 +131,14 @@ class GDSSMolecularGenerator(BaseMolecularGenerator):
         sampler_noise_removal: bool = True, 
         verbose: str = "none", 
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "GDSSMolecularGenerator"
+        model_name: str = "GDSSMolecularGenerator",
+        **kwargs,
     ):
         super().__init__(
             device=device,
             model_name=model_name,
             verbose=verbose,
+            **kwargs,
         )
         
         self.num_layer = num_layer
@@ -219,21 +225,16 @@ class GDSSMolecularGenerator(BaseMolecularGenerator):
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs, preparing data for training")
-            iterator = enumerate(X)
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, y,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            if y is not None:
-                properties = y[idx]
-            else: 
-                properties = None
-            graph = graph_from_smiles(smiles_or_mol, properties)
+        for idx, graph in enumerate(graphs):
             g = Data()
             
             # No H, first heavy atom has type 0
@@ -387,11 +388,9 @@ class GDSSMolecularGenerator(BaseMolecularGenerator):
 
         optimizer, scheduler = self._setup_optimizers()
         train_dataset = self._convert_to_pytorch_data(X_train)
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0
+        # the model works on graphs padded to max_node, so bucketing only bounds the atoms per batch
+        train_loader = self._make_bucketed_loader(
+            DataLoader, train_dataset, [data.num_nodes for data in train_dataset], shuffle=True, padded=False
         )
 
         # Calculate total steps for global progress bar
@@ -457,7 +456,7 @@ class GDSSMolecularGenerator(BaseMolecularGenerator):
         
         active_index = self.dataset_info["active_index"]
         for step, batched_data in enumerate(train_loader):
-            batched_data = batched_data.to(self.device)
+            batched_data = self._to_device(batched_data)
             optimizer.zero_grad()
 
             data_x = F.one_hot(batched_data.x, num_classes=118).float()[:, active_index]
@@ -552,5 +551,5 @@ class GDSSMolecularGenerator(BaseMolecularGenerator):
             edge_types = E[i, :n, :n].cpu()
             molecule_list.append([atom_types, edge_types])
 
-        smiles_list = graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"])
+        smiles_list = graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"], n_jobs=self.n_jobs)
         return smiles_list
\ No newline at end of file
@@ -13,7 +13,7 @@ from .utils import PlaceHolder, to_dense, compute_dataset_info
 from .diffusion import NoiseScheduleDiscrete, MarginalTransition, sample_discrete_features, sample_discrete_feature_noise, reverse_diffusion
 
 from ...base import BaseMolecularGenerator
-from ...utils import graph_from_smiles, graph_to_smiles
+from ...utils import graphs_from_smiles, graph_to_smiles
 
 class GraphDITMolecularGenerator(BaseMolecularGenerator):
     """
@@ -71,6 +71,10 @@ class GraphDITMolecularGenerator(BaseMolecularGenerator):
         Device to run the model on (CPU or GPU)
     model_name : str, default="GraphDITMolecularGenerator"
         Name identifier for the model
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -96,9 +100,10 @@ class GraphDITMolecularGenerator(BaseMolecularGenerator):
         verbose: str = "none", 
         *,
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "GraphDITMolecularGenerator"
+        model_name: str = "GraphDITMolecularGenerator",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.num_layer = num_layer
         self.hidden_size = hidden_size
@@ -172,21 +177,16 @@ class GraphDITMolecularGenerator(BaseMolecularGenerator):
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs, preparing data for training...")
-            iterator = enumerate(X)
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, y,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            if y is not None:
-                properties = y[idx]
-            else: 
-                properties = None
-            graph = graph_from_smiles(smiles_or_mol, properties)
+        for idx, graph in enumerate(graphs):
             g = Data()
             
             # No H, first heavy atom has type 0
@@ -313,11 +313,9 @@ class GraphDITMolecularGenerator(BaseMolecularGenerator):
 
         optimizer, scheduler = self._setup_optimizers()
         train_dataset = self._convert_to_pytorch_data(X_train, y_train)
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0
+        # the model works on graphs padded to max_node, so bucketing only bounds the atoms per batch
+        train_loader = self._make_bucketed_loader(
+            DataLoader, train_dataset, [data.num_nodes for data in train_dataset], shuffle=True, padded=False
         )
 
         self.fitting_loss = []
@@ -348,7 +346,7 @@ class GraphDITMolecularGenerator(BaseMolecularGenerator):
         # Remove the local tqdm iterator since we're using global progress bar
         active_index = self.dataset_info["active_index"]
         for step, batched_data in enumerate(train_loader):
-            batched_data = batched_data.to(self.device)
+            batched_data = self._to_device(batched_data)
             optimizer.zero_grad()
 
             data_x = F.one_hot(batched_data.x, num_classes=118).float()[:, active_index]
@@ -530,7 +528,7 @@ class GraphDITMolecularGenerator(BaseMolecularGenerator):
             edge_types = E[i, :n, :n].cpu()
             molecule_list.append([atom_types, edge_types])
 
-        smiles_list = graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"])
+        smiles_list = graph_to_smiles(molecule_list, self.dataset_info["atom_decoder"], n_jobs=self.n_jobs)
         return smiles_list
 
     def sample_p_zs_given_zt(
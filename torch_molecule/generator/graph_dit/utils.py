@@ -3,6 +3,7 @@ import json
 from rdkit import Chem
 import numpy as np
 from torch_geometric.utils import to_dense_adj, to_dense_batch, remove_self_loops
+from ...utils.molecule import to_mol
 
 def to_dense(x, edge_index, edge_attr, batch, max_num_nodes=None):
     X, node_mask = to_dense_batch(x=x, batch=batch, max_num_nodes=max_num_nodes)
@@ -76,10 +77,7 @@ def compute_dataset_info(smiles_or_mol_list, cache_path=None):
     n_atoms_per_mol_count = {}
     max_node = 0
     for i, sms_or_mol in enumerate(smiles_or_mol_list):
-        if isinstance(sms_or_mol, str):
-            mol = Chem.MolFromSmiles(sms_or_mol)
-        else:
-            mol = sms_or_mol
+        mol = to_mol(sms_or_mol)
 
         n_atom = mol.GetNumHeavyAtoms()
         n_bond = mol.GetNumBonds()
@@ -1,7 +1,9 @@
+import os
+import copy
 import numpy as np
 import random
 import joblib
-from joblib import delayed
+import torch.multiprocessing as mp
 from rdkit import Chem
 from tqdm import tqdm
 from typing import Optional, Union, Dict, Any, List, Callable
@@ -10,7 +12,7 @@ import torch
 
 from .crossover import crossover
 from .mutate import mutate
-from .oracle import Oracle
+from .oracle import Oracle, CachedOracle
 
 from ...base import BaseMolecularGenerator
 
@@ -34,7 +36,8 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
     mutation_rate : float, default=0.0067
         Probability of mutation occurring during reproduction.
     n_jobs : int, default=1
-        Number of parallel jobs to run. -1 means using all processors.
+        Number of worker processes running the genetic algorithm for different labels
+        (or samples) in parallel. -1 means using all processors.
     iteration : int, default=5
         Number of iterations for each target label (or random sample) to run the genetic algorithm.
     verbose : str, default="none"
@@ -43,6 +46,10 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
         Device to run the model on (CPU or GPU).
     model_name : str, default="GraphGAMolecularGenerator"
         Name identifier for the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``num_workers`` or ``pin_memory``
+        (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -55,9 +62,10 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
         verbose: str = "none", 
         *,
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "GraphGAMolecularGenerator"
+        model_name: str = "GraphGAMolecularGenerator",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.num_task = num_task
         self.population_size = population_size
@@ -140,17 +148,18 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
         if oracle is not None:
             self.oracle = oracle
         else:
-            X_train, y_train = self._validate_inputs(X_train, y_train, num_task=self.num_task, return_rdkit_mol=False)
+            mols, y_train = self._validate_inputs(X_train, y_train, num_task=self.num_task)
             if y_train is not None:
                 warn("No oracles provided but y_train is provided, using default oracles (RandomForestRegressor)", UserWarning)
                 self.oracle = Oracle(num_task=self.num_task)
-                self.oracle.fit(X_train, y_train)
+                self.oracle.fit(mols, y_train)
                 self.y_train = y_train
             else:
                 assert self.num_task == 0, "No oracles or y_train provided but num_task is not 0"
                 self.oracle = None
                     
-        self.X_train = X_train
+        # Plain strings: populations parse only the molecules they sample
+        self.X_train = [str(smiles) for smiles in X_train]
         self.is_fitted_ = True
         return self
 
@@ -174,8 +183,12 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
         return new_child
 
     def _sanitize_molecules(self, population_mol):
-        """Sanitize molecules by removing duplicates and invalid molecules."""
+        """Sanitize molecules by removing duplicates and invalid molecules.
+
+        Returns the kept molecules and their canonical SMILES.
+        """
         new_mol_list = []
+        new_smiles_list = []
         smiles_set = set()
         for mol in population_mol:
             if mol is not None:
@@ -184,14 +197,18 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
                     if smiles is not None and smiles not in smiles_set:
                         smiles_set.add(smiles)
                         new_mol_list.append(mol)
+                        new_smiles_list.append(smiles)
                 except ValueError:
                     pass
-        return new_mol_list
+        return new_mol_list, new_smiles_list
     
-    def _get_score(self, mol_list, label):
+    def _get_score(self, mol_list, label, smiles_list=None):
         if label is None:
             return [1.0] * len(mol_list)  # For unconditional generation
-        return self.oracle(mol_list, label)
+        # Scores are memoized by canonical SMILES across generations and labels
+        if getattr(self, "_cached_oracle", None) is None or self._cached_oracle.oracle is not self.oracle:
+            self._cached_oracle = CachedOracle(self.oracle)
+        return self._cached_oracle(mol_list, label, smiles_list)
 
     def generate(
         self, 
@@ -202,8 +219,6 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
         if not self.is_fitted_:
             raise RuntimeError("Model must be fitted before generating")
         
-        all_generated_mols = []
-        
         if labels is not None:
             try:
                 labels = np.array(labels).reshape(-1, self.num_task)
@@ -211,62 +226,78 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
                 raise ValueError(f"labels must be convertible to a numpy array with shape (-1, {self.num_task})")
             
             # Prepare all inputs for parallel processing
-            parallel_inputs = []
+            tasks = []
             for i in range(labels.shape[0]):
                 label = labels[i:i+1]  # Keep as 2D array
                 
                 # Initialize population based on similarity to target label
                 if self.y_train is not None:
-                    population_mol = self._initialize_population_for_label(label)
+                    population_smiles = self._initialize_population_for_label(label)
                 else:
                     population_idx = np.random.choice(len(self.X_train), min(self.population_size, len(self.X_train)))
                     population_smiles = [self.X_train[idx] for idx in population_idx]
-                    population_mol = [Chem.MolFromSmiles(s) for s in population_smiles]
                 
-                parallel_inputs.append((population_mol, label))
-            
-            # Run GA for all labels in parallel with tqdm progress bar
-            if self.verbose != "none":
-                results = joblib.Parallel(n_jobs=self.n_jobs)(
-                    delayed(self._run_generation)(pop_mol, lbl) 
-                    for pop_mol, lbl in tqdm(parallel_inputs, desc="Generating molecules")
-                )
-            else:
-                results = joblib.Parallel(n_jobs=self.n_jobs)(
-                    delayed(self._run_generation)(pop_mol, lbl) 
-                    for pop_mol, lbl in parallel_inputs
-                )
-            
-            # Convert results to SMILES in the original order
-            all_generated_mols = [Chem.MolToSmiles(mol) for mol in results]
+                tasks.append((population_smiles, label))
         else:
             # Prepare all inputs for parallel processing
-            parallel_inputs = []
+            tasks = []
             for _ in range(num_samples):
                 population_idx = np.random.choice(len(self.X_train), min(self.population_size, len(self.X_train)))
                 population_smiles = [self.X_train[idx] for idx in population_idx]
-                population_mol = [Chem.MolFromSmiles(s) for s in population_smiles]
-                parallel_inputs.append((population_mol, None))
-            
-            # Run GA for all samples in parallel with tqdm progress bar
-            if self.verbose != "none":
-                results = joblib.Parallel(n_jobs=self.n_jobs)(
-                    delayed(self._run_generation)(pop_mol, lbl) 
-                    for pop_mol, lbl in tqdm(parallel_inputs, desc="Generating molecules", total=num_samples)
-                )
-            else:
-                results = joblib.Parallel(n_jobs=self.n_jobs)(
-                    delayed(self._run_generation)(pop_mol, lbl) 
-                    for pop_mol, lbl in parallel_inputs
-                )
-            
-            # Convert results to SMILES
-            all_generated_mols = [Chem.MolToSmiles(mol) for mol in results]
+                tasks.append((population_smiles, None))
         
-        return all_generated_mols
+        # Run GA for all labels (or samples) in parallel, results in the original order
+        return self._run_tasks(tasks)
+
+    def _run_tasks(self, tasks):
+        """Run the genetic algorithm for each (population SMILES, label) task.
+
+        With more than one job, the tasks are run by a pool of worker processes that
+        receive the generator, including its oracle, once when they start. Populations
+        and results are then exchanged as SMILES strings, and each worker keeps its
+        memoized oracle scores across the tasks it runs.
+        """
+        n_jobs = self.n_jobs
+        if n_jobs is None or n_jobs == 0:
+            n_jobs = 1
+        elif n_jobs < 0:
+            n_jobs = max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+        n_jobs = min(n_jobs, max(1, len(tasks)))
+
+        pbar = tqdm(desc="Generating molecules", total=len(tasks)) if self.verbose != "none" else None
+        results = []
+        if n_jobs == 1:
+            for task in tasks:
+                results.append(self._run_task(task))
+                if pbar is not None:
+                    pbar.update(1)
+        else:
+            # The training data is not needed by the workers
+            worker = copy.copy(self)
+            worker.X_train = None
+            worker.y_train = None
+            # Plain strings, since molecule handles would also send their parsed molecules
+            tasks = [([str(s) for s in population_smiles], label) for population_smiles, label in tasks]
+            with mp.Pool(processes=n_jobs, initializer=_init_worker, initargs=(worker,)) as pool:
+                # imap keeps the input order
+                for smiles in pool.imap(_run_worker_task, tasks):
+                    results.append(smiles)
+                    if pbar is not None:
+                        pbar.update(1)
+        if pbar is not None:
+            pbar.close()
+        return results
+
+    def _run_task(self, task):
+        population_smiles, label = task
+        population_mol = [Chem.MolFromSmiles(s) for s in population_smiles]
+        return Chem.MolToSmiles(self._run_generation(population_mol, label))
     
     def _initialize_population_for_label(self, label):
-        """Initialize population based on similarity to target label."""
+        """Initialize population based on similarity to target label.
+
+        Returns the SMILES of the population.
+        """
         similarities = []
         
         for i in range(len(self.X_train)):
@@ -280,17 +311,12 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
         else:
             top_indices = np.random.choice(len(self.X_train), min(self.population_size, len(self.X_train)))
             
-        population_smiles = [self.X_train[i] for i in top_indices]
-        return [Chem.MolFromSmiles(s) for s in population_smiles]
+        return [self.X_train[i] for i in top_indices]
     
     def _run_generation(self, population_mol, label):
         """Run the genetic algorithm for a specific population and label."""
+        population_scores = self._get_score(population_mol, label)
         for generation_idx in range(self.iteration):
-            if label is not None:
-                population_scores = self._get_score(population_mol, label)
-            else:
-                population_scores = [1.0] * len(population_mol)  # For unconditional generation
-            
             mating_pool = self._make_mating_pool(population_mol, population_scores, self.offspring_size)
             
             # Create offspring sequentially (parallelization is at the higher level now)
@@ -299,14 +325,11 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
                 offspring = self._reproduce(mating_pool, self.mutation_rate)
                 offspring_mol.append(offspring)
             
-            population_mol += offspring_mol
-            population_mol = self._sanitize_molecules(population_mol)
+            population_mol, population_smiles = self._sanitize_molecules(population_mol + offspring_mol)
 
-            # Re-score the expanded population
-            if label is not None:
-                population_scores = self._get_score(population_mol, label)
-            else:
-                population_scores = [1.0] * len(population_mol)
+            # Re-score the expanded population: the scores of the survivors are
+            # memoized, so only the new offspring are scored, in one batch
+            population_scores = self._get_score(population_mol, label, population_smiles)
             
             # Select top molecules for next generation
             population_tuples = list(zip(population_scores, population_mol))
@@ -314,6 +337,20 @@ class GraphGAMolecularGenerator(BaseMolecularGenerator):
             population_tuples = population_tuples[:self.population_size]
             
             population_mol = [t[1] for t in population_tuples]
+            population_scores = [t[0] for t in population_tuples]
         
         # Return the best molecule
         return population_mol[0]
+
+# Generator of a worker process, received once when the worker starts
+_worker_generator = None
+
+def _init_worker(generator):
+    global _worker_generator
+    _worker_generator = generator
+    # Forked workers inherit the random state of the parent process
+    random.seed()
+    np.random.seed()
+
+def _run_worker_task(task):
+    return _worker_generator._run_task(task)
@@ -1,7 +1,7 @@
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from rdkit import Chem
-from ...utils.graph.features import getmorganfingerprint
+from ...utils.graph.fingerprints import fingerprint_matrix
 
 class Oracle:
     """The default Oracle class for scoring molecules in GraphGA.
@@ -24,10 +24,7 @@ class Oracle:
         
     def _convert_to_fingerprint(self, molecules):
         """Convert SMILES or RDKit molecules to fingerprints."""
-        if isinstance(molecules[0], str):
-            return np.array([getmorganfingerprint(Chem.MolFromSmiles(mol)) for mol in molecules])
-        else:
-            return np.array([getmorganfingerprint(mol) for mol in molecules])
+        return fingerprint_matrix(molecules, "morgan", packed=False)
     
     def fit(self, X_train, y_train):
         """Fit the underlying models with training data.
@@ -54,6 +51,55 @@ class Oracle:
             
         return self
     
+    def predict(self, molecules):
+        """Predict the properties of molecules with one ``predict`` call per task.
+
+        Parameters
+        ----------
+        molecules : List[str] or List[RDKit.Mol]
+            Molecules as SMILES strings or RDKit Mol objects.
+
+        Returns
+        -------
+        np.ndarray
+            Predictions with shape (n_samples, num_task).
+        """
+        predictions = np.empty((len(molecules), self.num_task))
+        if len(molecules) == 0:
+            return predictions
+        fps = self._convert_to_fingerprint(molecules)
+        for idx in range(self.num_task):
+            predictions[:, idx] = self.models[idx].predict(fps)
+        return predictions
+
+    def score(self, predictions, target_values):
+        """Score property predictions based on their distance to the targets.
+
+        Parameters
+        ----------
+        predictions : np.ndarray
+            Predictions with shape (n_samples, num_task), as returned by ``predict``.
+        target_values : np.ndarray,
+            Scores will be based on distance to these targets.
+
+        Returns
+        -------
+        np.ndarray
+            Score of each molecule (lower is better).
+        """
+        predictions = np.asarray(predictions, dtype=float).reshape(-1, self.num_task)
+        if self.num_task == 1:
+            return predictions[:, 0]
+        if target_values is None:
+            return np.full(len(predictions), np.nan)
+        targets = np.asarray(target_values, dtype=float)[0]
+        valid = ~np.isnan(targets)
+        if not valid.any():
+            return np.full(len(predictions), np.nan)
+        # Lower score for values closer to target
+        dist = np.abs(predictions[:, valid] - targets[valid]) / (np.abs(targets[valid]) + 1e-8)
+        return np.nanmean(dist, axis=1)
+
     def __call__(self, molecules, target_values):
         """Score molecules based on their predicted properties.
         
@@ -69,25 +115,84 @@ class Oracle:
         List[float]
             Scores for each molecule.
         """
-        fps = self._convert_to_fingerprint(molecules)
-        scores_list = []
-        
-        for i, fp in enumerate(fps):
-            if self.num_task == 1:
-                score = self.models[0].predict([fp])[0]
-                scores_list.append(float(score))
+        return self.score(self.predict(molecules), target_values).tolist()
+
+class CachedOracle:
+    """Memoize the scores of an oracle by canonical SMILES.
+
+    Molecules that are not memoized yet are scored together in one oracle call. For
+    the default ``Oracle``, the property predictions are memoized instead of the
+    scores, so that they are shared by all target values; the scores are then
+    computed from the predictions for each target. Scores of other oracles are
+    memoized per target value.
+
+    Parameters
+    ----------
+    oracle : Callable
+        Oracle called as ``oracle(molecules, target_values)``.
+    """
+
+    def __init__(self, oracle):
+        self.oracle = oracle
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._memo)
+
+    def __call__(self, molecules, target_values, smiles=None):
+        """Score molecules, calling the oracle only for molecules not seen before.
+
+        Parameters
+        ----------
+        molecules : List[RDKit.Mol]
+            Molecules to score.
+        target_values : np.ndarray
+            Target values passed to the oracle.
+        smiles : List[Optional[str]], optional
+            Canonical SMILES of the molecules, computed if not given. Molecules
+            without SMILES are scored but not memoized.
+
+        Returns
+        -------
+        List[float]
+            Scores for each molecule.
+        """
+        if smiles is None:
+            smiles = [_canonical_smiles(mol) for mol in molecules]
+        predictive = isinstance(self.oracle, Oracle)
+        if predictive:
+            keys = list(smiles)
+        else:
+            label = None if target_values is None else np.asarray(target_values, dtype=float).tobytes()
+            keys = [(label, s) if s is not None else None for s in smiles]
+
+        values = [self._memo.get(key) if key is not None else None for key in keys]
+        # first occurrence of each molecule that is not memoized
+        missing, missing_keys = [], set()
+        for i, key in enumerate(keys):
+            if values[i] is None and (key is None or key not in missing_keys):
+                missing.append(i)
+                missing_keys.add(key)
+        if missing:
+            missing_mols = [molecules[i] for i in missing]
+            if predictive:
+                new_values = list(self.oracle.predict(missing_mols))
             else:
-                mol_scores = []
-                for idx in range(self.num_task):
-                    pred = self.models[idx].predict([fp])[0]
-                    
-                    if target_values is not None and not np.isnan(target_values[0][idx]):
-                        # Lower score for values closer to target
-                        target = target_values[0][idx]
-                        dist = abs(float(pred) - target) / (abs(target) + 1e-8)
-                        mol_scores.append(dist)
-                        
-                score = np.nanmean(mol_scores)  # Lower is better when using distances
-                scores_list.append(float(score))
-
-        return scores_list
\ No newline at end of file
+                new_values = list(self.oracle(missing_mols, target_values))
+            for i, value in zip(missing, new_values):
+                values[i] = value
+                if keys[i] is not None:
+                    self._memo[keys[i]] = value
+            values = [self._memo[key] if value is None else value for key, value in zip(keys, values)]
+
+        if predictive:
+            return self.oracle.score(np.stack(values), target_values).tolist()
+        return values
+
+def _canonical_smiles(mol):
+    if mol is None:
+        return None
+    try:
+        return Chem.MolToSmiles(mol)
+    except Exception:
+        return None
@@ -62,6 +62,10 @@ class JTVAEMolecularGenerator(BaseMolecularGenerator):
         Device to run the model on (CPU or GPU).
     model_name : str, default="JTVAEMolecularGenerator"
         Name identifier for the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -85,9 +89,10 @@ class JTVAEMolecularGenerator(BaseMolecularGenerator):
         verbose: str = "none", 
         *,
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "JTVAEMolecularGenerator"
+        model_name: str = "JTVAEMolecularGenerator",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.hidden_size = hidden_size
         self.latent_size = latent_size
@@ -5,6 +5,7 @@ import torch.nn.functional as F
 from torch.distributions import Categorical, Distribution
 
 from .lstm import LSTM
+from .smiles_char_dict import SmilesCharDictionary
 from .utils import rnn_start_token_vector
 
 class ActionSampler:
@@ -16,21 +17,29 @@ class ActionSampler:
 
     The class will sample the RNN model multiple times if the number of desired samples is larger than the
     maximal allowed batch size.
+
+    Sampling of a batch stops as soon as every sequence has emitted the end token.
+    Positions after the end token are filled with the padding token.
     """
 
     def __init__(self, max_batch_size, max_seq_length, device,
-                 distribution_cls: Type[Distribution] = Categorical) -> None:
+                 distribution_cls: Type[Distribution] = Categorical, compact: bool = True) -> None:
         """
         Args:
             max_batch_size: maximal batch size for the RNN model
             max_seq_length: max length for a sampled SMILES string
             device: cuda | cpu
             distribution_cls: distribution type to sample from. If None, will be a multinomial distribution. Useful for testing purposes.
+            compact: whether to remove finished sequences from the batch, so that they are not run through the model anymore
         """
         self.max_batch_size = max_batch_size
         self.max_seq_length = max_seq_length
         self.device = device
         self.distribution_cls = distribution_cls
+        self.compact = compact
+        char_dict = SmilesCharDictionary()
+        self.end_idx = char_dict.end_idx
+        self.pad_idx = char_dict.pad_idx
 
     def sample(self, model: LSTM, num_samples: int, target: torch.Tensor) -> torch.Tensor:
         """
@@ -76,7 +85,10 @@ class ActionSampler:
         """
         hidden, cell = model.init_hidden(batch_size, target)
         inp = rnn_start_token_vector(batch_size, self.device)
-        actions = torch.zeros((batch_size, self.max_seq_length), dtype=torch.long).to(self.device)
+        actions = torch.full((batch_size, self.max_seq_length), self.pad_idx, dtype=torch.long, device=self.device)
+        # rows of ``actions`` of the sequences in the batch, and which of them have ended
+        rows = torch.arange(batch_size, device=self.device)
+        finished = torch.zeros(batch_size, dtype=torch.bool, device=self.device)
 
         for char in range(self.max_seq_length):
             output, hidden, cell = model(inp, hidden, cell)
@@ -84,7 +96,16 @@ class ActionSampler:
             distribution = self.distribution_cls(probs=prob)
             action = distribution.sample()
 
-            actions[:, char] = action.squeeze()
+            action = action.masked_fill(finished.unsqueeze(1), self.pad_idx)
+            actions[rows, char] = action.view(-1)
+            finished = finished | (action.view(-1) == self.end_idx)
+            if finished.all():
+                break
+
+            if self.compact and finished.any():
+                keep = ~finished
+                rows, finished, action = rows[keep], finished[keep], action[keep]
+                hidden, cell = hidden[:, keep], cell[:, keep]
 
             inp = action
 
@@ -52,6 +52,10 @@ class LSTMMolecularGenerator(BaseMolecularGenerator):
         Device to run the model on (CPU or GPU).
     model_name : str, default="LSTMMolecularGenerator"
         Name identifier for the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -71,9 +75,10 @@ class LSTMMolecularGenerator(BaseMolecularGenerator):
         verbose: str = "none", 
         *,
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "LSTMMolecularGenerator"
+        model_name: str = "LSTMMolecularGenerator",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.num_task = num_task
         self.max_len = max_len
@@ -185,7 +190,7 @@ class LSTMMolecularGenerator(BaseMolecularGenerator):
             train_dataset,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=0
+            **self._loader_kwargs()
         )
 
         self.fitting_loss = []
@@ -217,7 +222,7 @@ class LSTMMolecularGenerator(BaseMolecularGenerator):
         
         for step, batched_data in enumerate(train_loader):
             for i in range(len(batched_data)):
-                batched_data[i] = batched_data[i].to(self.device)
+                batched_data[i] = self._to_device(batched_data[i])
             optimizer.zero_grad()
 
             loss = self.model.compute_loss(batched_data, criterion)
@@ -15,6 +15,31 @@ import torch.nn as nn
 from torch.nn import functional as F
 
 
+class KVCache:
+    """Preallocated key/value buffers of all attention layers for incremental decoding.
+
+    Keys and values of new positions are written in place, so decoding a token does
+    not copy the keys/values of the previous positions.
+    """
+
+    def __init__(self, num_layer, batch_size, num_head, max_positions, head_size, device, dtype):
+        shape = (num_layer, batch_size, num_head, max_positions, head_size)
+        self.keys = torch.empty(shape, device=device, dtype=dtype)
+        self.values = torch.empty(shape, device=device, dtype=dtype)
+        self.length = 0 # number of cached positions
+
+    def update(self, layer, k, v):
+        """Store the keys/values of new positions of ``layer`` and return those of all positions."""
+        end = self.length + k.size(2)
+        self.keys[layer, :, :, self.length:end] = k
+        self.values[layer, :, :, self.length:end] = v
+        return self.keys[layer, :, :, :end], self.values[layer, :, :, :end]
+
+    def select(self, index):
+        """Keep only the sequences ``index`` of the batch."""
+        self.keys = self.keys[:, index]
+        self.values = self.values[:, index]
+
 class CausalSelfAttention(nn.Module):
     """
     A vanilla multi-head masked self-attention layer with a projection at the end.
@@ -42,21 +67,30 @@ class CausalSelfAttention(nn.Module):
 
         self.n_head = config.num_head
 
-    def forward(self, x, layer_past=None):
+    def forward(self, x, cache=None, layer=0):
+        """Attend over ``x`` and, if given, the cached keys/values of previous positions.
+
+        With a ``KVCache``, the keys/values of ``x`` are added to the cache at index
+        ``layer``, so decoding one token at a time only computes those of that token.
+        """
         B, T, C = x.size()
 
         # calculate query, key, values for all heads in batch and move head forward to be the batch dim
         k = self.key(x).view(B, T, self.n_head, C // self.n_head).transpose(1, 2) # (B, nh, T, hs)
         q = self.query(x).view(B, T, self.n_head, C // self.n_head).transpose(1, 2) # (B, nh, T, hs)
         v = self.value(x).view(B, T, self.n_head, C // self.n_head).transpose(1, 2) # (B, nh, T, hs)
+        past_len = 0
+        if cache is not None:
+            past_len = cache.length
+            k, v = cache.update(layer, k, v) # (B, nh, past_len + T, hs)
 
-        # causal self-attention; Self-attend: (B, nh, T, hs) x (B, nh, hs, T) -> (B, nh, T, T)
+        # causal self-attention; Self-attend: (B, nh, T, hs) x (B, nh, hs, past_len + T) -> (B, nh, T, past_len + T)
         att = (q @ k.transpose(-2, -1)) * (1.0 / math.sqrt(k.size(-1)))
-        att = att.masked_fill(self.mask[:,:,:T,:T] == 0, float('-inf'))
+        att = att.masked_fill(self.mask[:,:,past_len:past_len + T,:past_len + T] == 0, float('-inf'))
         att = F.softmax(att, dim=-1)
         attn_save = att
         att = self.attn_drop(att)
-        y = att @ v # (B, nh, T, T) x (B, nh, T, hs) -> (B, nh, T, hs)
+        y = att @ v # (B, nh, T, past_len + T) x (B, nh, past_len + T, hs) -> (B, nh, T, hs)
         y = y.transpose(1, 2).contiguous().view(B, T, C) # re-assemble all head outputs side by side
 
         # output projection
@@ -78,8 +112,8 @@ class Block(nn.Module):
             nn.Dropout(config.resid_pdrop),
         )
 
-    def forward(self, x):
-        y, attn = self.attn(self.ln1(x))
+    def forward(self, x, cache=None, layer=0):
+        y, attn = self.attn(self.ln1(x), cache=cache, layer=layer)
         x = x + y
         x = x + self.mlp(self.ln2(x))
         return x, attn
@@ -191,21 +225,93 @@ class GPT(nn.Module):
         loss = F.cross_entropy(logits.reshape(-1, logits.size(-1)), targets.view(-1))
         return loss
 
-    def forward(self, idx, targets=None, prop = None, scaffold = None):
+    def _num_condition_tokens(self):
+        """Number of leading logits dropped for the property/scaffold conditioning."""
+        num = 0
+        if self.config.num_task:
+            num += int(bool(self.config.num_task))
+        if self.config.use_scaffold:
+            num += int(self.config.scaffold_maxlen)
+        return num
+
+    def _num_prefix_positions(self):
+        """Number of property/scaffold positions prepended to the token sequence."""
+        num = int(bool(self.config.num_task))
+        if self.config.use_scaffold:
+            # the LSTM summarizes the scaffold into one position per layer
+            num += int(self.config.lstm_layers) if self.config.use_lstm else int(self.config.scaffold_maxlen)
+        return num
+
+    def new_cache(self, batch_size, device=None):
+        """Create an empty ``KVCache`` for incremental decoding of ``batch_size`` sequences."""
+        param = self.pos_emb
+        head_size = self.config.hidden_size // self.config.num_head
+        return KVCache(
+            len(self.blocks), batch_size, self.config.num_head,
+            self.max_len + self._num_prefix_positions(), head_size,
+            device if device is not None else param.device, param.dtype,
+        )
+
+    def forward(self, idx, targets=None, prop = None, scaffold = None, cache = None):
+        """Compute next-token logits.
+
+        Parameters
+        ----------
+        idx : torch.Tensor
+            Token indices of shape (batch_size, seq_len). With a non-empty ``cache``,
+            only the tokens that follow the cached positions.
+        targets : torch.Tensor, optional
+            Unused, kept for compatibility
+        prop : torch.Tensor, optional
+            Property conditioning, prepended when the cache is empty
+        scaffold : torch.Tensor, optional
+            Scaffold conditioning, prepended when the cache is empty
+        cache : KVCache, optional
+            Cache from ``new_cache``, updated in place with the keys/values of ``idx``
+
+        Returns
+        -------
+        tuple
+            ``(logits, attn_maps)``
+        """
         b, t = idx.size()
-        assert t <= self.max_len, "Cannot forward, model max_len is exhausted."
+        past_len = cache.length if cache is not None else 0
+        # cached positions include the conditioning prefix
+        past_t = past_len - self._num_prefix_positions() if past_len else 0
+        assert past_t + t <= self.max_len, "Cannot forward, model max_len is exhausted."
 
         if self.config.num_task:
             assert prop.size(-1) == self.config.num_task, "num_task should be equal to last dim of property vector"           
 
         # forward the GPT model
         token_embeddings = self.tok_emb(idx) # each index maps to a (learnable) vector
-        position_embeddings = self.pos_emb[:, :t, :] # each position maps to a (learnable) vector
+        position_embeddings = self.pos_emb[:, past_t:past_t + t, :] # each position maps to a (learnable) vector
         type_embeddings = self.type_emb(torch.ones((b,t), dtype = torch.long, device = idx.device))
         x = self.drop(token_embeddings + position_embeddings + type_embeddings)
 
+        if not past_len:
+            x = self._prepend_conditions(x, prop, scaffold)
+
+        attn_maps = []
+        for i, layer in enumerate(self.blocks):
+            x, attn = layer(x, cache=cache, layer=i)
+            attn_maps.append(attn)
+        if cache is not None:
+            cache.length += x.size(1)
+
+        x = self.ln_f(x)
+        logits = self.head(x)
+
+        if not past_len:
+            logits = logits[:, self._num_condition_tokens():, :]
+
+        return logits, attn_maps # (num_layers, batch_size, num_heads, max_seq_len, max_seq_len)
+
+    def _prepend_conditions(self, x, prop, scaffold):
+        """Prepend the property and scaffold embeddings to the token embeddings ``x``."""
+        b = x.size(0)
         if self.config.num_task:
-            type_embd = self.type_emb(torch.zeros((b, 1), dtype = torch.long, device = idx.device))
+            type_embd = self.type_emb(torch.zeros((b, 1), dtype = torch.long, device = x.device))
             if prop.ndim == 2:
                 p = self.prop_nn(prop.unsqueeze(1))    # for single property
             else:
@@ -214,7 +320,7 @@ class GPT(nn.Module):
             x = torch.cat([p, x], 1)
 
         if self.config.use_scaffold:
-            type_embd = self.type_emb(torch.zeros((b, 1), dtype = torch.long, device = idx.device))
+            type_embd = self.type_emb(torch.zeros((b, 1), dtype = torch.long, device = x.device))
 
             scaffold_embeds = self.tok_emb(scaffold)     # .mean(1, keepdim = True)
             if self.config.use_lstm:
@@ -225,27 +331,4 @@ class GPT(nn.Module):
                 # scaffold_embeds = scaffold_embeds.reshape(scaffold_embeds.shape[1], scaffold_embeds.shape[0], self.config.hidden_size)
             scaffold_embeds += type_embd
             x = torch.cat([scaffold_embeds, x], 1)
-
-        # x = self.blocks(x)
-        attn_maps = []
-
-        for layer in self.blocks:
-            x, attn = layer(x)
-            attn_maps.append(attn)
-
-        x = self.ln_f(x)
-        logits = self.head(x)
-
-        # print(logits.shape)
-        if self.config.num_task and self.config.use_scaffold:
-            num = int(bool(self.config.num_task)) + int(self.config.scaffold_maxlen)
-        elif self.config.num_task:
-            num = int(bool(self.config.num_task))
-        elif self.config.use_scaffold:
-            num = int(self.config.scaffold_maxlen) 
-        else:
-            num = 0
-
-        logits = logits[:, num:, :]
-
-        return logits, attn_maps # (num_layers, batch_size, num_heads, max_seq_len, max_seq_len)
\ No newline at end of file
+        return x
\ No newline at end of file
@@ -63,6 +63,10 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
         Device to run the model on (CPU or GPU).
     model_name : str, default="MolGPTMolecularGenerator"
         Name identifier for the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self, 
@@ -83,9 +87,10 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
         verbose: str = "none", 
         *,
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "MolGPTMolecularGenerator"
+        model_name: str = "MolGPTMolecularGenerator",
+        **kwargs,
     ):
-        super().__init__(device=device, model_name=model_name, verbose=verbose)
+        super().__init__(device=device, model_name=model_name, verbose=verbose, **kwargs)
         
         self.num_layer = num_layer
         self.num_head = num_head
@@ -245,7 +250,7 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
             train_dataset,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=0
+            **self._loader_kwargs()
         )
         
         # Training loop
@@ -275,10 +280,10 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
         losses = []
                 
         for step, (x, y, prop, scaffold) in enumerate(train_loader):
-            x = x.to(self.device)
-            y = y.to(self.device)
-            prop = prop.to(self.device) if prop.numel() > 0 else None
-            scaffold = scaffold.to(self.device) if scaffold.numel() > 0 else None
+            x = self._to_device(x)
+            y = self._to_device(y)
+            prop = self._to_device(prop) if prop.numel() > 0 else None
+            scaffold = self._to_device(scaffold) if scaffold.numel() > 0 else None
             
             optimizer.zero_grad()
             loss = self.model.compute_loss(x, targets=y, prop=prop, scaffold=scaffold)
@@ -304,9 +309,17 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
         return losses
         
     @torch.no_grad()
-    def sample(self, x, steps, temperature=1.0, top_k=None, prop=None, scaffold=None):
+    def sample(self, x, steps, temperature=1.0, top_k=None, prop=None, scaffold=None, use_cache=True, end_token=None, compact=True):
         """
         Sample from the model given a context.
+
+        With ``use_cache``, the keys/values of previous positions are cached, and each
+        step only runs the model on the newly sampled token. Once the sequence exceeds
+        the model's ``max_len``, the context is cropped and recomputed at every step.
+
+        If ``end_token`` is given, a sequence is finished once it samples it and only
+        ``end_token`` is appended to it afterwards. Sampling stops as soon as all the
+        sequences are finished, so fewer than ``steps`` tokens may be returned.
         
         Parameters
         ----------
@@ -322,6 +335,13 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
             Property conditioning tensor
         scaffold : torch.Tensor
             Scaffold conditioning tensor
+        use_cache : bool, default=True
+            Whether to decode incrementally with a key/value cache
+        end_token : int, optional
+            Index of the token ending a sequence
+        compact : bool, default=True
+            Whether to remove finished sequences from the batch once they make up a
+            quarter of it, so that they are not run through the model anymore
             
         Returns
         -------
@@ -330,16 +350,25 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
         """
         model = self.model
         model.eval()
+        # Get block size from model
+        max_len = model.get_max_len()
+        cache = None
+        # finished sequences are written to ``output`` when they are removed from the batch
+        output = x.new_full((x.size(0), x.size(1) + steps), end_token if end_token is not None else 0)
+        rows = torch.arange(x.size(0), device=x.device)
+        finished = torch.zeros(x.size(0), dtype=torch.bool, device=x.device)
         
         for k in range(steps):
-            # Get block size from model
-            max_len = model.get_max_len()
-            
-            # Crop context if needed
-            x_cond = x if x.size(1) <= max_len else x[:, -max_len:]
-            
-            # Forward pass
-            logits, _ = model(x_cond, prop=prop, scaffold=scaffold)
+            if cache is not None and x.size(1) <= max_len:
+                # Only the last sampled token is new
+                logits, _ = model(x[:, -1:], prop=prop, scaffold=scaffold, cache=cache)
+            else:
+                # Crop context if needed
+                x_cond = x if x.size(1) <= max_len else x[:, -max_len:]
+
+                # Forward pass; positions of a cropped context shift at every step, so it is not cached
+                cache = model.new_cache(x.size(0)) if use_cache and x.size(1) < max_len else None
+                logits, _ = model(x_cond, prop=prop, scaffold=scaffold, cache=cache)
             
             # Get logits for the next token and apply temperature
             logits = logits[:, -1, :] / temperature
@@ -355,10 +384,28 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
             # Sample from the distribution
             next_token = torch.multinomial(probs, num_samples=1)
             
+            if end_token is not None:
+                next_token = next_token.masked_fill(finished.unsqueeze(1), end_token)
+                finished = finished | (next_token[:, 0] == end_token)
+            
             # Append to the sequence
             x = torch.cat((x, next_token), dim=1)
+
+            if end_token is None:
+                continue
+            if finished.all():
+                break
+            if compact and 4 * finished.sum() >= x.size(0):
+                output[rows[finished], :x.size(1)] = x[finished]
+                keep = ~finished
+                rows, finished, x = rows[keep], finished[keep], x[keep]
+                prop = prop[keep] if prop is not None else None
+                scaffold = scaffold[keep] if scaffold is not None else None
+                if cache is not None:
+                    cache.select(keep)
         
-        return x
+        output[rows, :x.size(1)] = x
+        return output[:, :x.size(1)]
     
     def generate(self, n_samples=10, properties=None, scaffolds=None, max_len=None, temperature=1.0, top_k=10, starting_token='C'):
         """
@@ -435,7 +482,8 @@ class MolGPTMolecularGenerator(BaseMolecularGenerator):
             temperature=temperature,
             top_k=top_k,
             prop=prop_tensor,
-            scaffold=scaffold_tensor
+            scaffold=scaffold_tensor,
+            end_token=self.token_to_id.get('<'),
         )
         
         # Convert to SMILES strings
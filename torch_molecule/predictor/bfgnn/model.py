@@ -4,6 +4,7 @@ from torch_geometric.nn import global_add_pool, global_mean_pool, global_max_poo
 
 from ...nn import GNN_node, GNN_node_Virtualnode, MLP
 from ...utils import init_weights
+from ...utils.graph.fingerprints import unpack_fingerprints, FINGERPRINT_NUM_BITS
 
 class BFGNN(nn.Module):
     def __init__(
@@ -90,10 +91,10 @@ class BFGNN(nn.Module):
     def _augmented_graph_features(self, batched_data, h_rep):
         if self.augmented_feature:
             if 'morgan' in self.augmented_feature:
-                morgan = batched_data.morgan.type_as(h_rep)
+                morgan = unpack_fingerprints(batched_data.morgan, FINGERPRINT_NUM_BITS["morgan"]).type_as(h_rep)
                 h_rep = torch.cat((h_rep, morgan), dim=1)
             if 'maccs' in self.augmented_feature:
-                maccs = batched_data.maccs.type_as(h_rep)
+                maccs = unpack_fingerprints(batched_data.maccs, FINGERPRINT_NUM_BITS["maccs"]).type_as(h_rep)
                 h_rep = torch.cat((h_rep, maccs), dim=1)
         return h_rep
 
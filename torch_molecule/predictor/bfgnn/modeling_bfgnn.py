@@ -67,6 +67,10 @@ class BFGNNMolecularPredictor(GNNMolecularPredictor):
         Number of epochs with no improvement after which learning rate will be reduced.
     verbose : str, default="none"
         Whether to display progress info. Options are: "none", "progress_bar", "print_statement". If any other, "none" is automatically chosen.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     
     def __init__(
@@ -103,6 +107,7 @@ class BFGNNMolecularPredictor(GNNMolecularPredictor):
         verbose: str = "none",
         device: Optional[torch.device | str] = None,
         model_name: str = "BFGNNMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             num_task=num_task,
@@ -129,6 +134,7 @@ class BFGNNMolecularPredictor(GNNMolecularPredictor):
             verbose=verbose,
             device=device,
             model_name=model_name,
+            **kwargs,
         )
         
         # BFGNN-specific parameters
@@ -154,7 +160,7 @@ class BFGNNMolecularPredictor(GNNMolecularPredictor):
         losses = []
 
         for step, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
 
             loss = self.model.compute_loss(batch, self.loss_criterion, self.l1_penalty)
@@ -1,11 +1,11 @@
 import torch
 import torch.nn as nn
-import numpy as np
 from torch_geometric.nn import global_add_pool, global_mean_pool, global_max_pool
 
-from .utils import split_batch, relabel, set_masks, clear_masks
+from .utils import segment_topk_mask, relabel, set_masks, clear_masks
 from ...nn import GNN_node, GNN_node_Virtualnode
 from ...utils import init_weights
+from ...utils.graph.fingerprints import unpack_fingerprints, FINGERPRINT_NUM_BITS
 
 class DIR(nn.Module):
     def __init__(
@@ -110,10 +110,10 @@ class DIR(nn.Module):
     def _augment_graph_features(self, batched_data, h):
         if self.augmented_feature:
             if 'morgan' in self.augmented_feature:
-                morgan = batched_data.morgan.type_as(h)
+                morgan = unpack_fingerprints(batched_data.morgan, FINGERPRINT_NUM_BITS["morgan"]).type_as(h)
                 h = torch.cat((h, morgan), dim=1)
             if 'maccs' in self.augmented_feature:
-                maccs = batched_data.maccs.type_as(h)
+                maccs = unpack_fingerprints(batched_data.maccs, FINGERPRINT_NUM_BITS["maccs"]).type_as(h)
                 h = torch.cat((h, maccs), dim=1)
         return h
     
@@ -204,28 +204,17 @@ class CausalAttNet(nn.Module):
         row, col = data.edge_index
         edge_rep = torch.cat([x[row], x[col]], dim=-1)
         pred_edge_weight = self.linear(edge_rep).view(-1)
-        causal_edge_index = torch.LongTensor([[],[]]).to(x.device)
-        causal_edge_weight = torch.tensor([]).to(x.device)
-        causal_edge_attr = torch.LongTensor([]).to(x.device)
-        conf_edge_index = torch.LongTensor([[],[]]).to(x.device)
-        conf_edge_weight = torch.tensor([]).to(x.device)
-        conf_edge_attr = torch.LongTensor([]).to(x.device)
-
-        edge_indices, _, _, num_edges, cum_edges = split_batch(data)
-        for edge_index, N, C in zip(edge_indices, num_edges, cum_edges):
-            n_reserve =  int(self.ratio * N)
-            edge_attr = data.edge_attr[C:C+N]
-            single_mask = pred_edge_weight[C:C+N]
-            single_mask_detach = pred_edge_weight[C:C+N].detach().cpu().numpy()
-            rank = np.argpartition(-single_mask_detach, n_reserve)
-            idx_reserve, idx_drop = rank[:n_reserve], rank[n_reserve:]
-
-            causal_edge_index = torch.cat([causal_edge_index, edge_index[:, idx_reserve]], dim=1)
-            conf_edge_index = torch.cat([conf_edge_index, edge_index[:, idx_drop]], dim=1)
-            causal_edge_weight = torch.cat([causal_edge_weight, single_mask[idx_reserve]])
-            conf_edge_weight = torch.cat([conf_edge_weight, -1 * single_mask[idx_drop]])
-            causal_edge_attr = torch.cat([causal_edge_attr, edge_attr[idx_reserve]])
-            conf_edge_attr = torch.cat([conf_edge_attr, edge_attr[idx_drop]])
+
+        # keep the int(ratio * num_edges) highest scored edges of each graph as causal edges
+        causal_mask = segment_topk_mask(pred_edge_weight, data.batch[row], self.ratio)
+        conf_mask = ~causal_mask
+
+        causal_edge_index = data.edge_index[:, causal_mask]
+        conf_edge_index = data.edge_index[:, conf_mask]
+        causal_edge_weight = pred_edge_weight[causal_mask]
+        conf_edge_weight = -1 * pred_edge_weight[conf_mask]
+        causal_edge_attr = data.edge_attr[causal_mask]
+        conf_edge_attr = data.edge_attr[conf_mask]
 
         causal_x, causal_edge_index, causal_batch, _ = relabel(x, causal_edge_index, data.batch, keep_all_nodes=True)
         conf_x, conf_edge_index, conf_batch, _ = relabel(x, conf_edge_index, data.batch, keep_all_nodes=True)
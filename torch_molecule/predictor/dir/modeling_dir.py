@@ -85,6 +85,10 @@ class DIRMolecularPredictor(GNNMolecularPredictor):
         Device to use for computation.
     model_name : str, default="DIRMolecularPredictor"
         Name of the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self,
@@ -121,6 +125,7 @@ class DIRMolecularPredictor(GNNMolecularPredictor):
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "DIRMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             num_task=num_task,
@@ -147,6 +152,7 @@ class DIRMolecularPredictor(GNNMolecularPredictor):
             verbose=verbose,
             device=device,
             model_name=model_name,
+            **kwargs,
         )
         
         # DIR-specific parameters
@@ -205,7 +211,7 @@ class DIRMolecularPredictor(GNNMolecularPredictor):
 
         for batch_idx, batch in enumerate(train_loader):
 
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
 
             # Forward pass and loss computation
             causal_loss, conf_loss, env_loss = self.model.compute_loss(batch, self.loss_criterion, alpha_prime)
@@ -236,9 +242,8 @@ class DIRMolecularPredictor(GNNMolecularPredictor):
         self._check_is_fitted()
 
         # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X)
-        dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        dataset, valid = self._prepare_predict_dataset(X)
+        loader = self._make_loader(dataset, shuffle=False)
 
         # Make predictions
         self.model = self.model.to(self.device)
@@ -246,13 +251,13 @@ class DIRMolecularPredictor(GNNMolecularPredictor):
         predictions = []
         with torch.no_grad():
             for batch in tqdm(loader, disable=self.verbose != "progress_bar"):
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 predictions.append(out["prediction"].cpu().numpy())
 
         if predictions:
             return {
-                "prediction": np.concatenate(predictions, axis=0),
+                "prediction": self._fill_invalid(self._restore_order(np.concatenate(predictions, axis=0), loader), valid),
             }
         else:
             warnings.warn(
@@ -1,16 +1,33 @@
 import torch
-from torch_geometric.utils import degree
 from torch_geometric.nn.conv import MessagePassing
 
-def split_batch(g):
-    split = degree(g.batch[g.edge_index[0]], dtype=torch.long).tolist()
-    edge_indices = torch.split(g.edge_index, split, dim=1)
-    num_nodes = degree(g.batch, dtype=torch.long)
-    cum_nodes = torch.cat([g.batch.new_zeros(1), num_nodes.cumsum(dim=0)[:-1]])
-    num_edges = torch.tensor([e.size(1) for e in edge_indices], dtype=torch.long).to(g.x.device)
-    cum_edges = torch.cat([g.batch.new_zeros(1), num_edges.cumsum(dim=0)[:-1]])
+def segment_topk_mask(score, segment, ratio):
+    """Select the int(ratio * n) highest scores of each segment of n elements.
 
-    return edge_indices, num_nodes, cum_nodes, num_edges, cum_edges
+    Elements are sorted by (segment, descending score) with two stable sorts, and the
+    rank of each element within its segment is compared with the number of elements
+    kept in the segment, so that all segments are handled at once on the device.
+
+    Args:
+        score (torch.Tensor): Score of each element
+        segment (torch.Tensor): Segment index of each element
+        ratio (float): Fraction of the elements kept in each segment
+
+    Returns:
+        torch.Tensor: Boolean mask of the selected elements
+    """
+    if score.numel() == 0:
+        return torch.zeros(0, dtype=torch.bool, device=score.device)
+    counts = torch.bincount(segment)
+    num_keep = (counts.double() * ratio).long()
+    ptr = torch.cumsum(counts, dim=0) - counts
+
+    order = torch.argsort(score.detach(), descending=True, stable=True)
+    order = order[torch.argsort(segment[order], stable=True)]
+    rank = torch.empty_like(order)
+    rank[order] = torch.arange(order.size(0), device=order.device)
+    rank = rank - ptr[segment]
+    return rank < num_keep[segment]
 
 def relabel(x, edge_index, batch, pos=None, keep_all_nodes=False):
     num_nodes = x.size(0)
@@ -10,7 +10,8 @@ from torch_geometric.data import Data
 
 from .model import GNN
 from ...base import BaseMolecularPredictor
-from ...utils import graph_from_smiles
+from ...utils import graphs_from_smiles, featurization_cached, get_featurization_cache, PackedGraphDataset
+from ...utils.checker import MolecularInputChecker
 from ...utils.search import (
     suggest_parameter,
     ParameterSpec,
@@ -98,6 +99,10 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
         Number of epochs with no improvement after which learning rate will be reduced.
     verbose : str, default="none"
         Whether to display progress info. Options are: "none", "progress_bar", "print_statement". If any other, "none" is automatically chosen.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     
     def __init__(
@@ -131,7 +136,8 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
         # General parameters
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "GNNMolecularPredictor"
+        model_name: str = "GNNMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             device=device,
@@ -139,6 +145,7 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
             num_task=num_task,
             task_type=task_type,
             verbose=verbose,
+            **kwargs,
         )
         
         # Core model parameters
@@ -266,21 +273,16 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
-            iterator = enumerate(X)
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs: preparing data for training...")
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, y, self.augmented_feature,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            if y is not None:
-                properties = y[idx]
-            else:
-                properties = None
-            graph = graph_from_smiles(smiles_or_mol, properties, self.augmented_feature)
+        for idx, graph in enumerate(graphs):
             g = Data()
             g.num_nodes = graph["num_nodes"]
             g.edge_index = torch.from_numpy(graph["edge_index"])
@@ -301,17 +303,72 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
                 del graph["y"]
    
             if graph["morgan"] is not None:
-                g.morgan = torch.tensor(graph["morgan"], dtype=torch.int8).view(1, -1)
+                g.morgan = torch.from_numpy(graph["morgan"]).view(1, -1)
                 del graph["morgan"]
             
             if graph["maccs"] is not None:
-                g.maccs = torch.tensor(graph["maccs"], dtype=torch.int8).view(1, -1)
+                g.maccs = torch.from_numpy(graph["maccs"]).view(1, -1)
                 del graph["maccs"]
 
             pyg_graph_list.append(g)
 
         return pyg_graph_list
     
+    def _prepare_dataset(self, X, y=None):
+        """Validate inputs and build the dataset consumed by ``_make_loader``.
+
+        A ``PackedGraphDataset`` is used as is, with its stored targets replaced by ``y``
+        if given. Any other input is validated and converted with ``_convert_to_pytorch_data``;
+        SMILES strings found in the featurization cache are not parsed.
+        """
+        if isinstance(X, PackedGraphDataset):
+            augmented_feature = self.augmented_feature or []
+            missing = [key for key in augmented_feature if key not in X.augmented_features]
+            if missing:
+                raise ValueError(
+                    f"The packed dataset does not store the augmented features {missing}. "
+                    "Build it with PackedGraphDataset.from_smiles(..., augmented_features=...)."
+                )
+            if y is not None:
+                y = MolecularInputChecker.validate_targets(y, len(X), self.num_task)
+                X = X.with_targets(y)
+            return X
+        X, y = self._validate_inputs(X, y, known_valid=self._featurization_cached(X))
+        return self._convert_to_pytorch_data(X, y)
+
+    def _prepare_predict_dataset(self, X):
+        """Build the dataset for inference and the validity mask of the inputs.
+
+        Invalid SMILES strings are skipped; their outputs are filled in with ``_fill_invalid``.
+        """
+        if isinstance(X, PackedGraphDataset):
+            return self._prepare_dataset(X), np.ones(len(X), dtype=bool)
+        X, valid = self._validate_inputs_tolerant(X, known_valid=self._featurization_cached(X))
+        return self._convert_to_pytorch_data(X), valid
+
+    def _featurization_cached(self, X):
+        """Mask of the SMILES strings in ``X`` whose graphs are in the featurization cache.
+
+        A cached SMILES string was valid when it was featurized, so validation skips parsing it.
+        Returns None when caching is disabled.
+        """
+        if not isinstance(X, list) or get_featurization_cache() is None:
+            return None
+        return featurization_cached(X, self.augmented_feature)
+
+    def _make_loader(self, dataset, shuffle: bool = False):
+        """Create a data loader over a dataset returned by ``_prepare_dataset``.
+
+        With bucketing enabled, batches group graphs with similar numbers of atoms, and
+        outputs of the loader must be reordered with ``_restore_order``.
+        """
+        if isinstance(dataset, PackedGraphDataset):
+            batch_sampler = self._bucket_sampler(dataset.num_nodes, shuffle=shuffle)
+            return dataset.loader(
+                batch_size=self.batch_size, shuffle=shuffle, batch_sampler=batch_sampler, **self._loader_kwargs()
+            )
+        return self._make_bucketed_loader(DataLoader, dataset, [data.num_nodes for data in dataset], shuffle=shuffle)
+
     def _setup_optimizers(self) -> Tuple[torch.optim.Optimizer, Optional[Any]]:
         """Setup optimization components including optimizer and learning rate scheduler.
 
@@ -507,9 +564,9 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
     
     def fit(
         self,
-        X_train: List[str],
-        y_train: Optional[Union[List, np.ndarray]],
-        X_val: Optional[List[str]] = None,
+        X_train: Union[List[str], PackedGraphDataset],
+        y_train: Optional[Union[List, np.ndarray]] = None,
+        X_val: Optional[Union[List[str], PackedGraphDataset]] = None,
         y_val: Optional[Union[List, np.ndarray]] = None,
         X_unlbl: Optional[List[str]] = None,
     ) -> "GNNMolecularPredictor":
@@ -517,15 +574,16 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
 
         Parameters
         ----------
-        X_train : List[str]
-            Training set input molecular structures as SMILES strings
-        y_train : Union[List, np.ndarray]
-            Training set target values for property prediction
-        X_val : List[str], optional
-            Validation set input molecular structures as SMILES strings.
+        X_train : Union[List[str], PackedGraphDataset]
+            Training set input molecular structures as SMILES strings or a packed graph dataset
+        y_train : Union[List, np.ndarray], optional
+            Training set target values for property prediction. Required unless
+            X_train is a packed dataset, whose stored targets are then used
+        X_val : Union[List[str], PackedGraphDataset], optional
+            Validation set input molecular structures as SMILES strings or a packed graph dataset.
             If None, training data will be used for validation
         y_val : Union[List, np.ndarray], optional
-            Validation set target values. Required if X_val is provided
+            Validation set target values. Required if X_val is a list of SMILES strings
         X_unlbl : List[str], optional
             Unlabeled set input molecular structures as SMILES strings.
             
@@ -534,6 +592,12 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
         self : GNNMolecularPredictor
             Fitted estimator
         """
+        if isinstance(X_train, PackedGraphDataset) and y_train is None:
+            y_train = X_train.y
+        if y_train is None:
+            raise ValueError("y_train must be provided unless X_train is a PackedGraphDataset.")
+        if isinstance(X_val, PackedGraphDataset) and y_val is None:
+            y_val = X_val.y
         if (X_val is None) != (y_val is None):
             raise ValueError(
                 "Both X_val and y_val must be provided for validation. "
@@ -545,14 +609,8 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
         optimizer, scheduler = self._setup_optimizers()
         
         # Prepare datasets and loaders
-        X_train, y_train = self._validate_inputs(X_train, y_train)
-        train_dataset = self._convert_to_pytorch_data(X_train, y_train)
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0
-        )
+        train_dataset = self._prepare_dataset(X_train, y_train)
+        train_loader = self._make_loader(train_dataset, shuffle=True)
 
         if X_val is None or y_val is None:
             val_loader = train_loader
@@ -562,14 +620,8 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
                 UserWarning
             )
         else:
-            X_val, y_val = self._validate_inputs(X_val, y_val)
-            val_dataset = self._convert_to_pytorch_data(X_val, y_val)
-            val_loader = DataLoader(
-                val_dataset,
-                batch_size=self.batch_size,
-                shuffle=False,
-                num_workers=0
-            )
+            val_dataset = self._prepare_dataset(X_val, y_val)
+            val_loader = self._make_loader(val_dataset, shuffle=False)
 
         # Initialize training state
         self.fitting_loss = []
@@ -665,27 +717,27 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
         self.is_fitted_ = True
         return self
 
-    def predict(self, X: List[str]) -> Dict[str, np.ndarray]:
+    def predict(self, X: Union[List[str], PackedGraphDataset]) -> Dict[str, np.ndarray]:
         """Make predictions using the fitted model.
 
         Parameters
         ----------
-        X : List[str]
-            List of SMILES strings to make predictions for
+        X : Union[List[str], PackedGraphDataset]
+            List of SMILES strings or a packed graph dataset to make predictions for
 
         Returns
         -------
         Dict[str, np.ndarray]
             Dictionary containing:
-                - 'prediction': Model predictions (shape: [n_samples, n_tasks])
+                - 'prediction': Model predictions (shape: [n_samples, n_tasks]).
+                  Rows of invalid SMILES strings are NaN.
 
         """
         self._check_is_fitted()
 
         # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X)
-        dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        dataset, valid = self._prepare_predict_dataset(X)
+        loader = self._make_loader(dataset, shuffle=False)
 
         if self.model is None:
             raise RuntimeError("Model not initialized")
@@ -702,11 +754,11 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
             else:
                 iterator = loader
             for batch in iterator:
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 predictions.append(out["prediction"].cpu().numpy())
         return {
-            "prediction": np.concatenate(predictions, axis=0),
+            "prediction": self._fill_invalid(self._restore_order(np.concatenate(predictions, axis=0), loader), valid),
         }
 
     def _evaluation_epoch(
@@ -733,7 +785,7 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
         
         with torch.no_grad():
             for batch in loader:
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 y_pred_list.append(out["prediction"].cpu().numpy())
                 y_true_list.append(batch.y.cpu().numpy())
@@ -763,7 +815,7 @@ class GNNMolecularPredictor(BaseMolecularPredictor):
         losses = []
 
         for batch_idx, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
 
             loss = self.model.compute_loss(batch, self.loss_criterion)
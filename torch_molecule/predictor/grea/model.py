@@ -6,6 +6,7 @@ from .utils import scatter_add
 
 from ...nn import GNN_node, GNN_node_Virtualnode, MLP
 from ...utils import init_weights
+from ...utils.graph.fingerprints import unpack_fingerprints, FINGERPRINT_NUM_BITS
 
 class GREA(nn.Module):
     def __init__(
@@ -100,12 +101,12 @@ class GREA(nn.Module):
     def _augment_graph_features(self, batched_data, h_r, h_rep):
         if self.augmented_feature:
             if 'morgan' in self.augmented_feature:
-                morgan = batched_data.morgan.type_as(h_r)
+                morgan = unpack_fingerprints(batched_data.morgan, FINGERPRINT_NUM_BITS["morgan"]).type_as(h_r)
                 h_r = torch.cat((h_r, morgan), dim=1)
                 morgans = morgan.repeat_interleave(batched_data.batch[-1]+1, dim=0)
                 h_rep = torch.cat((h_rep, morgans), dim=1)
             if 'maccs' in self.augmented_feature:
-                maccs = batched_data.maccs.type_as(h_r)
+                maccs = unpack_fingerprints(batched_data.maccs, FINGERPRINT_NUM_BITS["maccs"]).type_as(h_r)
                 h_r = torch.cat((h_r, maccs), dim=1)
                 maccses = maccs.repeat_interleave(batched_data.batch[-1]+1, dim=0)
                 h_rep = torch.cat((h_rep, maccses), dim=1)
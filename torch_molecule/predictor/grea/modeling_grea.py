@@ -78,6 +78,10 @@ class GREAMolecularPredictor(GNNMolecularPredictor):
         Device to use for computation.
     model_name : str, default="GREAMolecularPredictor"
         Name of the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self,
@@ -113,6 +117,7 @@ class GREAMolecularPredictor(GNNMolecularPredictor):
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "GREAMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             num_task=num_task,
@@ -139,6 +144,7 @@ class GREAMolecularPredictor(GNNMolecularPredictor):
             verbose=verbose,
             device=device,
             model_name=model_name,
+            **kwargs,
         )
         
         # GREA-specific parameters
@@ -178,13 +184,14 @@ class GREAMolecularPredictor(GNNMolecularPredictor):
                 - 'prediction': Model predictions (shape: [n_samples, n_tasks])
                 - 'variance': Prediction variances (shape: [n_samples, n_tasks])
                 - 'node_importance': A nested list where the outer list has length n_samples and each inner list has length n_nodes for that molecule
+
+            Predictions and variances of invalid SMILES strings are NaN, and their node importance is None.
         """
         self._check_is_fitted()
 
         # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X)
-        dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        dataset, valid = self._prepare_predict_dataset(X)
+        loader = self._make_loader(dataset, shuffle=False)
 
         # Make predictions
         self.model = self.model.to(self.device)
@@ -194,7 +201,7 @@ class GREAMolecularPredictor(GNNMolecularPredictor):
         node_scores = []
         with torch.no_grad():
             for batch in tqdm(loader, disable=self.verbose != "progress_bar"):
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 predictions.append(out["prediction"].cpu().numpy())
                 variances.append(out["variance"].cpu().numpy())
@@ -202,9 +209,9 @@ class GREAMolecularPredictor(GNNMolecularPredictor):
 
         if predictions and variances:
             return {
-                "prediction": np.concatenate(predictions, axis=0),
-                "variance": np.concatenate(variances, axis=0),
-                "node_importance": node_scores,
+                "prediction": self._fill_invalid(self._restore_order(np.concatenate(predictions, axis=0), loader), valid),
+                "variance": self._fill_invalid(self._restore_order(np.concatenate(variances, axis=0), loader), valid),
+                "node_importance": self._fill_invalid(self._restore_order(node_scores, loader), valid),
             }
         else:
             warnings.warn(
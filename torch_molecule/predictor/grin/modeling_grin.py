@@ -9,7 +9,7 @@ from tqdm import tqdm
 from .model import GRIN
 from .utils import SmilesRepeat
 from ..gnn.modeling_gnn import GNNMolecularPredictor
-from ...utils import graph_from_smiles
+from ...utils import graph_from_smiles, PackedGraphDataset
 from ...utils.search import (
     ParameterSpec,
     ParameterType,
@@ -82,6 +82,10 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
         Device to use for computation.
     model_name : str, default="GRINMolecularPredictor"
         Name of the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self,
@@ -118,7 +122,8 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
         # General parameters
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
-        model_name: str = "GRINMolecularPredictor"
+        model_name: str = "GRINMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             num_task=num_task,
@@ -145,6 +150,7 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
             verbose=verbose,
             device=device,
             model_name=model_name,
+            **kwargs,
         )
         
         # GRIN-specific parameters
@@ -170,10 +176,17 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
         base_params = super()._get_model_params(checkpoint)
         return base_params
 
+    def _check_augmentation_input(self, X):
+        if isinstance(X, PackedGraphDataset):
+            raise ValueError(
+                "Polymer augmentation repeats SMILES strings and cannot be applied to a PackedGraphDataset. "
+                "Pass SMILES strings or disable the augmentation."
+            )
+
     def fit(
         self,
-        X_train: List[str],
-        y_train: Optional[Union[List, np.ndarray]],
+        X_train: Union[List[str], PackedGraphDataset],
+        y_train: Optional[Union[List, np.ndarray]] = None,
         X_val: Optional[List[str]] = None,
         y_val: Optional[Union[List, np.ndarray]] = None,
         X_unlbl: Optional[List[str]] = None,
@@ -182,10 +195,11 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
 
         Parameters
         ----------
-        X_train : List[str]
-            Training set input molecular structures as SMILES strings
-        y_train : Union[List, np.ndarray]
-            Training set target values for property prediction
+        X_train : Union[List[str], PackedGraphDataset]
+            Training set input molecular structures as SMILES strings or a packed graph dataset
+        y_train : Union[List, np.ndarray], optional
+            Training set target values for property prediction. Required unless
+            X_train is a packed dataset, whose stored targets are then used
         X_val : List[str], optional
             Validation set input molecular structures as SMILES strings.
             If None, training data will be used for validation
@@ -199,6 +213,12 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
         self : GRINMolecularPredictor
             Fitted estimator
         """
+        if isinstance(X_train, PackedGraphDataset) and y_train is None:
+            y_train = X_train.y
+        if y_train is None:
+            raise ValueError("y_train must be provided unless X_train is a PackedGraphDataset.")
+        if isinstance(X_val, PackedGraphDataset) and y_val is None:
+            y_val = X_val.y
         if (X_val is None) != (y_val is None):
             raise ValueError(
                 "Both X_val and y_val must be provided for validation. "
@@ -211,6 +231,7 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
         
         # Prepare datasets and loaders
         if self.polymer_train_augmentation is not None:
+            self._check_augmentation_input(X_train)
             X_train_aug, y_train_aug = SmilesRepeat(self.polymer_train_augmentation).repeat(X_train, y_train)
             X_train = X_train + X_train_aug
             if y_train_aug is not None:
@@ -219,14 +240,8 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
                 else:
                     y_train = list(y_train) + list(y_train_aug)
 
-        X_train, y_train = self._validate_inputs(X_train, y_train)
-        train_dataset = self._convert_to_pytorch_data(X_train, y_train)
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0
-        )
+        train_dataset = self._prepare_dataset(X_train, y_train)
+        train_loader = self._make_loader(train_dataset, shuffle=True)
 
         if X_val is None or y_val is None:
             val_loader = train_loader
@@ -237,6 +252,7 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
             )
         else:
             if self.polymer_train_augmentation is not None:
+                self._check_augmentation_input(X_val)
                 X_val_aug, y_val_aug = SmilesRepeat(self.polymer_train_augmentation).repeat(X_val, y_val)
                 X_val = X_val + X_val_aug
                 if y_val_aug is not None:
@@ -245,14 +261,8 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
                     else:
                         y_val = list(y_val) + list(y_val_aug)
 
-            X_val, y_val = self._validate_inputs(X_val, y_val)
-            val_dataset = self._convert_to_pytorch_data(X_val, y_val)
-            val_loader = DataLoader(
-                val_dataset,
-                batch_size=self.batch_size,
-                shuffle=False,
-                num_workers=0
-            )
+            val_dataset = self._prepare_dataset(X_val, y_val)
+            val_loader = self._make_loader(val_dataset, shuffle=False)
 
         # Initialize training state
         self.fitting_loss = []
@@ -353,7 +363,7 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
         losses = []
 
         for batch_idx, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
             if epoch >= self.epochs_to_penalize:
                 l1_penalty = min(epoch - self.epochs_to_penalize, 1) * self.l1_penalty
@@ -395,13 +405,24 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
         """
         self._check_is_fitted()
         if test_augmentation is not None:
-            X_aug, _ = SmilesRepeat(test_augmentation).repeat(X)
-            X = X_aug
+            self._check_augmentation_input(X)
+            X, valid = self._validate_inputs_tolerant(X, return_rdkit_mol=False)
+            # Repeat one by one to keep track of the molecules that could not be repeated
+            repeater = SmilesRepeat(test_augmentation)
+            X_aug, repeated = [], np.zeros(len(X), dtype=bool)
+            for i, smiles in enumerate(X):
+                smiles_aug, _ = repeater.repeat([smiles])
+                if smiles_aug:
+                    X_aug.append(smiles_aug[0])
+                    repeated[i] = True
+            dataset, valid_aug = self._prepare_predict_dataset(X_aug)
+            repeated[repeated] = valid_aug
+            valid[valid] = repeated
+        else:
+            dataset, valid = self._prepare_predict_dataset(X)
 
-        # Convert to PyTorch Geometric format and create loader
-        X, _ = self._validate_inputs(X)
-        dataset = self._convert_to_pytorch_data(X)
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        # Create loader
+        loader = self._make_loader(dataset, shuffle=False)
 
         if self.model is None:
             raise RuntimeError("Model not initialized")
@@ -418,9 +439,9 @@ class GRINMolecularPredictor(GNNMolecularPredictor):
             else:
                 iterator = loader
             for batch in iterator:
-                batch = batch.to(self.device)
+                batch = self._to_device(batch)
                 out = self.model(batch)
                 predictions.append(out["prediction"].cpu().numpy())
         return {
-            "prediction": np.concatenate(predictions, axis=0),
+            "prediction": self._fill_invalid(self._restore_order(np.concatenate(predictions, axis=0), loader), valid),
         }
\ No newline at end of file
@@ -4,6 +4,7 @@ from torch_geometric.nn import global_add_pool, global_mean_pool, global_max_poo
 
 from ...nn import GNN_node, GNN_node_Virtualnode, MLP
 from ...utils import init_weights
+from ...utils.graph.fingerprints import unpack_fingerprints, FINGERPRINT_NUM_BITS
 
 class GNN(nn.Module):
     def __init__(
@@ -86,10 +87,10 @@ class GNN(nn.Module):
     def _augmented_graph_features(self, batched_data, h_rep):
         if self.augmented_feature:
             if 'morgan' in self.augmented_feature:
-                morgan = batched_data.morgan.type_as(h_rep)
+                morgan = unpack_fingerprints(batched_data.morgan, FINGERPRINT_NUM_BITS["morgan"]).type_as(h_rep)
                 h_rep = torch.cat((h_rep, morgan), dim=1)
             if 'maccs' in self.augmented_feature:
-                maccs = batched_data.maccs.type_as(h_rep)
+                maccs = unpack_fingerprints(batched_data.maccs, FINGERPRINT_NUM_BITS["maccs"]).type_as(h_rep)
                 h_rep = torch.cat((h_rep, maccs), dim=1)
         return h_rep
 
@@ -101,22 +102,30 @@ class GNN(nn.Module):
         target = batched_data.y.to(torch.float32)
         is_labeled = batched_data.y == batched_data.y
 
-        dummy = torch.nn.Parameter(torch.Tensor([scale])).to(prediction.device)
-        losses_erm = criterion(prediction.to(torch.float32)[is_labeled] * dummy, target[is_labeled])
-        
         environments = batched_data.environment
         if environments.dim() > 1 and environments.shape[1] == 1:
             environments = environments.expand(-1, is_labeled.shape[1])
         environments = environments[is_labeled]
-        unique_envs = environments.unique()  
-        env_losses = []
-        for env in unique_envs:
-            env_mask = environments == env
-            env_loss = losses_erm[env_mask].mean()
-            env_grad = torch.autograd.grad(env_loss, dummy, create_graph=True)[0]
-            env_losses.append(torch.sum(env_grad**2))
-        
-        penalty = torch.sum(torch.stack(env_losses))
+
+        # Compact index of the environment of each label, without enumerating the
+        # environments on the host: at most one environment per label
+        num_labels = environments.size(0)
+        sorted_envs, order = torch.sort(environments)
+        is_new = torch.ones_like(sorted_envs, dtype=torch.bool)
+        is_new[1:] = sorted_envs[1:] != sorted_envs[:-1]
+        env_index = torch.empty_like(order)
+        env_index[order] = torch.cumsum(is_new, dim=0) - 1
+
+        # One dummy scale per environment: the loss of an environment only depends on
+        # its own scale, so one backward pass gives the gradients of all environments
+        dummy = torch.full((num_labels,), float(scale), device=prediction.device, requires_grad=True)
+        losses_erm = criterion(prediction.to(torch.float32)[is_labeled] * dummy[env_index], target[is_labeled])
+
+        env_sums = losses_erm.new_zeros(num_labels).index_add(0, env_index, losses_erm)
+        env_counts = losses_erm.new_zeros(num_labels).index_add(0, env_index, torch.ones_like(losses_erm))
+        env_losses = env_sums / env_counts.clamp(min=1)
+        env_grads = torch.autograd.grad(env_losses.sum(), dummy, create_graph=True)[0]
+        penalty = torch.sum(env_grads**2)
         total_loss = losses_erm.mean() + penalty_weight * penalty
         if penalty_weight > 1.0:
             total_loss /= penalty_weight
@@ -6,7 +6,7 @@ import torch
 from torch_geometric.data import Data
 
 from .model import GNN
-from ...utils import graph_from_smiles
+from ...utils import graphs_from_smiles, PackedGraphDataset
 from ..gnn.modeling_gnn import GNNMolecularPredictor
 from ...utils.search import (
     ParameterSpec,
@@ -82,6 +82,10 @@ class IRMMolecularPredictor(GNNMolecularPredictor):
         Whether to display progress info. Options are: "none", "progress_bar", "print_statement". If any other, "none" is automatically chosen.
     device : torch.device or str, optional
         Device to run the model on.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self,
@@ -120,6 +124,7 @@ class IRMMolecularPredictor(GNNMolecularPredictor):
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "IRMMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             num_task=num_task,
@@ -145,7 +150,8 @@ class IRMMolecularPredictor(GNNMolecularPredictor):
             evaluate_higher_better=evaluate_higher_better,
             verbose=verbose,
             device=device,
-            model_name=model_name
+            model_name=model_name,
+            **kwargs,
         )
         
         self.IRM_environment = IRM_environment
@@ -187,24 +193,27 @@ class IRMMolecularPredictor(GNNMolecularPredictor):
             if not all(isinstance(item, int) for item in self.IRM_environment):
                 raise ValueError("IRM_environment must be a list of integers")
 
+    def _prepare_dataset(self, X, y=None):
+        if isinstance(X, PackedGraphDataset) and y is not None:
+            raise ValueError(
+                "Training with a PackedGraphDataset is not supported because it does not store "
+                "the IRM environment of each molecule. Pass SMILES strings to fit instead."
+            )
+        return super()._prepare_dataset(X, y)
+
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert numpy arrays to PyTorch Geometric data format.
         """
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
-            iterator = enumerate(X)
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs: preparing data for training...")
-        else:
-            iterator = enumerate(X)
+        graphs = graphs_from_smiles(
+            X, y, self.augmented_feature,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
 
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            if y is not None:
-                properties = y[idx]
-            else:
-                properties = None
-            graph = graph_from_smiles(smiles_or_mol, properties, self.augmented_feature)
+        for idx, graph in enumerate(graphs):
             g = Data()
             g.num_nodes = graph["num_nodes"]
             g.edge_index = torch.from_numpy(graph["edge_index"])
@@ -225,11 +234,11 @@ class IRMMolecularPredictor(GNNMolecularPredictor):
                 del graph["y"]
    
             if graph["morgan"] is not None:
-                g.morgan = torch.tensor(graph["morgan"], dtype=torch.int8).view(1, -1)
+                g.morgan = torch.from_numpy(graph["morgan"]).view(1, -1)
                 del graph["morgan"]
             
             if graph["maccs"] is not None:
-                g.maccs = torch.tensor(graph["maccs"], dtype=torch.int8).view(1, -1)
+                g.maccs = torch.from_numpy(graph["maccs"]).view(1, -1)
                 del graph["maccs"]
     
             if self.IRM_environment == "random":
@@ -252,7 +261,7 @@ class IRMMolecularPredictor(GNNMolecularPredictor):
         penalties = []
 
         for batch_idx, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
 
             if epoch >= self.penalty_anneal_iters:
@@ -77,6 +77,10 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
         Device to run the model on. If None, will auto-detect GPU or use CPU.
     model_name : str, default="LSTMMolecularPredictor"
         Name identifier for the model.  
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self,
@@ -102,6 +106,7 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
         scheduler_factor: float = 0.5,
         scheduler_patience: int = 5,
         verbose: str = "none",
+        **kwargs,
     ):
         super().__init__(
             device=device,
@@ -109,6 +114,7 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
             num_task=num_task,
             task_type=task_type,
             verbose=verbose,
+            **kwargs,
         )
         
         self.input_dim = input_dim
@@ -211,6 +217,16 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
                                     torch.zeros(len(tokenized_X), dtype=torch.float32))
 
 
+    def _make_loader(self, dataset, X: List[str], shuffle: bool = False) -> DataLoader:
+        """Create a data loader over the tokenized SMILES strings ``X``.
+
+        With bucketing enabled, batches group SMILES strings with similar numbers of
+        tokens. Sequences are still padded to ``max_input_len``, which the output layer
+        requires, so the budget counts the tokens before padding.
+        """
+        sizes = [min(len(smiles), self.max_input_len) for smiles in X]
+        return self._make_bucketed_loader(DataLoader, dataset, sizes, shuffle=shuffle)
+
     def _setup_optimizers(self) -> Tuple[torch.optim.Optimizer, Optional[Any]]:
         """Setup optimization components including optimizer and learning rate scheduler.
 
@@ -432,12 +448,7 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
         
         X_train, y_train = self._validate_inputs(X_train, y_train, return_rdkit_mol=False)
         train_dataset = self._convert_to_pytorch_data(X_train, y_train)
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0
-        )
+        train_loader = self._make_loader(train_dataset, X_train, shuffle=True)
 
         if X_val is None or y_val is None:
             val_loader = train_loader
@@ -449,12 +460,7 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
         else:
             X_val, y_val = self._validate_inputs(X_val, y_val, return_rdkit_mol=False)
             val_dataset = self._convert_to_pytorch_data(X_val, y_val)
-            val_loader = DataLoader(
-                val_dataset,
-                batch_size=self.batch_size,
-                shuffle=False,
-                num_workers=0
-            )
+            val_loader = self._make_loader(val_dataset, X_val, shuffle=False)
 
         # Initialize training state
         self.fitting_loss = []
@@ -565,10 +571,9 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
         self._check_is_fitted()
 
         # Convert to token format and create loader
-        if not isinstance(X, list) or not all(isinstance(item, str) for item in X):
-            raise TypeError(f"Expected X to be a list of strings, but got {type(X)} with elements {X}")
-        dataset = self._convert_to_pytorch_data(X) 
-        loader = DataLoader(dataset, batch_size=self.batch_size, shuffle=False)
+        X, valid = self._validate_inputs_tolerant(X, return_rdkit_mol=False)
+        dataset = self._convert_to_pytorch_data(X)
+        loader = self._make_loader(dataset, X, shuffle=False)
 
         if self.model is None:
             raise RuntimeError("Model not initialized")
@@ -579,12 +584,12 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
         with torch.no_grad():
             for batch in tqdm(loader, disable=self.verbose != 'progress_bar'):
                 batched_input, batched_label = batch
-                batched_input = batched_input.to(self.device)
+                batched_input = self._to_device(batched_input)
  
                 out = self.model(batched_input)
                 predictions.append(out["prediction"].cpu().numpy())
         return {
-            "prediction": np.concatenate(predictions, axis=0),
+            "prediction": self._fill_invalid(self._restore_order(np.concatenate(predictions, axis=0), loader), valid),
         }
 
     def _evaluation_epoch(
@@ -612,7 +617,7 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
         with torch.no_grad():
             for batch in loader:
                 batched_input, batched_label = batch
-                batched_input = batched_input.to(self.device)
+                batched_input = self._to_device(batched_input)
 
                 out = self.model(batched_input)
                 y_pred_list.append(out["prediction"].detach().cpu().numpy())  # ensuring NumPy format
@@ -644,8 +649,8 @@ class LSTMMolecularPredictor(BaseMolecularPredictor):
 
         for batch_idx, batch in enumerate(train_loader):
             batched_input, batched_label = batch
-            batched_input = batched_input.to(self.device)
-            batched_label = batched_label.to(self.device)
+            batched_input = self._to_device(batched_input)
+            batched_label = self._to_device(batched_label)
             optimizer.zero_grad()
 
             loss = self.model.compute_loss(batched_input, batched_label, self.loss_criterion)
@@ -1,9 +1,9 @@
 import torch
-import torch
 import torch.nn as nn
 from torch_geometric.nn import global_add_pool, global_mean_pool, global_max_pool
 from ...nn import GNN_node, GNN_node_Virtualnode, MLP
 from ...utils import init_weights
+from ...utils.graph.fingerprints import unpack_fingerprints, FINGERPRINT_NUM_BITS
 
 
 class RPGNN(nn.Module):
@@ -19,7 +19,8 @@ class RPGNN(nn.Module):
         drop_ratio=0.5,
         norm_layer="batch_norm",
         graph_pooling="mean",
-        augmented_feature=['maccs', 'morgan']
+        augmented_feature=['maccs', 'morgan'],
+        stack_perm=False
     ):
         """
         Random Permutation Graph Neural Network (RPGNN)
@@ -36,6 +37,8 @@ class RPGNN(nn.Module):
             norm_layer: Type of normalization layer
             graph_pooling: Type of graph pooling (mean, sum, max)
             augmented_feature: List of additional molecular features to use
+            stack_perm: Whether to run the GNN once on a disjoint batch stacking all
+                permutations instead of once per permutation
         """
         super(RPGNN, self).__init__()
         
@@ -44,6 +47,7 @@ class RPGNN(nn.Module):
         self.hidden_size = hidden_size
         self.fixed_size = fixed_size
         self.num_perm = num_perm
+        self.stack_perm = stack_perm
         self.augmented_feature = augmented_feature
         self.num_node_feature = num_node_feature        
         # Register fixed-size node IDs (position encoding)
@@ -118,58 +122,82 @@ class RPGNN(nn.Module):
             return h_rep
             
         if "morgan" in self.augmented_feature:
-            morgan = batched_data.morgan.type_as(h_rep)
+            morgan = unpack_fingerprints(batched_data.morgan, FINGERPRINT_NUM_BITS["morgan"]).type_as(h_rep)
             h_rep = torch.cat((h_rep, morgan), dim=1)
         if "maccs" in self.augmented_feature:
-            maccs = batched_data.maccs.type_as(h_rep)
+            maccs = unpack_fingerprints(batched_data.maccs, FINGERPRINT_NUM_BITS["maccs"]).type_as(h_rep)
             h_rep = torch.cat((h_rep, maccs), dim=1)
             
         return h_rep
 
+    def permuted_node_ids(self, batch, num_perm):
+        """Node IDs of random permutations of the nodes of every graph.
+
+        Each permutation gives the nodes of a graph distinct positions in random order,
+        drawn for all graphs at once by sorting random keys within each graph. A node
+        at position i gets the one-hot ID of i % fixed_size.
+
+        Args:
+            batch: Graph index of each node, with the nodes of each graph contiguous
+            num_perm: Number of permutations
+
+        Returns:
+            torch.Tensor: One-hot node IDs of shape [num_perm, num_nodes, fixed_size]
+        """
+        num_nodes = batch.size(0)
+        counts = torch.bincount(batch)
+        ptr = torch.cumsum(counts, dim=0) - counts
+        # graphs stay contiguous since the random keys are in [0, 1)
+        keys = batch.double() + torch.rand(num_perm, num_nodes, dtype=torch.double, device=batch.device)
+        order = torch.argsort(keys, dim=1)
+        position = torch.empty_like(order)
+        position.scatter_(1, order, torch.arange(num_nodes, device=batch.device).expand(num_perm, -1))
+        position = position - ptr[batch]
+        return self.node_ids[position % self.fixed_size]
+
     def forward(self, batched_data):
         """Forward pass of RPGNN."""
         # Extract original data
-        x, edge_index, batch = batched_data.x, batched_data.edge_index, batched_data.batch
-        
-        # Initialize final output
-        out = None
-        
-        # Average over multiple permutations
-        for _ in range(self.num_perm):
-            temp_data = batched_data.clone()
-            # Create new_x with same dtype as x
-            new_x = torch.empty(x.size(0), x.size(1) + self.fixed_size, dtype=x.dtype, device=x.device)
-            
-            for graph_idx in range(batch.max().item() + 1):
-                node_indices = (batch == graph_idx).nonzero().squeeze(1)
-                graph_size = node_indices.size(0)
-                perm = torch.randperm(graph_size)
-
-                node_ids = self.node_ids.repeat(
-                    graph_size // self.fixed_size + 1, 1
-                )[:graph_size]
-                permuted_node_ids = node_ids[perm, :]
-                
-                # Convert both tensors to the same type as x before concatenation
-                new_x[node_indices] = torch.cat([x[node_indices].to(x.dtype), permuted_node_ids.to(x.dtype)], dim=1)
-            temp_data.x = new_x[:,:self.num_node_feature]
-            # Process through GNN
-            h_v, _ = self.gnn(temp_data)
+        x, edge_index, edge_attr, batch = batched_data.x, batched_data.edge_index, batched_data.edge_attr, batched_data.batch
+        num_nodes = x.size(0)
+        num_graphs = batched_data.num_graphs
 
-            fused_h_v = torch.cat([h_v, new_x[:,self.num_node_feature:]], dim=1)
+        node_ids = self.permuted_node_ids(batch, self.num_perm).to(x.dtype)
+        new_x = torch.cat([x.unsqueeze(0).expand(self.num_perm, -1, -1), node_ids], dim=2)
+
+        if self.stack_perm:
+            # All permutations form one disjoint batch of num_perm * num_graphs graphs
+            offsets = torch.arange(self.num_perm, device=x.device)
+            stacked_edge_index = (edge_index.unsqueeze(0) + (offsets * num_nodes).view(-1, 1, 1)).permute(1, 0, 2).reshape(2, -1)
+            stacked_edge_attr = edge_attr.repeat(self.num_perm, 1)
+            stacked_batch = (batch.unsqueeze(0) + (offsets * num_graphs).view(-1, 1)).view(-1)
+            stacked_x = new_x.reshape(self.num_perm * num_nodes, -1)
+
+            h_v, _ = self.gnn(stacked_x[:, :self.num_node_feature], stacked_edge_index, stacked_edge_attr, stacked_batch)
+            fused_h_v = torch.cat([h_v, stacked_x[:, self.num_node_feature:]], dim=1)
+            h_rep = self.pool(fused_h_v, stacked_batch, size=self.num_perm * num_graphs)
+            out = h_rep.view(self.num_perm, num_graphs, -1).mean(dim=0)
+        else:
+            # Average over multiple permutations
+            out = None
+            for perm_x in new_x:
+                # Process through GNN
+                h_v, _ = self.gnn(perm_x[:, :self.num_node_feature], edge_index, edge_attr, batch)
+
+                fused_h_v = torch.cat([h_v, perm_x[:, self.num_node_feature:]], dim=1)
+
+                # Pool node representations to graph representations
+                h_rep = self.pool(fused_h_v, batch, size=num_graphs)
+
+                # Accumulate output
+                if out is None:
+                    out = h_rep / self.num_perm
+                else:
+                    out += h_rep / self.num_perm
+
+        # Add augmented features (the same for all permutations)
+        out = self._augmented_graph_features(batched_data, out)
 
-            # Pool node representations to graph representations
-            h_rep = self.pool(fused_h_v, temp_data.batch)
-            
-            # Add augmented features
-            h_rep = self._augmented_graph_features(temp_data, h_rep)
-            
-            # Accumulate output
-            if out is None:
-                out = h_rep / self.num_perm
-            else:
-                out += h_rep / self.num_perm
-        
         # Final prediction
         prediction = self.predictor(out)
         
@@ -85,6 +85,19 @@ class RPGNNMolecularPredictor(GNNMolecularPredictor):
     num_node_feature : int, default=9
         Dimension of the input node features. This should match the number of atomic features used to represent
         each node in the molecular graph (e.g., atomic number, degree, hybridization, etc.).
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes), and ``stack_perm``. They can also be
+        changed later with ``set_params`` and are not saved with checkpoints.
+
+    Attributes
+    ----------
+    stack_perm : bool
+        Whether the GNN runs once per batch on all ``num_perm`` permutations stacked
+        into one disjoint batch, instead of once per permutation, during training and
+        prediction. Batch normalization statistics are then computed over the stacked
+        batch. Defaults to False. It is a runtime setting that can be changed with
+        ``set_params`` and is not saved with the model checkpoint.
     """
     def __init__(
         self,
@@ -122,7 +135,9 @@ class RPGNNMolecularPredictor(GNNMolecularPredictor):
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "RPGNNMolecularPredictor",
+        **kwargs,
     ):
+        stack_perm = kwargs.pop("stack_perm", False)
         super().__init__(
             device=device,
             model_name=model_name,
@@ -147,17 +162,29 @@ class RPGNNMolecularPredictor(GNNMolecularPredictor):
             loss_criterion=loss_criterion,
             evaluate_criterion=evaluate_criterion,
             evaluate_higher_better=evaluate_higher_better,
-            verbose=verbose
+            verbose=verbose,
+            **kwargs,
         )
         self.num_perm = num_perm
         self.fixed_size = fixed_size
         self.num_node_feature = num_node_feature
+        self.stack_perm = stack_perm
         self.model_class = RPGNN
 
     @staticmethod
     def _get_param_names() -> List[str]:
         return ["num_perm", "fixed_size", "num_node_feature"] + GNNMolecularPredictor._get_param_names()
 
+    @staticmethod
+    def _get_runtime_param_names() -> List[str]:
+        return GNNMolecularPredictor._get_runtime_param_names() + ["stack_perm"]
+
+    def set_params(self, **params) -> "RPGNNMolecularPredictor":
+        super().set_params(**params)
+        if "stack_perm" in params and self.model is not None:
+            self.model.stack_perm = self.stack_perm
+        return self
+
     def _get_default_search_space(self):
         search_space = super()._get_default_search_space().copy()
         search_space["num_perm"] = ParameterSpec(ParameterType.INTEGER, (1, 10))
@@ -174,5 +201,6 @@ class RPGNNMolecularPredictor(GNNMolecularPredictor):
             base_params["num_perm"] = self.num_perm
             base_params["fixed_size"] = self.fixed_size
             base_params["num_node_feature"] = self.num_node_feature
+        base_params["stack_perm"] = self.stack_perm
         base_params.pop("graph_pooling", None)
         return base_params
\ No newline at end of file
@@ -7,9 +7,10 @@ import copy
 import torch
 from torch_geometric.loader import DataLoader
 
-from .strategy import build_selection_dataset, build_augmentation_dataset
+from .strategy import PseudoLabelPool, build_selection_dataset, build_augmentation_dataset
 from ..grea.modeling_grea import GREAMolecularPredictor
 from ..grea.model import GREA
+from ...utils import PackedGraphDataset
 
 from ...utils.search import (
     ParameterSpec,
@@ -39,6 +40,9 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
         Interval (in epochs) between two data augmentation steps. It controls the update frequency of data augmentation.
     top_quantile : float, default=0.1
         Quantile threshold for selecting high confidence predictions during pseudo-labeling.
+    refresh_ratio : float, default=1.0
+        Fraction of the unlabeled molecules re-scored at each pseudo-labeling or data augmentation step.
+        Predictions of the other unlabeled molecules are reused from earlier steps. The first step scores all of them.
     label_logscale : bool, default=False
         Whether to use log scale for the label space during pseudo-labeling and data augmentation.
     lw_aug : float, default=1
@@ -94,6 +98,10 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
         Device to run the model on. If None, will auto-detect GPU or use CPU.
     model_name : str, default="SGIRMolecularPredictor"
         Name identifier for the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     
     def __init__(
@@ -104,6 +112,7 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
         labeling_interval: int = 5,
         augmentation_interval: int = 5,
         top_quantile: float = 0.1,
+        refresh_ratio: float = 1.0,
         label_logscale: bool = False,
         lw_aug: float = 1,
         gamma: float = 0.4,
@@ -137,6 +146,7 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "SGIRMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             gamma=gamma,
@@ -164,6 +174,7 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
             verbose=verbose,
             device=device,
             model_name=model_name,
+            **kwargs,
         )
         
         # SGIR-specific parameters
@@ -172,6 +183,7 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
         self.labeling_interval = labeling_interval
         self.augmentation_interval = augmentation_interval
         self.top_quantile = top_quantile
+        self.refresh_ratio = refresh_ratio
         self.label_logscale = label_logscale
         self.lw_aug = lw_aug
 
@@ -182,7 +194,7 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
     def _get_param_names():
         grea_params = [
             "num_anchor", "warmup_epoch", "labeling_interval",
-            "augmentation_interval", "top_quantile", "label_logscale", "lw_aug"
+            "augmentation_interval", "top_quantile", "refresh_ratio", "label_logscale", "lw_aug"
         ]
         return grea_params + GREAMolecularPredictor._get_param_names()
 
@@ -197,14 +209,20 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
 
     def fit(
         self,
-        X_train: List[str],
-        y_train: Optional[Union[List, np.ndarray]],
+        X_train: Union[List[str], PackedGraphDataset],
+        y_train: Optional[Union[List, np.ndarray]] = None,
         X_val: Optional[List[str]] = None,
         y_val: Optional[Union[List, np.ndarray]] = None,
         X_unlbl: Optional[List[str]] = None,
     ) -> "SGIRMolecularPredictor":
         """Fit the model to training data with optional validation set.
         """
+        if isinstance(X_train, PackedGraphDataset) and y_train is None:
+            y_train = X_train.y
+        if y_train is None:
+            raise ValueError("y_train must be provided unless X_train is a PackedGraphDataset.")
+        if isinstance(X_val, PackedGraphDataset) and y_val is None:
+            y_val = X_val.y
         if (X_val is None) != (y_val is None):
             raise ValueError("X_val and y_val must both be provided for validation")
         if X_unlbl is None:
@@ -218,18 +236,12 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
         optimizer, scheduler = self._setup_optimizers()
         
         # Prepare datasets
-        X_train, y_train = self._validate_inputs(X_train, y_train)
-        train_dataset = self._convert_to_pytorch_data(X_train, y_train)
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0
+        train_dataset = self._prepare_packed_dataset(X_train, y_train)
+        train_loader = self._make_loader(train_dataset, shuffle=True)
+        pool = PseudoLabelPool(
+            train_dataset, self._prepare_packed_dataset(X_unlbl), self.batch_size, self.refresh_ratio
         )
 
-        X_unlbl, _ = self._validate_inputs(X_unlbl, None)
-        unlbl_dataset = self._convert_to_pytorch_data(X_unlbl)
-
         if X_val is None:
             val_loader = train_loader
             warnings.warn(
@@ -237,14 +249,8 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
                 UserWarning
             )
         else:
-            X_val, y_val = self._validate_inputs(X_val, y_val)
-            val_dataset = self._convert_to_pytorch_data(X_val, y_val)
-            val_loader = DataLoader(
-                val_dataset,
-                batch_size=self.batch_size,
-                shuffle=False,
-                num_workers=0
-            )
+            val_dataset = self._prepare_dataset(X_val, y_val)
+            val_loader = self._make_loader(val_dataset, shuffle=False)
 
         # Training loop
         augmented_dataset = None
@@ -277,18 +283,20 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
                 
                 # Update datasets after warmup
                 if epoch > self.warmup_epoch:
-                    if epoch % self.labeling_interval == 0:
+                    relabel = epoch % self.labeling_interval == 0
+                    augment = epoch % self.augmentation_interval == 0
+                    if relabel or augment:
+                        pool.refresh(self.model, self.device, **self._loader_kwargs())
+
+                    if relabel:
                         train_loader = build_selection_dataset(
-                            self.model, train_dataset, unlbl_dataset,
-                            self.batch_size, self.num_anchor, self.top_quantile,
-                            self.device, self.label_logscale
+                            pool, self.batch_size, self.num_anchor, self.top_quantile,
+                            self.label_logscale, **self._loader_kwargs()
                         )
 
-                    if epoch % self.augmentation_interval == 0:
+                    if augment:
                         augmented_dataset = build_augmentation_dataset(
-                            self.model, train_dataset, unlbl_dataset,
-                            self.batch_size, self.num_anchor, self.device, 
-                            self.label_logscale
+                            pool, self.num_anchor, self.device, self.label_logscale
                         )
 
                 self.fitting_loss.append(np.mean(train_losses))
@@ -355,6 +363,19 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
         self.is_fitted_ = True
         return self
     
+    def _prepare_packed_dataset(self, X, y=None):
+        """Validate inputs and pack them into a ``PackedGraphDataset``.
+
+        Pseudo-labeling selects graphs by index from packed datasets, so SMILES inputs
+        are packed instead of being converted to a list of ``Data`` objects.
+        """
+        if isinstance(X, PackedGraphDataset):
+            return self._prepare_dataset(X, y)
+        X, y = self._validate_inputs(X, y, known_valid=self._featurization_cached(X))
+        return PackedGraphDataset.from_smiles(
+            X, y, self.augmented_feature, n_jobs=self.n_jobs, progress_bar=self.verbose == "progress_bar"
+        )
+
     def _train_epoch(self, train_loader, augmented_dataset, optimizer, epoch, global_pbar=None):
         """Training logic for one epoch.
 
@@ -385,7 +406,7 @@ class SGIRMolecularPredictor(GREAMolecularPredictor):
             aug_outputs = None
 
         for batch_idx, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
 
             # augmentation loss
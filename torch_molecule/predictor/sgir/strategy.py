@@ -1,8 +1,10 @@
+import numpy as np
 import torch
-from torch_geometric.data import Data
 from torch.distributions.beta import Beta
-from torch_geometric.loader import DataLoader
-from typing import List, Tuple, Dict, Optional
+from torch.utils.data import DataLoader, BatchSampler, SubsetRandomSampler
+from typing import Tuple, Dict
+
+from ...utils.graph.packed_dataset import PackedGraphDataset, _ConcatPackedGraphDataset
 
 def get_sample_probs(counts: torch.Tensor) -> torch.Tensor:
     """Calculate sampling probabilities based on counts."""
@@ -12,24 +14,6 @@ def get_sample_probs(counts: torch.Tensor) -> torch.Tensor:
     probs[idx] = sample_rate
     return probs
 
-def get_datapoint_list(subset_data: List[Data], new_label_all: Optional[torch.Tensor] = None) -> List[Data]:
-    """Convert dataset into list of Data objects with optional new labels."""
-    datapoint_list = []
-    for idx, datapoint in enumerate(subset_data):
-        g = Data(
-            edge_index=datapoint.edge_index,
-            edge_attr=datapoint.edge_attr,
-            x=datapoint.x,
-            y=torch.tensor([[new_label_all[idx]]]) if new_label_all is not None else datapoint.y
-        )
-        
-        for attr in ['morgan', 'maccs']:
-            if hasattr(datapoint, attr):
-                setattr(g, attr, getattr(datapoint, attr))
-                
-        datapoint_list.append(g)
-    return datapoint_list
-
 def mean_by_groups(sample_rep: torch.Tensor, groups: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
     """Calculate mean representations and counts per group."""
     weight = torch.zeros(groups.max() + 1, sample_rep.shape[0], device=sample_rep.device)
@@ -40,42 +24,134 @@ def mean_by_groups(sample_rep: torch.Tensor, groups: torch.Tensor) -> Tuple[torc
     valid_indices = torch.nonzero(group_count > 0).squeeze()
     return mean[valid_indices], group_count[valid_indices]
 
+def get_label_boundaries(labeled_targets: torch.Tensor, num_anchor: int, label_logscale: bool = False) -> torch.Tensor:
+    """Split the range of the labels into ``num_anchor`` buckets and return the bucket boundaries."""
+    start, end = labeled_targets.min(), labeled_targets.max()
+    if label_logscale:
+        start, end = torch.log10(start), torch.log10(end)
+    boundaries = torch.linspace(start, end, steps=num_anchor + 1)
+    if label_logscale:
+        boundaries = torch.pow(10, boundaries)
+    return boundaries
+
+class PseudoLabelPool:
+    """Labeled and unlabeled graphs packed together, with cached model outputs on the unlabeled graphs.
+
+    The labeled graphs come first in ``dataset``, followed by the unlabeled graphs.
+    ``dataset`` is a view over both datasets, so a memory-mapped unlabeled set stays
+    on disk. Predictions, variances and representations of the unlabeled graphs are
+    cached on the CPU. The representations take ``4 * num_unlabeled * hidden_size``
+    bytes, about 1.2 GB for 1M molecules with ``hidden_size=300``. The first ``refresh`` scores every unlabeled graph, and each later call
+    re-scores the next ``refresh_ratio`` of them, wrapping around, so the cost of a
+    refresh does not grow with the number of pseudo-labeling steps. Pseudo-labeled
+    training sets are index selections over ``dataset`` that share its graph arrays.
+
+    Args:
+        labeled_dataset: Packed labeled graphs
+        unlbl_dataset: Packed unlabeled graphs
+        batch_size: Number of graphs per inference batch
+        refresh_ratio: Fraction of the unlabeled graphs re-scored by each refresh
+    """
+    def __init__(
+        self,
+        labeled_dataset: PackedGraphDataset,
+        unlbl_dataset: PackedGraphDataset,
+        batch_size: int,
+        refresh_ratio: float = 1.0,
+    ):
+        if not 0 < refresh_ratio <= 1:
+            raise ValueError(f"refresh_ratio must be in (0, 1], got {refresh_ratio}.")
+        self.dataset = _ConcatPackedGraphDataset([labeled_dataset, unlbl_dataset])
+        self.num_labeled = len(labeled_dataset)
+        self.num_unlabeled = len(unlbl_dataset)
+        self.batch_size = batch_size
+        self.refresh_ratio = refresh_ratio
+        self.labeled_targets = torch.from_numpy(np.asarray(labeled_dataset.y, dtype=np.float32)).view(-1)
+
+        # outputs on the labeled graphs, recomputed by every refresh
+        self.labeled_idx = torch.zeros(0, dtype=torch.long)
+        self.labeled_variance = torch.zeros(0)
+        self.labeled_representation = None
+
+        # cached outputs on the unlabeled graphs
+        self.prediction = torch.zeros(self.num_unlabeled)
+        self.variance = torch.zeros(self.num_unlabeled)
+        self.representation = None
+        self.scored = torch.zeros(self.num_unlabeled, dtype=torch.bool)
+        self._cursor = None
+
+    def _infer(self, model: torch.nn.Module, indices: torch.Tensor, device: torch.device, **loader_kwargs):
+        """Run the model on the graphs ``indices`` of ``dataset``.
+
+        Batches with at most one node are skipped, so the returned indices are the ones
+        that were scored, followed by their predictions, variances and representations.
+        """
+        chunks = [chunk.tolist() for chunk in torch.split(indices, self.batch_size)]
+        loader = self.dataset.loader(self.batch_size, batch_sampler=chunks, **loader_kwargs)
+        kept, preds, variances, reps = [], [], [], []
+        model.eval()
+        with torch.no_grad():
+            for chunk, batch in zip(chunks, loader):
+                if batch.x.shape[0] <= 1:
+                    continue
+                output = model(batch.to(device))
+                kept.append(torch.tensor(chunk, dtype=torch.long))
+                preds.append(output['prediction'].view(-1).cpu())
+                variances.append(output['variance'].view(-1).cpu())
+                reps.append(output['representation'].cpu())
+        if not kept:
+            return torch.zeros(0, dtype=torch.long), torch.zeros(0), torch.zeros(0), None
+        return torch.cat(kept), torch.cat(preds), torch.cat(variances), torch.cat(reps)
+
+    def refresh(self, model: torch.nn.Module, device: torch.device, **loader_kwargs) -> None:
+        """Score the labeled graphs and the next window of unlabeled graphs with ``model``.
+
+        ``loader_kwargs`` are passed to every ``DataLoader`` created here.
+        """
+        labeled_idx, _, labeled_variance, labeled_rep = self._infer(
+            model, torch.arange(self.num_labeled), device, **loader_kwargs
+        )
+        self.labeled_idx, self.labeled_variance = labeled_idx, labeled_variance
+        self.labeled_representation = labeled_rep
+
+        if self._cursor is None:
+            window = torch.arange(self.num_unlabeled)
+            self._cursor = 0
+        else:
+            size = min(self.num_unlabeled, max(1, int(np.ceil(self.refresh_ratio * self.num_unlabeled))))
+            window = (self._cursor + torch.arange(size)) % self.num_unlabeled
+            self._cursor = (self._cursor + size) % self.num_unlabeled
+
+        idx, pred, variance, rep = self._infer(model, window + self.num_labeled, device, **loader_kwargs)
+        if len(idx) == 0:
+            return
+        idx = idx - self.num_labeled
+        if self.representation is None:
+            self.representation = torch.zeros(self.num_unlabeled, rep.size(1))
+        self.prediction[idx] = pred
+        self.variance[idx] = variance
+        self.representation[idx] = rep
+        self.scored[idx] = True
+
 def build_selection_dataset(
-    model: torch.nn.Module,
-    labeled_dataset: Data,
-    unlbl_dataset: Data,
+    pool: PseudoLabelPool,
     batch_size: int,
     num_anchor: int,
     threshold: float,
-    device: torch.device,
-    label_logscale: bool = False
+    label_logscale: bool = False,
+    **loader_kwargs
 ) -> DataLoader:
-    """Build selection dataset using model predictions and uncertainty."""
-    labeled_targets = torch.tensor([g.y for g in labeled_dataset])
-    unlabel_idx = torch.arange(len(unlbl_dataset))
-
-    # Create data loaders
-    unlbl_loader = DataLoader(unlbl_dataset, batch_size=batch_size, shuffle=False)
-    labeled_loader = DataLoader(labeled_dataset, batch_size=batch_size, shuffle=False)
-    
-    # Get model predictions and uncertainty for unlabeled data
-    model.eval()
-    unlbl_pred, unlbl_env_vars = [], []
-    
-    with torch.no_grad():
-        for batch in unlbl_loader:
-            if batch.x.shape[0] <= 1:
-                continue
-                
-            batch = batch.to(device)
-            output = model(batch)
-            pred = output['prediction']
-            var = output['variance']
-            unlbl_env_vars.append(var.detach())
-            unlbl_pred.append(pred.detach())
-
-    unlbl_pred = torch.cat(unlbl_pred, dim=0).cpu().view(-1)
-    unlbl_env_vars = torch.cat(unlbl_env_vars, dim=0).cpu().view(-1)
+    """Build a loader over the labeled graphs and the selected pseudo-labeled graphs.
+
+    Unlabeled graphs are selected from the cached outputs of ``pool``: their variance
+    must not exceed the ``threshold`` quantile of the labeled variances, and each label
+    bucket picks the graphs predicted closest to its center, labeled with the center.
+    ``loader_kwargs`` are passed to the ``DataLoader`` created here.
+    """
+    labeled_targets = pool.labeled_targets
+    unlabel_idx = torch.nonzero(pool.scored).view(-1)
+    unlbl_pred = pool.prediction[unlabel_idx]
+    unlbl_env_vars = pool.variance[unlabel_idx]
 
     # Sort by uncertainty
     var_asc_idx = torch.argsort(unlbl_env_vars)
@@ -83,159 +159,101 @@ def build_selection_dataset(
     unlbl_pred = unlbl_pred[var_asc_idx]
     unlabel_idx = unlabel_idx[var_asc_idx]
 
-    # Get uncertainty for labeled data
-    labeled_env_vars = []
-    with torch.no_grad():
-        for batch in labeled_loader:
-            if batch.x.shape[0] <= 1:
-                continue
-                
-            batch = batch.to(device)
-            output = model(batch)
-            var = output['variance']
-            labeled_env_vars.append(var.detach())
-            
-    labeled_env_vars = torch.cat(labeled_env_vars, dim=0).cpu().view(-1)
-
     # Filter by uncertainty threshold
-    uncertainty_masks = unlbl_env_vars <= torch.quantile(labeled_env_vars, threshold)
+    if len(pool.labeled_variance) > 0:
+        uncertainty_masks = unlbl_env_vars <= torch.quantile(pool.labeled_variance, threshold)
+    else:
+        uncertainty_masks = torch.zeros_like(unlbl_env_vars, dtype=torch.bool)
     unlbl_pred = unlbl_pred[uncertainty_masks]
     unlabel_idx = unlabel_idx[uncertainty_masks]
 
-    # Create label boundaries
-    start, end = labeled_targets.min(), labeled_targets.max()
-    if label_logscale:
-        start, end = torch.log10(start), torch.log10(end)
-    boundaries = torch.linspace(start, end, steps=num_anchor + 1)
-    if label_logscale:
-        boundaries = torch.pow(10, boundaries)
-
     # Assign samples to buckets
-    bucket_ids = torch.bucketize(labeled_targets.view(-1), boundaries)
+    boundaries = get_label_boundaries(labeled_targets, num_anchor, label_logscale)
+    bucket_ids = torch.bucketize(labeled_targets, boundaries)
     bucket_ids = torch.clamp(bucket_ids, min=1, max=len(boundaries) - 1)
     unique_buckets, bucket_counts = torch.unique(bucket_ids, sorted=True, return_counts=True)
     bucket_centers = (boundaries[unique_buckets - 1] + boundaries[unique_buckets]) / 2
-    
+
     # Sample from each bucket
     sampling_probs = get_sample_probs(bucket_counts)
-    new_idx_all, new_label_all = [], []
-    
+    new_idx_all, new_label_all = [torch.zeros(0, dtype=torch.long)], [torch.zeros(0)]
+
     for idx, anchor in enumerate(bucket_centers):
         upper_idx = torch.nonzero(boundaries > anchor)[0]
         lower_idx = torch.nonzero(boundaries < anchor)[-1]
         width = boundaries[upper_idx] - boundaries[lower_idx]
-        
+
         valid_mask = torch.logical_and(
             unlbl_pred >= anchor - width/2,
             unlbl_pred < anchor + width/2
         )
-        
+
         num_picked = min(
             int(valid_mask.sum() * sampling_probs[idx]),
-            bucket_counts.max()
+            int(bucket_counts.max())
         )
-        
+
         if num_picked > 0:
             label_dist = torch.abs(anchor - unlbl_pred[valid_mask])
             idx_sorted = torch.argsort(label_dist)[:num_picked]
-            new_idx = unlabel_idx[valid_mask][idx_sorted]
-            new_idx_all.append(new_idx)
-            new_label_all.append(torch.full((num_picked,), anchor))
-
-    if new_idx_all:
-        new_idx_all = torch.cat(new_idx_all)
-        new_label_all = torch.cat(new_label_all)
-        
-        # Create final dataset
-        new_trainset = get_datapoint_list(labeled_dataset)
-        new_unlbl_data = [unlbl_dataset[idx.item()] for idx in new_idx_all]
-        
-        new_trainset.extend(get_datapoint_list(new_unlbl_data, new_label_all))
-        
-        return DataLoader(new_trainset, batch_size=batch_size, shuffle=True)
-    
-    return DataLoader(get_datapoint_list(labeled_dataset), batch_size=batch_size, shuffle=True)
+            new_idx_all.append(unlabel_idx[valid_mask][idx_sorted])
+            new_label_all.append(torch.full((num_picked,), anchor.item()))
+
+    # Select the graphs by index instead of copying them
+    new_idx_all = torch.cat(new_idx_all) + pool.num_labeled
+    targets = np.full((len(pool.dataset), 1), np.nan, dtype=np.float32)
+    targets[:pool.num_labeled, 0] = labeled_targets.numpy()
+    targets[new_idx_all.numpy(), 0] = torch.cat(new_label_all).numpy()
+    indices = torch.cat([torch.arange(pool.num_labeled), new_idx_all]).tolist()
+    batch_sampler = BatchSampler(SubsetRandomSampler(indices), batch_size=batch_size, drop_last=False)
+    return pool.dataset.with_targets(targets).loader(batch_size, batch_sampler=batch_sampler, **loader_kwargs)
 
 def build_augmentation_dataset(
-    model: torch.nn.Module,
-    labeled_dataset: Data,
-    unlbl_dataset: Data,
-    batch_size: int,
+    pool: PseudoLabelPool,
     num_anchor: int,
     device: torch.device,
     label_logscale: bool = False,
 ) -> Dict[str, torch.Tensor]:
-    """Build augmentation dataset using mixup strategy."""
-    # Create data loaders
-    unlbl_loader = DataLoader(unlbl_dataset, batch_size=batch_size, shuffle=False)
-    labeled_loader = DataLoader(labeled_dataset, batch_size=batch_size, shuffle=False)
-    
-    # Get labeled data representations
-    model.eval()
-    labeled_targets, labeled_reps = [], []
-    
-    with torch.no_grad():
-        for batch in labeled_loader:
-            if batch.x.shape[0] <= 1:
-                continue
-                
-            batch = batch.to(device)
-            output = model(batch)
-            labeled_targets.append(batch.y.view(output['prediction'].shape))
-            labeled_reps.append(output['representation'])
-
-    labeled_targets = torch.cat(labeled_targets, dim=0)
-    labeled_reps = torch.cat(labeled_reps, dim=0)
-    
-    # Get unlabeled data representations
-    unlbl_pred, unlabeled_reps = [], []
-    
-    with torch.no_grad():
-        for batch in unlbl_loader:
-            if batch.x.shape[0] <= 1:
-                continue
-                
-            batch = batch.to(device)
-            output = model(batch)
-            unlbl_pred.append(output['prediction'])
-            unlabeled_reps.append(output['representation'])
-
-    unlbl_pred = torch.cat(unlbl_pred, dim=0)
-    unlabeled_reps = torch.cat(unlabeled_reps, dim=0)
-
-    # Combine all representations
-    all_reps = torch.cat([labeled_reps, unlabeled_reps])
-    all_labels = torch.cat([labeled_targets, unlbl_pred])
-
-    # Create label boundaries
-    start, end = labeled_targets.min(), labeled_targets.max()
-    if label_logscale:
-        start, end = torch.log10(start), torch.log10(end)
-    boundaries = torch.linspace(start, end, steps=num_anchor + 1)
-    if label_logscale:
-        boundaries = torch.pow(10, boundaries)
-    boundaries = boundaries.to(device)
+    """Build augmentation dataset using mixup strategy.
+
+    Representations and predictions of the unlabeled graphs are read from the cache of ``pool``.
+    """
+    labeled_targets = pool.labeled_targets[pool.labeled_idx].view(-1, 1).to(device)
+    labeled_reps = pool.labeled_representation.to(device)
+    unlabel_idx = torch.nonzero(pool.scored).view(-1)
+    all_labels = torch.cat([labeled_targets, pool.prediction[unlabel_idx].view(-1, 1).to(device)])
 
     # Assign samples to buckets
+    boundaries = get_label_boundaries(labeled_targets, num_anchor, label_logscale).to(device)
     bucket_ids = torch.bucketize(labeled_targets.view(-1), boundaries)
     bucket_ids = torch.clamp(bucket_ids, min=1, max=len(boundaries) - 1)
     unique_buckets = torch.unique(bucket_ids, sorted=True)
     bucket_centers = (boundaries[unique_buckets - 1] + boundaries[unique_buckets]) / 2
-    
+
     # Calculate bucket statistics
     bucket_rep, bucket_count = mean_by_groups(labeled_reps, bucket_ids - 1)
-    buckets_preds_dist = torch.cdist(bucket_centers.view(-1, 1), all_labels.view(-1, 1), p=2)
-    rank_per_buckets = torch.argsort(buckets_preds_dist, dim=1)
 
     # Calculate sampling probabilities
     sampling_probs = get_sample_probs(bucket_count)
     samples_per_bucket = torch.clamp(
         torch.ceil(sampling_probs * bucket_count.max()).to(torch.int),
-        max=min(rank_per_buckets.size(1), 100)
+        max=min(all_labels.size(0), 100)
     )
-    
-    max_samples = samples_per_bucket.max()
-    sample_indices = rank_per_buckets[:, :max_samples].contiguous().view(-1)
+
+    # Only the samples closest to each bucket center are needed
+    max_samples = int(samples_per_bucket.max())
+    buckets_preds_dist = torch.abs(bucket_centers.view(-1, 1) - all_labels.view(1, -1))
+    rank_per_buckets = torch.topk(buckets_preds_dist, max_samples, dim=1, largest=False).indices
+    sample_indices = rank_per_buckets.contiguous().view(-1)
+
+    # Gather the representations of the samples from the labeled and cached unlabeled ones
+    sample_reps = torch.empty(len(sample_indices), labeled_reps.size(1), device=device)
+    from_labeled = sample_indices < len(labeled_reps)
+    sample_reps[from_labeled] = labeled_reps[sample_indices[from_labeled]]
+    if not from_labeled.all():
+        cached_idx = unlabel_idx[(sample_indices[~from_labeled] - len(labeled_reps)).cpu()]
+        sample_reps[~from_labeled] = pool.representation[cached_idx].to(device)
+    sample_labels = all_labels[sample_indices]
 
     # Perform mixup augmentation
     beta_dist = Beta(torch.tensor([5.]).to(device), torch.tensor([1.]).to(device))
@@ -245,22 +263,22 @@ def build_augmentation_dataset(
     # Create mixed representations and labels
     mixed_reps = []
     mixed_labels = []
-    
+
     for idx, (bucket_r, center, num_samples) in enumerate(zip(bucket_rep, bucket_centers, samples_per_bucket)):
         if num_samples == 0:
             continue
-            
+
         lambda_idx = lambdas[idx]
-        samples_r = all_reps[sample_indices[idx * max_samples:idx * max_samples + num_samples]]
-        samples_l = all_labels[sample_indices[idx * max_samples:idx * max_samples + num_samples]]
-        
+        samples_r = sample_reps[idx * max_samples:idx * max_samples + num_samples]
+        samples_l = sample_labels[idx * max_samples:idx * max_samples + num_samples]
+
         mixed_r = lambda_idx * bucket_r + (1 - lambda_idx) * samples_r
         mixed_l = lambda_idx * center + (1 - lambda_idx) * samples_l
-        
+
         mixed_reps.append(mixed_r)
         mixed_labels.append(mixed_l)
 
     return {
         'representations': torch.cat(mixed_reps),
         'labels': torch.cat(mixed_labels)
-    }
\ No newline at end of file
+    }
@@ -80,6 +80,10 @@ class SMILESTransformerMolecularPredictor(LSTMMolecularPredictor):
         Number of epochs with no improvement after which learning rate will be reduced.
     verbose : str, default="none"
         Whether to display progress info. Options are: "none", "progress_bar", "print_statement". If any other, "none" is automatically chosen.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes). They can also be changed later with
+        ``set_params`` and are not saved with checkpoints.
     """
     def __init__(
         self,
@@ -107,6 +111,7 @@ class SMILESTransformerMolecularPredictor(LSTMMolecularPredictor):
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "SMILESTransformerMolecularPredictor",
+        **kwargs,
     ):
         super().__init__(
             device=device,
@@ -129,6 +134,7 @@ class SMILESTransformerMolecularPredictor(LSTMMolecularPredictor):
             scheduler_factor=scheduler_factor,
             scheduler_patience=scheduler_patience,
             verbose=verbose,
+            **kwargs,
         )
         
         # Transformer-specific parameters
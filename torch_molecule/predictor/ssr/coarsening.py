@@ -0,0 +1,170 @@
+from typing import List, Optional, Tuple
+
+import torch
+
+from .utils import scatter_sum
+
+def batched_kmeans(
+    points: torch.Tensor,
+    num_clusters: int,
+    num_iters: int = 100,
+) -> torch.Tensor:
+    """K-means clustering of a batch of point sets of the same size.
+
+    Centers are initialized by farthest point sampling, starting from the point
+    farthest from the mean, and refined with Lloyd iterations run on all point sets
+    at once. The initialization is deterministic, so the clusters of a point set do
+    not depend on the other point sets of the batch. An empty cluster is moved to
+    the point farthest from its center, so that every cluster keeps at least one point.
+
+    Parameters
+    ----------
+    points : torch.Tensor
+        Point sets of shape [batch_size, num_points, dim]
+    num_clusters : int
+        Number of clusters of each point set
+    num_iters : int, default=100
+        Maximum number of Lloyd iterations
+
+    Returns
+    -------
+    torch.Tensor
+        Cluster of each point, of shape [batch_size, num_points]
+    """
+    batch_size, num_points, dim = points.shape
+    rows = torch.arange(batch_size, device=points.device)
+
+    # farthest point initialization
+    centers = points.new_empty((batch_size, num_clusters, dim))
+    closest = ((points - points.mean(dim=1, keepdim=True)) ** 2).sum(-1)
+    for c in range(num_clusters):
+        centers[:, c] = points[rows, closest.argmax(-1)]
+        distance = ((points - centers[:, c:c + 1]) ** 2).sum(-1)
+        closest = distance if c == 0 else torch.minimum(closest, distance)
+
+    # Lloyd iterations
+    for _ in range(num_iters):
+        distances = torch.cdist(points, centers)
+        labels = distances.argmin(-1)
+        counts = scatter_sum(torch.ones_like(labels, dtype=points.dtype), labels, dim=1, dim_size=num_clusters)
+        sums = scatter_sum(points, labels.unsqueeze(-1).expand(-1, -1, dim), dim=1, dim_size=num_clusters)
+        new_centers = torch.where(counts.unsqueeze(-1) > 0, sums / counts.clamp(min=1).unsqueeze(-1), centers)
+        empty = (counts == 0).nonzero()
+        if len(empty) > 0:
+            distance_to_center = distances.gather(-1, labels.unsqueeze(-1)).squeeze(-1)
+            for b, c in empty.tolist():
+                farthest = distance_to_center[b].argmax()
+                new_centers[b, c] = points[b, farthest]
+                distance_to_center[b, farthest] = -1
+        elif torch.allclose(new_centers, centers):
+            break
+        centers = new_centers
+
+    return torch.cdist(points, centers).argmin(-1)
+
+def spectral_clusters(
+    edge_indices: List[torch.Tensor],
+    num_nodes: int,
+    num_clusters: int,
+) -> torch.Tensor:
+    """Spectral clustering of graphs with the same number of nodes.
+
+    The Laplacians of all graphs are decomposed with one batched ``eigh``, and the
+    eigenvectors of the smallest non-zero eigenvalues are clustered with
+    ``batched_kmeans``. Graphs with ``num_clusters >= num_nodes - 1`` are not
+    clustered: every node is its own cluster.
+
+    Parameters
+    ----------
+    edge_indices : List[torch.Tensor]
+        Edges of each graph, of shape [2, num_edges]
+    num_nodes : int
+        Number of nodes of every graph
+    num_clusters : int
+        Number of clusters of every graph
+
+    Returns
+    -------
+    torch.Tensor
+        Cluster of each node, of shape [num_graphs, num_nodes]
+    """
+    num_graphs = len(edge_indices)
+    device = edge_indices[0].device if num_graphs > 0 else None
+    if num_clusters >= num_nodes - 1:
+        return torch.arange(num_nodes, device=device).expand(num_graphs, -1).clone()
+
+    graph = torch.repeat_interleave(
+        torch.arange(num_graphs, device=device),
+        torch.tensor([e.size(1) for e in edge_indices], device=device),
+    )
+    edges = torch.cat(edge_indices, dim=1)
+    adj = torch.zeros((num_graphs, num_nodes, num_nodes), device=device)
+    adj[graph, edges[0], edges[1]] = 1
+    laplacian = torch.diag_embed(adj.sum(-1)) - adj
+
+    # eigenvalues are in ascending order; skip the first eigenvector
+    _, eigvecs = torch.linalg.eigh(laplacian)
+    return batched_kmeans(eigvecs[:, :, 1:num_clusters + 1], num_clusters)
+
+def coarsen_edges(
+    edge_indices: List[torch.Tensor],
+    edge_attrs: List[Optional[torch.Tensor]],
+    clusters: torch.Tensor,
+    num_clusters: int,
+) -> List[Tuple[torch.Tensor, Optional[torch.Tensor]]]:
+    """Merge the edges of clustered graphs into edges between clusters.
+
+    Edges inside a cluster are dropped. Edges between two clusters become one pair of
+    opposite edges whose attributes are the mean of the merged edge attributes.
+
+    Parameters
+    ----------
+    edge_indices : List[torch.Tensor]
+        Edges of each graph, of shape [2, num_edges]
+    edge_attrs : List[Optional[torch.Tensor]]
+        Edge attributes of each graph, of shape [num_edges, edge_dim], or None
+    clusters : torch.Tensor
+        Cluster of each node, of shape [num_graphs, num_nodes]
+    num_clusters : int
+        Number of clusters, at least the largest cluster index plus one
+
+    Returns
+    -------
+    List[Tuple[torch.Tensor, Optional[torch.Tensor]]]
+        Coarsened edge index of shape [2, num_coarse_edges] and float edge attributes
+        of shape [num_coarse_edges, edge_dim] (or None) of each graph
+    """
+    num_graphs = len(edge_indices)
+    device = clusters.device
+    graph = torch.repeat_interleave(
+        torch.arange(num_graphs, device=device),
+        torch.tensor([e.size(1) for e in edge_indices], device=device),
+    )
+    edges = torch.cat(edge_indices, dim=1)
+    c_src, c_dst = clusters[graph, edges[0]], clusters[graph, edges[1]]
+    keep = c_src != c_dst
+    low, high = torch.minimum(c_src, c_dst)[keep], torch.maximum(c_src, c_dst)[keep]
+    keys = (graph[keep] * num_clusters + low) * num_clusters + high
+    unique_keys, inverse = torch.unique(keys, return_inverse=True)
+
+    mean_attr = None
+    has_attr = edge_attrs[0] is not None if num_graphs > 0 else False
+    if has_attr:
+        attr = torch.cat(edge_attrs, dim=0)[keep].float()
+        counts = torch.bincount(inverse, minlength=len(unique_keys)).clamp(min=1)
+        mean_attr = scatter_sum(attr, inverse.unsqueeze(-1).expand_as(attr), dim=0, dim_size=len(unique_keys))
+        mean_attr = mean_attr / counts.unsqueeze(-1)
+
+    # split the merged edges per graph, each pair in both directions
+    unique_graph = unique_keys // (num_clusters * num_clusters)
+    low = (unique_keys // num_clusters) % num_clusters
+    high = unique_keys % num_clusters
+    pairs = torch.stack([torch.stack([low, high], dim=1), torch.stack([high, low], dim=1)], dim=1).view(-1, 2)
+    sizes = torch.bincount(unique_graph, minlength=num_graphs).tolist()
+    outputs = []
+    for graph_pairs, graph_attr in zip(
+        torch.split(pairs, [2 * s for s in sizes]),
+        torch.split(mean_attr.repeat_interleave(2, dim=0), [2 * s for s in sizes]) if has_attr else [None] * num_graphs,
+    ):
+        outputs.append((graph_pairs.t().contiguous(), graph_attr))
+    return outputs
@@ -1,3 +1,5 @@
+import hashlib
+from collections import OrderedDict
 from tqdm import tqdm
 from typing import Optional, Union, Dict, Any, Tuple, List, Callable, Literal, Type
 
@@ -5,7 +7,8 @@ import torch
 from torch_geometric.data import Data
 
 from .model import SSR
-from ...utils import graph_from_smiles
+from .coarsening import spectral_clusters, coarsen_edges
+from ...utils import graphs_from_smiles, PackedGraphDataset
 from ..gnn.modeling_gnn import GNNMolecularPredictor
 from ...utils.search import (
     ParameterSpec,
@@ -86,6 +89,19 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
         Device to use for computations.
     model_name : str, default="SSRMolecularPredictor"
         Name of the model.
+    **kwargs
+        Runtime settings of ``BaseModel``, such as ``n_jobs``, ``num_workers`` or
+        ``pin_memory`` (see its Attributes), and ``coarsening_cache_size``. They can
+        also be changed later with ``set_params`` and are not saved with checkpoints.
+
+    Attributes
+    ----------
+    coarsening_cache_size : int
+        Maximum number of coarsened graphs kept in memory, so that repeated ``fit`` and
+        ``predict`` calls do not coarsen the same graphs again. The least recently used
+        graphs are evicted first, and 0 disables the cache. Defaults to 100000. It is a
+        runtime setting that can be changed with ``set_params`` and is not saved with
+        the model checkpoint.
     """
     def __init__(
         self,
@@ -125,7 +141,9 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
         verbose: str = "none",
         device: Optional[Union[torch.device, str]] = None,
         model_name: str = "SSRMolecularPredictor",
+        **kwargs,
     ):
+        coarsening_cache_size = kwargs.pop("coarsening_cache_size", 100000)
         super().__init__(
             num_task=num_task,
             task_type=task_type,
@@ -151,6 +169,7 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
             verbose=verbose,
             device=device,
             model_name=model_name,
+            **kwargs,
         )
         
         self.coarse_ratios = coarse_ratios
@@ -158,6 +177,7 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
         self.fine_grained = fine_grained
         self.n_moments = n_moments
         self.coarse_pool = coarse_pool
+        self.coarsening_cache_size = coarsening_cache_size
         self.model_class = SSR
 
     @staticmethod
@@ -170,6 +190,10 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
             "coarse_pool",
         ]
 
+    @staticmethod
+    def _get_runtime_param_names() -> List[str]:
+        return GNNMolecularPredictor._get_runtime_param_names() + ["coarsening_cache_size"]
+
     def _get_default_search_space(self):
         search_space = super()._get_default_search_space().copy()
         search_space["cmd_coeff"] = ParameterSpec(ParameterType.FLOAT, (0.01, 1.0))
@@ -180,25 +204,26 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
         base_params = super()._get_model_params(checkpoint)
         return base_params
 
+    def _prepare_dataset(self, X, y=None):
+        if isinstance(X, PackedGraphDataset) and y is not None:
+            raise ValueError(
+                "Training with a PackedGraphDataset is not supported because it does not store "
+                "the coarsened graphs used by the size-shift regularizer. Pass SMILES strings to fit instead."
+            )
+        return super()._prepare_dataset(X, y)
+
     def _convert_to_pytorch_data(self, X, y=None):
         """Convert SMILES to PyTorch Geometric data with coarsened versions, preserving edge attributes."""
-        if self.verbose == "progress_bar":
-            iterator = tqdm(enumerate(X), desc="Converting molecules to graphs", total=len(X))
-        elif self.verbose == "print_statement":
-            iterator = enumerate(X)
+        if self.verbose == "print_statement":
             print("Converting molecules to graphs: preparing data for training...")
-        else:
-            iterator = enumerate(X)
-            
+        graphs = graphs_from_smiles(
+            X, y, self.augmented_feature,
+            n_jobs=self.n_jobs,
+            progress_bar=self.verbose == "progress_bar",
+        )
+
         pyg_graph_list = []
-        for idx, smiles_or_mol in iterator:
-            if y is not None:
-                properties = y[idx]
-            else:
-                properties = None
-                
-            # Convert SMILES to graph
-            graph = graph_from_smiles(smiles_or_mol, properties, self.augmented_feature)
+        for idx, graph in enumerate(graphs):
             g = Data()
             g.num_nodes = graph["num_nodes"]
             g.edge_index = torch.from_numpy(graph["edge_index"])
@@ -214,114 +239,89 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
                 g.y = torch.from_numpy(graph["y"])
                 
             if graph.get("morgan") is not None:
-                g.morgan = torch.tensor(graph["morgan"], dtype=torch.int8).view(1, -1)
+                g.morgan = torch.from_numpy(graph["morgan"]).view(1, -1)
                 
             if graph.get("maccs") is not None:
-                g.maccs = torch.tensor(graph["maccs"], dtype=torch.int8).view(1, -1)
+                g.maccs = torch.from_numpy(graph["maccs"]).view(1, -1)
 
-            # Add coarsened versions
-            for ratio in self.coarse_ratios:
+            pyg_graph_list.append(g)
+
+        # Add coarsened versions
+        keys = [self._coarsening_key(g) for g in pyg_graph_list]
+        for ratio in self.coarse_ratios:
+            coarse_ratio_postfix = str(int(ratio*100))
+            coarsened = self._coarsen_graphs(pyg_graph_list, keys, ratio)
+            for g, (coarse_edge_index, coarse_edge_attr, clusters) in zip(pyg_graph_list, coarsened):
                 num_clusters = max(1, int(g.num_nodes * ratio))
-                coarse_ratio_postfix = str(int(ratio*100))
-                
-                # Get coarsened graph with edge attributes
-                coarse_edge_index, coarse_edge_attr, clusters = self.spectral_graph_coarsening(g, num_clusters)
-                
                 # Add attributes to graph
                 setattr(g, f"coarsened_edge_index_{coarse_ratio_postfix}", coarse_edge_index)
                 if hasattr(g, 'edge_attr'):
                     setattr(g, f"coarsened_edge_attr_{coarse_ratio_postfix}", coarse_edge_attr)
                 setattr(g, f"num_coarse_nodes_{coarse_ratio_postfix}", torch.tensor(num_clusters))
                 setattr(g, f"clusters_{coarse_ratio_postfix}", clusters)
-                
-            pyg_graph_list.append(g)
             
         return pyg_graph_list
 
+    @staticmethod
+    def _coarsening_key(graph):
+        # coarsening only depends on the graph structure and edge attributes, so the
+        # key needs no parsed molecule and covers graphs of the same molecule whose
+        # atoms are numbered differently
+        digest = hashlib.sha1(graph.edge_index.numpy().tobytes())
+        if getattr(graph, "edge_attr", None) is not None:
+            digest.update(graph.edge_attr.numpy().tobytes())
+        return (graph.num_nodes, digest.hexdigest())
+
+    def _coarsen_graphs(self, graphs, keys, ratio, chunk_size=4096):
+        """Coarsen graphs with ``spectral_graph_coarsening`` semantics, batched over graphs of the same size.
+
+        Results are cached per graph and number of clusters in a least recently used
+        cache holding at most ``coarsening_cache_size`` entries.
+
+        Returns
+        -------
+        List[Tuple[torch.Tensor, torch.Tensor, torch.Tensor]]
+            Coarsened edge index, coarsened edge attributes and clusters of each graph
+        """
+        if getattr(self, "_coarsening_cache", None) is None:
+            self._coarsening_cache = OrderedDict()
+        cache = self._coarsening_cache
+        max_size = max(0, self.coarsening_cache_size or 0)
+        results = [None] * len(graphs)
+        by_size = {}
+        for i, (graph, key) in enumerate(zip(graphs, keys)):
+            num_clusters = max(1, int(graph.num_nodes * ratio))
+            cached = cache.get((key, num_clusters))
+            if cached is not None:
+                cache.move_to_end((key, num_clusters))
+                results[i] = cached
+            else:
+                by_size.setdefault((graph.num_nodes, num_clusters), []).append(i)
+
+        for (num_nodes, num_clusters), indices in by_size.items():
+            for start in range(0, len(indices), chunk_size):
+                chunk = indices[start:start + chunk_size]
+                edge_indices = [graphs[i].edge_index for i in chunk]
+                edge_attrs = [getattr(graphs[i], "edge_attr", None) for i in chunk]
+                clusters = spectral_clusters(edge_indices, num_nodes, num_clusters)
+                coarse_edges = coarsen_edges(edge_indices, edge_attrs, clusters, max(num_clusters, num_nodes))
+                for i, graph_clusters, (coarse_edge_index, coarse_edge_attr) in zip(chunk, clusters, coarse_edges):
+                    results[i] = (coarse_edge_index, coarse_edge_attr, graph_clusters)
+                    if max_size > 0:
+                        cache[(keys[i], num_clusters)] = results[i]
+        # evict the least recently used graphs; also applies a lowered coarsening_cache_size
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+        return results
+
     def spectral_graph_coarsening(self, graph, num_clusters):
         """Coarsen graph based on spectral clustering while preserving edge attributes"""
-        # Extract node features and edge information
-        edge_index = graph.edge_index
         edge_attr = graph.edge_attr if hasattr(graph, 'edge_attr') else None
-        num_nodes = graph.num_nodes
-        edge_attr = edge_attr.float()
-
-        # Convert to adjacency matrix
-        adj = torch.zeros((num_nodes, num_nodes), device=edge_index.device)
-        adj[edge_index[0], edge_index[1]] = 1
-        
-        # Calculate Laplacian
-        degree = adj.sum(dim=1)
-        degree_mat = torch.diag(degree)
-        laplacian = degree_mat - adj
-        
-        # Compute eigenvectors
-        if num_clusters < num_nodes - 1:
-            eigvals, eigvecs = torch.linalg.eigh(laplacian)
-            # Use smallest non-zero eigenvalues
-            indices = torch.argsort(eigvals)[1:num_clusters+1]  # Skip first eigenvector
-            fiedler_vectors = eigvecs[:, indices]
-            
-            # Use k-means for clustering
-            from sklearn.cluster import KMeans
-            kmeans = KMeans(n_clusters=num_clusters, random_state=42)
-            clusters = kmeans.fit_predict(fiedler_vectors.cpu().numpy())
-            clusters = torch.tensor(clusters, device=edge_index.device)
-        else:
-            clusters = torch.arange(num_nodes, device=edge_index.device)
-        
-        # Create coarsened edge index and attributes
-        coarse_edge_index = []
-        coarse_edge_attr = []
-        
-        # Store mapping from (cluster_i, cluster_j) to list of edge indices
-        cluster_edges = {}
-        
-        # Group edges by their clusters
-        for e_idx in range(edge_index.shape[1]):
-            src, dst = edge_index[0, e_idx], edge_index[1, e_idx]
-            c_src, c_dst = clusters[src], clusters[dst]
-            
-            # Skip self-loops in coarsened graph
-            if c_src == c_dst:
-                continue
-                
-            # Sort clusters to avoid duplicates
-            if c_src > c_dst:
-                c_src, c_dst = c_dst, c_src
-                
-            key = (c_src.item(), c_dst.item())
-            if key not in cluster_edges:
-                cluster_edges[key] = []
-            
-            if edge_attr is not None:
-                cluster_edges[key].append(edge_attr[e_idx])
-        
-        # Create coarsened edges
-        for (c_src, c_dst), edge_attrs in cluster_edges.items():
-            coarse_edge_index.append([c_src, c_dst])
-            coarse_edge_index.append([c_dst, c_src])  # Add both directions
-            
-            if edge_attr is not None:
-                # Aggregate edge attributes using mean
-                mean_attr = torch.stack(edge_attrs).mean(dim=0)
-                coarse_edge_attr.append(mean_attr)
-                coarse_edge_attr.append(mean_attr)  # Same for both directions
-        
-        # Convert to tensors
-        if coarse_edge_index:
-            coarse_edge_index = torch.tensor(coarse_edge_index, dtype=torch.long, 
-                                            device=edge_index.device).t()
-            if edge_attr is not None:
-                coarse_edge_attr = torch.stack(coarse_edge_attr)
-        else:
-            coarse_edge_index = torch.zeros((2, 0), dtype=torch.long, 
-                                        device=edge_index.device)
-            if edge_attr is not None:
-                coarse_edge_attr = torch.zeros((0, edge_attr.size(1)), 
-                                            device=edge_attr.device)
-        
-        return coarse_edge_index, coarse_edge_attr, clusters
+        clusters = spectral_clusters([graph.edge_index], graph.num_nodes, num_clusters)
+        [(coarse_edge_index, coarse_edge_attr)] = coarsen_edges(
+            [graph.edge_index], [edge_attr], clusters, max(num_clusters, graph.num_nodes)
+        )
+        return coarse_edge_index, coarse_edge_attr, clusters[0]
 
     def _train_epoch(self, train_loader, optimizer, epoch, global_pbar=None):
         self.model.train()
@@ -330,7 +330,7 @@ class SSRMolecularPredictor(GNNMolecularPredictor):
         ssr_losses = []
 
         for batch_idx, batch in enumerate(train_loader):
-            batch = batch.to(self.device)
+            batch = self._to_device(batch)
             optimizer.zero_grad()
 
             total_loss, pred_loss, ssr_loss = self.model.compute_loss(batch, self.loss_criterion, self.coarse_ratios, self.cmd_coeff, self.fine_grained, self.n_moments)
@@ -8,9 +8,13 @@ from .generic.metrics import (
     r2_score,
 )
 from .generic.pseudo_tasks import PSEUDOTASK
-from .graph.graph_from_smiles import graph_from_smiles
+from .generic.sampler import BucketBatchSampler
+from .graph.graph_from_smiles import graph_from_smiles, graphs_from_smiles, featurization_cached
 from .graph.graph_to_smiles import graph_to_smiles
 from .graph.features import get_atom_feature_dims, get_bond_feature_dims
+from .graph.cache import FeaturizationCache, set_featurization_cache, get_featurization_cache
+from .graph.packed_dataset import PackedGraphDataset
+from .molecule import MoleculeHandle
 
 __all__ = [
     "init_weights",
@@ -23,9 +27,21 @@ __all__ = [
     "r2_score",
     # graph
     "graph_from_smiles",
+    "graphs_from_smiles",
+    "featurization_cached",
     "graph_to_smiles",
     "get_atom_feature_dims",
     "get_bond_feature_dims",
+    # featurization cache
+    "FeaturizationCache",
+    "set_featurization_cache",
+    "get_featurization_cache",
+    # packed dataset
+    "PackedGraphDataset",
+    # molecule handle
+    "MoleculeHandle",
+    # batch sampler
+    "BucketBatchSampler",
     # pseudo_tasks
     "PSEUDOTASK",
 ]
@@ -2,12 +2,34 @@ import warnings
 import numpy as np
 from rdkit import Chem
 from typing import Optional, Union, List, Tuple
+from .molecule import MoleculeHandle
 
 class MolecularInputChecker:
     """
     Class for validating input data used in molecular models.
     """
 
+    # Error codes returned by validate_smiles_batch
+    VALID = 0
+    EMPTY_SMILES = 1
+    INVALID_STRUCTURE = 2
+    RDKIT_ERROR = 3
+    INVALID_TYPE = 4
+
+    @staticmethod
+    def _parse_smiles(smiles: str) -> Tuple[Optional[Chem.Mol], int, Optional[str]]:
+        """Parse a SMILES string and return the molecule, an error code and the RDKit error if any."""
+        if not smiles or not smiles.strip():
+            return None, MolecularInputChecker.EMPTY_SMILES, None
+        try:
+            # Handles parse at most once and keep the molecule for later steps
+            mol = smiles.mol if isinstance(smiles, MoleculeHandle) else Chem.MolFromSmiles(smiles)
+            if mol is None:
+                return None, MolecularInputChecker.INVALID_STRUCTURE, None
+            return mol, MolecularInputChecker.VALID, None
+        except Exception as e:
+            return None, MolecularInputChecker.RDKIT_ERROR, str(e)
+
     @staticmethod
     def validate_smiles(
         smiles: str, 
@@ -31,16 +53,58 @@ class MolecularInputChecker:
             - A string describing the error if the SMILES is invalid, or None if valid
             - The RDKit Mol object if valid, or None if invalid
         """
-        if not smiles or not smiles.strip():
+        mol, code, error = MolecularInputChecker._parse_smiles(smiles)
+        if code == MolecularInputChecker.EMPTY_SMILES:
             return False, f"Empty SMILES at index {idx}", None
+        if code == MolecularInputChecker.INVALID_STRUCTURE:
+            return False, f"Invalid SMILES structure at index {idx}: {smiles}", None
+        if code == MolecularInputChecker.RDKIT_ERROR:
+            return False, f"RDKit error at index {idx}: {error}", None
+        return True, None, mol
 
-        try:
-            mol = Chem.MolFromSmiles(smiles)
-            if mol is None:
-                return False, f"Invalid SMILES structure at index {idx}: {smiles}", None
-            return True, None, mol
-        except Exception as e:
-            return False, f"RDKit error at index {idx}: {str(e)}", None
+    @staticmethod
+    def validate_smiles_batch(
+        X: List[Union[str, Chem.Mol]],
+        known_valid: Optional[np.ndarray] = None,
+    ) -> Tuple[List[Optional[Chem.Mol]], np.ndarray, np.ndarray]:
+        """Parse a list of molecules without raising on invalid entries.
+
+        Parameters
+        ----------
+        X : List[Union[str, Chem.Mol]]
+            SMILES strings or already parsed RDKit molecules, which are not parsed again
+        known_valid : Optional[np.ndarray], optional
+            Boolean mask of SMILES strings already known to be valid (e.g. found in the
+            featurization cache), which are not parsed. When given, SMILES strings are
+            returned as ``MoleculeHandle`` strings in place of molecules, carrying the
+            molecule if it was parsed.
+
+        Returns
+        -------
+        Tuple[List[Optional[Chem.Mol]], np.ndarray, np.ndarray]
+            A tuple containing:
+
+            - The RDKit Mol objects, with None for invalid entries
+            - A boolean mask of shape [n_samples] that is True for valid entries
+            - Error codes of shape [n_samples]: ``VALID`` (0), ``EMPTY_SMILES`` (1),
+              ``INVALID_STRUCTURE`` (2), ``RDKIT_ERROR`` (3) or ``INVALID_TYPE`` (4)
+        """
+        mols = []
+        error_codes = np.empty(len(X), dtype=np.int8)
+        for i, item in enumerate(X):
+            if isinstance(item, Chem.Mol):
+                mol, code = item, MolecularInputChecker.VALID
+            elif known_valid is not None and known_valid[i] and isinstance(item, str):
+                mol, code = MoleculeHandle(item), MolecularInputChecker.VALID
+            elif isinstance(item, str):
+                mol, code, _ = MolecularInputChecker._parse_smiles(item)
+                if known_valid is not None and mol is not None:
+                    mol = MoleculeHandle(item, mol)
+            else:
+                mol, code = None, MolecularInputChecker.INVALID_TYPE
+            mols.append(mol)
+            error_codes[i] = code
+        return mols, error_codes == MolecularInputChecker.VALID, error_codes
 
     @staticmethod
     def validate_inputs(
@@ -48,7 +112,8 @@ class MolecularInputChecker:
         y: Optional[Union[List, np.ndarray]] = None,
         num_task: int = 0,
         num_pretask: int = 0,
-        return_rdkit_mol: bool = True
+        return_rdkit_mol: bool = True,
+        known_valid: Optional[np.ndarray] = None,
     ) -> Tuple[Union[List[str], List["Chem.Mol"]], Optional[np.ndarray]]:
         """Validate a list of SMILES strings, and optionally validate a target array.
 
@@ -66,13 +131,19 @@ class MolecularInputChecker:
             by default 0
         return_rdkit_mol : bool, optional
             If True, convert SMILES to RDKit Mol objects, by default True
+        known_valid : Optional[np.ndarray], optional
+            Boolean mask of SMILES strings already known to be valid, by default None.
+            They are not parsed. When given with return_rdkit_mol=True, ``MoleculeHandle``
+            strings carrying the parsed molecules are returned in place of molecules.
 
         Returns
         -------
         Tuple[Union[List[str], List["Chem.Mol"]], Optional[np.ndarray]]
             A tuple containing:
             
-            - The original or converted SMILES (RDKit Mol objects if return_rdkit_mol=True)
+            - RDKit Mol objects if return_rdkit_mol=True, otherwise ``MoleculeHandle`` strings.
+              The handles do not keep the molecules parsed for validation, so models that only
+              need SMILES do not hold one molecule per input in memory
             - The target array as a numpy array, or None if y was not provided
 
         Raises
@@ -89,70 +160,109 @@ class MolecularInputChecker:
         invalid_smiles = []
         rdkit_mols = []
         for i, smiles in enumerate(X):
+            if known_valid is not None and known_valid[i]:
+                rdkit_mols.append(MoleculeHandle(smiles))
+                continue
             is_valid, error_msg, mol = MolecularInputChecker.validate_smiles(smiles, i)
             if not is_valid:
                 invalid_smiles.append(error_msg)
             else:
-                rdkit_mols.append(mol)
+                rdkit_mols.append(mol if known_valid is None else MoleculeHandle(smiles, mol))
 
         if invalid_smiles:
             raise ValueError("Invalid SMILES found:\n" + "\n".join(invalid_smiles))
 
         if y is not None:
-            try:
-                y = np.asarray(y, dtype=np.float32)
-            except Exception as e:
-                raise ValueError(f"Could not convert y to numpy array: {str(e)}")
-
-            if len(y.shape) == 1:
-                if num_task - num_pretask != 1:
-                    raise ValueError(
-                        f"1D target array provided but num_task is {num_task - num_pretask}. "
-                        "For multiple tasks, y must be 2D."
-                    )
-                y = y.reshape(-1, 1)
-
-            if len(y.shape) != 2:
-                raise ValueError(
-                    "y must be 1D (single task) or 2D (multiple tasks). "
-                    f"Got shape {y.shape}."
-                )
+            y = MolecularInputChecker.validate_targets(y, len(X), num_task, num_pretask)
 
-            if y.shape[0] != len(X):
-                raise ValueError(
-                    f"Number of samples in y ({y.shape[0]}) must match length of X ({len(X)})."
-                )
+        if return_rdkit_mol:
+            return rdkit_mols, y
+        return [MoleculeHandle(smiles) for smiles in X], y
 
-            if y.shape[1] != num_task - num_pretask:
+    @staticmethod
+    def validate_targets(
+        y: Union[List, np.ndarray],
+        num_samples: int,
+        num_task: int = 0,
+        num_pretask: int = 0,
+    ) -> np.ndarray:
+        """Validate a target array against the number of molecules and tasks.
+
+        Parameters
+        ----------
+        y : Union[List, np.ndarray]
+            Target values
+        num_samples : int
+            Number of molecules the targets belong to
+        num_task : int, optional
+            Total number of tasks, by default 0
+        num_pretask : int, optional
+            Number of (pseudo)-tasks that are predefined in the modeling, by default 0
+
+        Returns
+        -------
+        np.ndarray
+            The target array as a 2D numpy array
+
+        Raises
+        ------
+        ValueError
+            If target dimensions are invalid
+        """
+        try:
+            y = np.asarray(y, dtype=np.float32)
+        except Exception as e:
+            raise ValueError(f"Could not convert y to numpy array: {str(e)}")
+
+        if len(y.shape) == 1:
+            if num_task - num_pretask != 1:
                 raise ValueError(
-                    f"Second dimension of y ({y.shape[1]}) must match num_task ({num_task - num_pretask})."
+                    f"1D target array provided but num_task is {num_task - num_pretask}. "
+                    "For multiple tasks, y must be 2D."
                 )
+            y = y.reshape(-1, 1)
 
-            inf_mask = np.isinf(y)
-            if np.any(inf_mask):
-                inf_indices = np.where(inf_mask)
-                warnings.warn(
-                    f"Infinite values found in y at indices: {list(zip(*inf_indices))}. "
-                    "Converting to NaN.",
-                    RuntimeWarning,
-                )
-                y = y.astype(float)
-                y[inf_mask] = np.nan
-
-            # nan_mask = np.isnan(y)
-            # if np.any(nan_mask):
-            #     nan_counts = np.sum(nan_mask, axis=0)
-            #     nan_percentages = (nan_counts / len(X)) * 100
-            #     task_warnings = []
-            #     for task_idx, (count, percentage) in enumerate(zip(nan_counts, nan_percentages)):
-            #         if count > 0:
-            #             task_warnings.append(f"Task {task_idx}: {count} NaNs ({percentage:.1f}%)")
-
-            #     warnings.warn(
-            #         "NaN values present in y:\n"
-            #         + "\n".join(task_warnings)
-            #         + "\nSamples with NaN will be ignored or cause issues unless handled.",
-            #         RuntimeWarning,
-            #     )
-
-        return rdkit_mols if return_rdkit_mol else X, y
+        if len(y.shape) != 2:
+            raise ValueError(
+                "y must be 1D (single task) or 2D (multiple tasks). "
+                f"Got shape {y.shape}."
+            )
+
+        if y.shape[0] != num_samples:
+            raise ValueError(
+                f"Number of samples in y ({y.shape[0]}) must match the number of molecules ({num_samples})."
+            )
+
+        if y.shape[1] != num_task - num_pretask:
+            raise ValueError(
+                f"Second dimension of y ({y.shape[1]}) must match num_task ({num_task - num_pretask})."
+            )
+
+        inf_mask = np.isinf(y)
+        if np.any(inf_mask):
+            inf_indices = np.where(inf_mask)
+            warnings.warn(
+                f"Infinite values found in y at indices: {list(zip(*inf_indices))}. "
+                "Converting to NaN.",
+                RuntimeWarning,
+            )
+            y = y.astype(float)
+            y[inf_mask] = np.nan
+
+        # nan_mask = np.isnan(y)
+        # if np.any(nan_mask):
+        #     nan_counts = np.sum(nan_mask, axis=0)
+        #     nan_percentages = (nan_counts / num_samples) * 100
+        #     task_warnings = []
+        #     for task_idx, (count, percentage) in enumerate(zip(nan_counts, nan_percentages)):
+        #         if count > 0:
+        #             task_warnings.append(f"Task {task_idx}: {count} NaNs ({percentage:.1f}%)")
+
+        #     warnings.warn(
+        #         "NaN values present in y:\n"
+        #         + "\n".join(task_warnings)
+        #         + "\nSamples with NaN will be ignored or cause issues unless handled.",
+        #         RuntimeWarning,
+        #     )
+
+        return y
@@ -0,0 +1,122 @@
+import numpy as np
+from typing import Iterator, List, Optional, Sequence
+
+import torch
+from torch.utils.data import Sampler
+
+class BucketBatchSampler(Sampler):
+    """Batch sampler that groups molecules of similar size.
+
+    Molecules are sorted by size (number of atoms for graphs, number of tokens for
+    SMILES strings) so that each batch contains molecules of similar size, which
+    reduces padding and keeps the memory used by each batch stable. Batches hold at
+    most ``batch_size`` molecules and, if ``max_size`` is given, at most ``max_size``
+    size units: the sum of the sizes, or the batch length times the largest size
+    when ``padded`` is True (the shape of a padded dense batch).
+
+    Without shuffling, the molecules are sorted globally and batches are always the
+    same, so outputs can be mapped back to the input order with ``order``. With
+    shuffling, the molecules are randomly permuted, sorted within pools of
+    ``pool_size`` molecules, and the resulting batches are visited in random order.
+
+    Parameters
+    ----------
+    sizes : Sequence[int]
+        Size of each molecule in the dataset
+    batch_size : int, optional
+        Maximum number of molecules per batch. If None, only ``max_size`` limits the batches.
+    max_size : int, optional
+        Maximum number of size units per batch. A molecule larger than the budget
+        forms a batch on its own.
+    padded : bool, default=False
+        Whether the cost of a batch is its length times its largest size (padded
+        tensors) instead of the sum of the sizes (sparse graph batches)
+    shuffle : bool, default=False
+        Whether to shuffle the molecules and the batches every epoch
+    pool_size : int, optional
+        Number of molecules sorted together when shuffling. Defaults to 50 batches
+        worth of molecules (or the whole dataset if ``batch_size`` is None).
+    seed : int, optional
+        Seed of the random generator used for shuffling
+    """
+    def __init__(
+        self,
+        sizes: Sequence[int],
+        batch_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        padded: bool = False,
+        shuffle: bool = False,
+        pool_size: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        if batch_size is None and max_size is None:
+            raise ValueError("At least one of batch_size and max_size must be given")
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        if max_size is not None and max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.padded = padded
+        self.shuffle = shuffle
+        self.pool_size = pool_size if pool_size is not None else (
+            50 * batch_size if batch_size is not None else len(self.sizes)
+        )
+        self.generator = torch.Generator()
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        else:
+            self.generator.seed()
+        self._batches = None
+
+    def _split(self, indices: np.ndarray) -> List[List[int]]:
+        """Split indices sorted by size into consecutive batches within the budgets."""
+        batches, batch, largest, total = [], [], 0, 0
+        for index, size in zip(indices.tolist(), self.sizes[indices].tolist()):
+            if batch:
+                full = self.batch_size is not None and len(batch) >= self.batch_size
+                if not full and self.max_size is not None:
+                    if self.padded:
+                        full = (len(batch) + 1) * max(largest, size) > self.max_size
+                    else:
+                        full = total + size > self.max_size
+                if full:
+                    batches.append(batch)
+                    batch, largest, total = [], 0, 0
+            batch.append(index)
+            largest = max(largest, size)
+            total += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _make_batches(self) -> List[List[int]]:
+        if not self.shuffle:
+            return self._split(np.argsort(self.sizes, kind="stable"))
+        permutation = torch.randperm(len(self.sizes), generator=self.generator).numpy()
+        batches = []
+        for start in range(0, len(permutation), self.pool_size):
+            pool = permutation[start:start + self.pool_size]
+            batches.extend(self._split(pool[np.argsort(self.sizes[pool], kind="stable")]))
+        order = torch.randperm(len(batches), generator=self.generator).tolist()
+        return [batches[i] for i in order]
+
+    def order(self) -> np.ndarray:
+        """Dataset indices in the order they are visited by the batches of the next epoch."""
+        if self._batches is None:
+            self._batches = self._make_batches()
+        if not self._batches:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.asarray(batch, dtype=np.int64) for batch in self._batches])
+
+    def __iter__(self) -> Iterator[List[int]]:
+        # batches computed by __len__ or order are reused so that they agree with the epoch
+        batches = self._batches if self._batches is not None else self._make_batches()
+        self._batches = None if self.shuffle else batches
+        return iter(batches)
+
+    def __len__(self) -> int:
+        if self._batches is None:
+            self._batches = self._make_batches()
+        return len(self._batches)
@@ -0,0 +1,235 @@
+import io
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import Optional, Dict, List, Union
+
+# Bump whenever the output of atom/bond featurization or fingerprints changes,
+# so that stale entries written by an older featurizer are never returned.
+# Version 3 keys entries on the input atom order instead of the canonical SMILES.
+FEATURIZER_VERSION = "3"
+
+# Arrays stored per molecule and the compact dtype used on disk. They are cast
+# back to the dtype produced by graph_from_smiles when loaded.
+_STORED_ARRAYS = {
+    "edge_index": (np.int32, np.int64),
+    "edge_feat": (np.uint8, np.int64),
+    "node_feat": (np.uint8, np.int64),
+    "morgan": (np.uint8, np.uint8),
+    "maccs": (np.uint8, np.uint8),
+    "augmented_property": (np.float32, np.float32),
+}
+
+class FeaturizationCache:
+    """Persistent on-disk cache of molecule featurizations.
+
+    Entries are content-addressed by the molecule identifier (the input SMILES string,
+    or the canonical SMILES and atom order of an RDKit molecule, since the stored
+    arrays follow the input atom order), the featurizer version and the requested
+    augmented features/properties, and are stored in a SQLite
+    database inside ``cache_dir``. When the total stored size exceeds ``max_size_mb``,
+    the least recently used entries are evicted.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cache database. Created if it does not exist.
+    max_size_mb : float, default=4096
+        Maximum total size of the stored arrays in megabytes.
+    """
+    def __init__(self, cache_dir: str, max_size_mb: float = 4096):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._path = os.path.join(self.cache_dir, f"featurization_v{FEATURIZER_VERSION}.sqlite")
+        self._local = threading.local()
+        self._total_bytes = None
+        self._connect()
+
+    def __getstate__(self):
+        # SQLite connections cannot be pickled; worker processes reconnect lazily.
+        state = self.__dict__.copy()
+        del state["_local"]
+        state["_total_bytes"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def __repr__(self):
+        return f"FeaturizationCache(cache_dir='{self.cache_dir}', max_size_mb={self.max_size_mb})"
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self._path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def make_key(
+        identifier: str,
+        augmented_features: Optional[List[str]] = None,
+        augmented_properties: Optional[List[str]] = None,
+    ) -> str:
+        """Build the cache key of a molecule for a given featurization setting.
+
+        Parameters
+        ----------
+        identifier : str
+            Identifier of the molecule and of its atom order
+        augmented_features : Optional[List[str]], default=None
+            Fingerprints requested alongside the graph (e.g. ["morgan", "maccs"])
+        augmented_properties : Optional[List[str]], default=None
+            Pseudo-task properties requested alongside the graph
+
+        Returns
+        -------
+        str
+            Hex digest identifying the featurization
+        """
+        features = ",".join(sorted(augmented_features)) if augmented_features else ""
+        properties = ",".join(augmented_properties) if augmented_properties else ""
+        content = f"{FEATURIZER_VERSION}|{features}|{properties}|{identifier}"
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Return the cached arrays for ``key``, or None on a cache miss."""
+        conn = self._connect()
+        row = conn.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        with np.load(io.BytesIO(row[0])) as stored:
+            return {
+                name: stored[name].astype(_STORED_ARRAYS[name][1])
+                for name in stored.files
+            }
+
+    def contains(self, keys: List[str]) -> np.ndarray:
+        """Return a boolean mask of the ``keys`` that have an entry, without reading or touching them."""
+        conn = self._connect()
+        found = set()
+        # stay below the SQLite limit on the number of query parameters
+        for start in range(0, len(keys), 500):
+            batch = list(keys[start:start + 500])
+            placeholders = ",".join("?" * len(batch))
+            found.update(
+                row[0] for row in conn.execute(f"SELECT key FROM entries WHERE key IN ({placeholders})", batch)
+            )
+        return np.array([key in found for key in keys], dtype=bool)
+
+    def put(self, key: str, arrays: Dict[str, Optional[np.ndarray]]) -> None:
+        """Store the non-None entries of ``arrays`` under ``key``."""
+        buffer = io.BytesIO()
+        np.savez(buffer, **{
+            name: np.asarray(value).astype(_STORED_ARRAYS[name][0])
+            for name, value in arrays.items() if value is not None
+        })
+        data = buffer.getvalue()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, sqlite3.Binary(data), len(data), time.time()),
+        )
+        if self._total_bytes is None:
+            self._total_bytes = self._stored_bytes()
+        self._total_bytes += len(data)
+        if self._total_bytes > self.max_size_mb * 1024 ** 2:
+            self._evict()
+
+    def _stored_bytes(self) -> int:
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until the cache is at 90% of its budget."""
+        conn = self._connect()
+        target = 0.9 * self.max_size_mb * 1024 ** 2
+        # Other processes may share the database, so refresh the running total.
+        total = self._stored_bytes()
+        while total > target:
+            rows = conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access ASC LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            freed = 0
+            keys = []
+            for key, size in rows:
+                keys.append(key)
+                freed += size
+                if total - freed <= target:
+                    break
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+            total -= freed
+        self._total_bytes = total
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("VACUUM")
+        self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+_DEFAULT_CACHE: Optional[FeaturizationCache] = None
+_DEFAULT_CACHE_INITIALIZED = False
+
+def set_featurization_cache(
+    cache: Optional[Union[str, FeaturizationCache]],
+    max_size_mb: float = 4096,
+) -> Optional[FeaturizationCache]:
+    """Set the featurization cache shared by all graph-based models.
+
+    Parameters
+    ----------
+    cache : Optional[Union[str, FeaturizationCache]]
+        A cache directory, a ``FeaturizationCache`` instance, or None to disable caching
+    max_size_mb : float, default=4096
+        Maximum cache size in megabytes when ``cache`` is a directory
+
+    Returns
+    -------
+    Optional[FeaturizationCache]
+        The cache now in use
+    """
+    global _DEFAULT_CACHE, _DEFAULT_CACHE_INITIALIZED
+    if isinstance(cache, str):
+        cache = FeaturizationCache(cache, max_size_mb=max_size_mb)
+    _DEFAULT_CACHE = cache
+    _DEFAULT_CACHE_INITIALIZED = True
+    return _DEFAULT_CACHE
+
+def get_featurization_cache() -> Optional[FeaturizationCache]:
+    """Return the shared featurization cache, or None if caching is disabled.
+
+    Unless ``set_featurization_cache`` has been called, the cache is enabled when the
+    ``TORCH_MOLECULE_CACHE_DIR`` environment variable points to a directory.
+    """
+    global _DEFAULT_CACHE, _DEFAULT_CACHE_INITIALIZED
+    if not _DEFAULT_CACHE_INITIALIZED:
+        cache_dir = os.environ.get("TORCH_MOLECULE_CACHE_DIR")
+        if cache_dir:
+            max_size_mb = float(os.environ.get("TORCH_MOLECULE_CACHE_MAX_MB", 4096))
+            _DEFAULT_CACHE = FeaturizationCache(cache_dir, max_size_mb=max_size_mb)
+        _DEFAULT_CACHE_INITIALIZED = True
+    return _DEFAULT_CACHE
@@ -1,3 +1,6 @@
+import numpy as np
+from rdkit import Chem
+
 # allowable multiple choice node and edge features 
 allowable_features = {
     # atom types: 1-118, 119 is masked atom, 120 is misc (e.g. * for polymers)
@@ -168,6 +171,139 @@ def bond_feature_vector_to_dict(bond_feature):
 # assert bond_feature_dict['bond_stereo'] == 'STEREOE'
 # assert bond_feature_dict['is_conjugated'] == False
 
+def _int_lookup_table(allowable_list, low, high):
+    """Lookup array mapping integer values in [low, high] to safe_index(allowable_list, value).
+    Values outside of [low, high] map to the last (misc) index."""
+    table = np.array([safe_index(allowable_list, value) for value in range(low, high + 1)], dtype=np.int64)
+    return table, low, len(allowable_list) - 1
+
+def _enum_lookup_table(allowable_list, enum_type, safe=True):
+    """Lookup array mapping the integer value of an RDKit enum to the index of its name in allowable_list.
+
+    Names missing from allowable_list map to the last (misc) index if ``safe``, otherwise to -1.
+    """
+    enum_values = enum_type.values
+    misc = len(allowable_list) - 1 if safe else -1
+    table = np.full(max(enum_values) + 1, misc, dtype=np.int64)
+    for value, member in enum_values.items():
+        if str(member) in allowable_list:
+            table[value] = allowable_list.index(str(member))
+    return table, 0, misc
+
+# Lookup tables reproducing atom_to_feature_vector, in the same column order
+_ATOM_LOOKUP_TABLES = [
+    _int_lookup_table(allowable_features['possible_atomic_num_list'], 0, 119),
+    _enum_lookup_table(allowable_features['possible_chirality_list'], Chem.rdchem.ChiralType),
+    _int_lookup_table(allowable_features['possible_degree_list'], 0, 10),
+    _int_lookup_table(allowable_features['possible_formal_charge_list'], -5, 5),
+    _int_lookup_table(allowable_features['possible_numH_list'], 0, 8),
+    _int_lookup_table(allowable_features['possible_number_radical_e_list'], 0, 4),
+    _enum_lookup_table(allowable_features['possible_hybridization_list'], Chem.rdchem.HybridizationType),
+    _int_lookup_table(allowable_features['possible_is_aromatic_list'], 0, 1),
+    _int_lookup_table(allowable_features['possible_is_in_ring_list'], 0, 1),
+]
+
+# Lookup tables reproducing bond_to_feature_vector, in the same column order
+_BOND_LOOKUP_TABLES = [
+    _enum_lookup_table(allowable_features['possible_bond_type_list'], Chem.rdchem.BondType),
+    _enum_lookup_table(allowable_features['possible_bond_stereo_list'], Chem.rdchem.BondStereo, safe=False),
+    _int_lookup_table(allowable_features['possible_is_conjugated_list'], 0, 1),
+]
+
+def _stack_lookup_tables(tables):
+    """Concatenate per-feature lookup tables so that all columns are mapped with one gather."""
+    flat_table = np.concatenate([table for table, _, _ in tables])
+    starts = np.cumsum([0] + [len(table) for table, _, _ in tables[:-1]])
+    offsets = np.array([offset for _, offset, _ in tables], dtype=np.int64)
+    sizes = np.array([len(table) for table, _, _ in tables], dtype=np.int64)
+    miscs = np.array([misc for _, _, misc in tables], dtype=np.int64)
+    return flat_table, starts, offsets, sizes, miscs
+
+_ATOM_LOOKUP = _stack_lookup_tables(_ATOM_LOOKUP_TABLES)
+_BOND_LOOKUP = _stack_lookup_tables(_BOND_LOOKUP_TABLES)
+
+def _apply_lookup_tables(raw, lookup):
+    """Map raw integer properties (one column per feature) to feature indices."""
+    flat_table, starts, offsets, sizes, miscs = lookup
+    index = raw - offsets
+    in_range = (index >= 0) & (index < sizes)
+    flat_index = np.where(in_range, index + starts, 0)
+    return np.where(in_range, flat_table[flat_index], miscs)
+
+def mols_to_feature_arrays(mols):
+    """
+    Featurizes the atoms and bonds of a batch of rdkit molecules in one pass
+    :param mols: list of rdkit mol objects
+    :return: tuple of node_feat [num_atoms, 9], edge_index [2, num_edges] with per-molecule
+        atom indices, edge_feat [num_edges, 3], num_nodes [num_mols] and num_edges [num_mols].
+        Bonds are stored in both directions and rows match atom_to_feature_vector and
+        bond_to_feature_vector.
+    """
+    atom_props = []
+    bond_props = []
+    num_nodes = np.empty(len(mols), dtype=np.int64)
+    num_edges = np.empty(len(mols), dtype=np.int64)
+    for i, mol in enumerate(mols):
+        # indexing avoids the slow Python iterator of the RDKit atom/bond sequences
+        atoms = [mol.GetAtomWithIdx(idx) for idx in range(mol.GetNumAtoms())]
+        bonds = [mol.GetBondWithIdx(idx) for idx in range(mol.GetNumBonds())]
+        num_nodes[i] = len(atoms)
+        num_edges[i] = 2 * len(bonds)
+        atom_props.extend(
+            (
+                atom.GetAtomicNum(),
+                int(atom.GetChiralTag()),
+                atom.GetTotalDegree(),
+                atom.GetFormalCharge(),
+                atom.GetTotalNumHs(),
+                atom.GetNumRadicalElectrons(),
+                int(atom.GetHybridization()),
+                atom.GetIsAromatic(),
+                atom.IsInRing(),
+            )
+            for atom in atoms
+        )
+        bond_props.extend(
+            (
+                bond.GetBeginAtomIdx(),
+                bond.GetEndAtomIdx(),
+                int(bond.GetBondType()),
+                int(bond.GetStereo()),
+                bond.GetIsConjugated(),
+            )
+            for bond in bonds
+        )
+
+    raw_atoms = np.array(atom_props, dtype=np.int64).reshape(-1, len(_ATOM_LOOKUP_TABLES))
+    node_feat = _apply_lookup_tables(raw_atoms, _ATOM_LOOKUP)
+
+    raw_bonds = np.array(bond_props, dtype=np.int64).reshape(-1, 2 + len(_BOND_LOOKUP_TABLES))
+    bond_feat = _apply_lookup_tables(raw_bonds[:, 2:], _BOND_LOOKUP)
+    if (bond_feat < 0).any():
+        raise ValueError("Unsupported bond stereo found in molecule.")
+
+    # add edges in both directions, (i, j) followed by (j, i)
+    edge_index = np.empty((2, 2 * raw_bonds.shape[0]), dtype=np.int64)
+    edge_index[0, 0::2] = raw_bonds[:, 0]
+    edge_index[1, 0::2] = raw_bonds[:, 1]
+    edge_index[0, 1::2] = raw_bonds[:, 1]
+    edge_index[1, 1::2] = raw_bonds[:, 0]
+    edge_feat = np.repeat(bond_feat, 2, axis=0)
+
+    return node_feat, edge_index, edge_feat, num_nodes, num_edges
+
+def mol_to_feature_arrays(mol):
+    """
+    Featurizes the atoms and bonds of a rdkit molecule
+    :param mol: rdkit mol object
+    :return: tuple of node_feat [num_atoms, 9], edge_index [2, num_edges] and edge_feat [num_edges, 3]
+    """
+    node_feat, edge_index, edge_feat, _, _ = mols_to_feature_arrays([mol])
+    if node_feat.shape[0] == 0:
+        # consistent with np.array([]) for molecules without atoms
+        node_feat = node_feat.reshape(-1)
+    return node_feat, edge_index, edge_feat
+
 from rdkit.Chem import AllChem
 
 def getmorganfingerprint(mol):
@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Iterable, Union
+
+import torch
+from rdkit import Chem, DataStructs
+from rdkit.Chem import MACCSkeys, rdFingerprintGenerator
+
+from ..molecule import MoleculeHandle, to_mol
+
+# Number of bits of each supported fingerprint
+FINGERPRINT_NUM_BITS = {
+    "morgan": 1024,
+    "maccs": 167,
+    "rdkit": 2048,
+}
+
+_MORGAN_GENERATOR = None
+
+def _morgan_generator():
+    # generators are not picklable, so each process creates its own
+    global _MORGAN_GENERATOR
+    if _MORGAN_GENERATOR is None:
+        _MORGAN_GENERATOR = rdFingerprintGenerator.GetMorganGenerator(
+            radius=2, fpSize=FINGERPRINT_NUM_BITS["morgan"]
+        )
+    return _MORGAN_GENERATOR
+
+def packed_num_bytes(num_bits: int) -> int:
+    """Number of bytes of a fingerprint of ``num_bits`` bits packed with ``np.packbits``."""
+    return (num_bits + 7) // 8
+
+def fingerprint_matrix(
+    mols: Iterable[Union[str, MoleculeHandle, Chem.Mol]],
+    kind: str = "morgan",
+    packed: bool = True,
+) -> np.ndarray:
+    """Compute the fingerprints of a batch of molecules into one uint8 matrix.
+
+    Bits are converted with RDKit's numpy conversion into a preallocated matrix,
+    without going through Python lists. Packed rows store 8 bits per byte
+    (``np.packbits`` order) and can be unpacked with ``unpack_fingerprints``.
+
+    Parameters
+    ----------
+    mols : Iterable[Union[str, MoleculeHandle, Chem.Mol]]
+        Molecules as SMILES strings, handles or RDKit molecules
+    kind : str, default="morgan"
+        Fingerprint type: "morgan" (radius 2, 1024 bits), "maccs" (167 bits) or
+        "rdkit" (RDKit topological fingerprint, 2048 bits)
+    packed : bool, default=True
+        Whether to bit-pack the rows
+
+    Returns
+    -------
+    np.ndarray
+        Matrix of shape [n_molecules, packed_num_bytes(num_bits)] if packed, otherwise
+        [n_molecules, num_bits]. Rows of invalid molecules are zero.
+    """
+    if kind not in FINGERPRINT_NUM_BITS:
+        raise ValueError(f"Unsupported fingerprint {kind}. Supported fingerprints are: {list(FINGERPRINT_NUM_BITS)}")
+    num_bits = FINGERPRINT_NUM_BITS[kind]
+    mols = list(mols)
+    width = packed_num_bytes(num_bits) if packed else num_bits
+    matrix = np.zeros((len(mols), width), dtype=np.uint8)
+    bits = np.zeros(num_bits, dtype=np.uint8)
+    for i, mol in enumerate(mols):
+        mol = to_mol(mol)
+        if mol is None:
+            continue
+        if kind == "morgan":
+            bits = _morgan_generator().GetFingerprintAsNumPy(mol)
+        elif kind == "maccs":
+            DataStructs.ConvertToNumpyArray(MACCSkeys.GenMACCSKeys(mol), bits)
+        else:
+            DataStructs.ConvertToNumpyArray(Chem.RDKFingerprint(mol), bits)
+        matrix[i] = np.packbits(bits) if packed else bits
+    return matrix
+
+def unpack_fingerprints(fingerprints: torch.Tensor, num_bits: int) -> torch.Tensor:
+    """Unpack bit-packed fingerprints on their device.
+
+    Parameters
+    ----------
+    fingerprints : torch.Tensor
+        Packed uint8 fingerprints of shape [batch_size, packed_num_bytes(num_bits)].
+        Fingerprints that are already unpacked (``num_bits`` columns) are returned as is.
+    num_bits : int
+        Number of bits of the fingerprint
+
+    Returns
+    -------
+    torch.Tensor
+        uint8 tensor of 0/1 bits of shape [batch_size, num_bits]
+    """
+    if fingerprints.dtype != torch.uint8 or fingerprints.size(-1) == num_bits:
+        return fingerprints
+    shifts = torch.arange(7, -1, -1, dtype=torch.uint8, device=fingerprints.device)
+    bits = (fingerprints.unsqueeze(-1) >> shifts) & 1
+    return bits.flatten(-2)[..., :num_bits]
@@ -1,16 +1,17 @@
+import os
+import math
 import numpy as np
+import torch
+import torch.multiprocessing as mp
+from tqdm import tqdm
 from rdkit import Chem
 from rdkit.Chem import Crippen
-from .features import atom_to_feature_vector, bond_to_feature_vector
-from .features import getmaccsfingerprint, getmorganfingerprint
+from .features import mol_to_feature_arrays, get_atom_feature_dims
+from .fingerprints import fingerprint_matrix
 from ..generic.pseudo_tasks import PSEUDOTASK
+from .cache import get_featurization_cache
+from ..molecule import to_mol
 
-def add_fingerprint_feature(mol, feature_type, get_fingerprint_fn):
-    if feature_type is None:
-        return None
-    fingerprint = get_fingerprint_fn(mol)
-    return np.expand_dims(np.array(fingerprint, dtype="int8"), axis=0)
-    
 def get_augmented_property(mol, properties):
     if mol is None:
         return None
@@ -22,113 +23,329 @@ def get_augmented_property(mol, properties):
     
     augmented_property = []
     if 'maccs' in properties:
-        maccs = getmaccsfingerprint(mol)
-        augmented_property.extend(maccs)
+        augmented_property.extend(fingerprint_matrix([mol], "maccs", packed=False)[0])
     if 'morgan' in properties:
-        mgf = getmorganfingerprint(mol)
-        augmented_property.extend(mgf)
+        augmented_property.extend(fingerprint_matrix([mol], "morgan", packed=False)[0])
     if 'logP' in properties:
         logp = Crippen.MolLogP(mol)
         augmented_property.append(logp)
     return augmented_property
 
-def graph_from_smiles(smiles_or_mol, properties, augmented_features=None, augmented_properties=None):
+def featurize_mol(mol, augmented_features=None, augmented_properties=None):
+    """
+    Computes the label-independent arrays of a molecule graph
+
+    Parameters
+    ----------
+    mol : rdkit.Chem.rdchem.Mol
+        RDKit molecule object
+    augmented_features : list, optional
+        List of augmented features to include
+    augmented_properties : list, optional
+        List of augmented properties to include
+
+    Returns
+    -------
+    dict
+        Dictionary with edge_index, edge_feat, node_feat, morgan, maccs and augmented_property.
+        Fingerprints are bit-packed (see ``fingerprints.unpack_fingerprints``).
+    """
+    x, edge_index, edge_attr = mol_to_feature_arrays(mol)
+
+    arrays = dict()
+    arrays["edge_index"] = edge_index
+    arrays["edge_feat"] = edge_attr
+    arrays["node_feat"] = x
+
+    arrays["augmented_property"] = None
+    if augmented_properties is not None:
+        aug_props = get_augmented_property(mol, augmented_properties)
+        if aug_props:
+            arrays["augmented_property"] = np.array(aug_props, dtype=np.float32)
+
+    # Handle augmented features, stored as bit-packed uint8 rows of shape [1, num_bytes]
+    for key in ("morgan", "maccs"):
+        arrays[key] = None
+        if augmented_features is not None and key in augmented_features:
+            arrays[key] = fingerprint_matrix([mol], key)
+
+    return arrays
+
+def _cache_identifier(smiles_or_mol):
+    """Identify a molecule and its atom order for the featurization cache.
+
+    The featurized arrays follow the atom order of the input, so a SMILES string is
+    identified by the string itself, which needs no parsing. An RDKit molecule is
+    identified by its canonical SMILES and the canonical output order of its atoms.
+    """
+    if isinstance(smiles_or_mol, str):
+        return f"smiles:{smiles_or_mol}"
+    canonical_smiles = Chem.MolToSmiles(smiles_or_mol)
+    return f"mol:{canonical_smiles}|{smiles_or_mol.GetProp('_smilesAtomOutputOrder')}"
+
+def featurization_cached(smiles_or_mols, augmented_features=None, augmented_properties=None, cache=None):
+    """
+    Finds the SMILES strings whose featurization is already cached
+
+    A cached SMILES string was parsed successfully when it was featurized, so callers
+    can skip parsing it again to validate it.
+
+    Parameters
+    ----------
+    smiles_or_mols : List[Union[str, rdkit.Chem.rdchem.Mol]]
+        SMILES strings or RDKit molecule objects
+    augmented_features : list, optional
+        List of augmented features the featurization includes
+    augmented_properties : list, optional
+        List of augmented properties the featurization includes
+    cache : Union[FeaturizationCache, bool], optional
+        Cache to look in. If None, the shared cache from ``get_featurization_cache`` is used.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of shape [n_samples], True for SMILES strings with a cache entry.
+        All False when caching is disabled; RDKit molecules are never marked.
+    """
+    mask = np.zeros(len(smiles_or_mols), dtype=bool)
+    if cache is None:
+        cache = get_featurization_cache()
+    elif cache is False:
+        cache = None
+    if cache is None:
+        return mask
+    positions = [i for i, item in enumerate(smiles_or_mols) if isinstance(item, str) and item]
+    keys = [
+        cache.make_key(_cache_identifier(smiles_or_mols[i]), augmented_features, augmented_properties)
+        for i in positions
+    ]
+    mask[positions] = cache.contains(keys)
+    return mask
+
+def graph_from_smiles(smiles_or_mol, properties, augmented_features=None, augmented_properties=None, cache=None):
     """
     Converts SMILES string or RDKit molecule to graph Data object
     
     Parameters
     ----------
-    smiles_or_mol : Union[str, rdkit.Chem.rdchem.Mol]
-        SMILES string or RDKit molecule object
+    smiles_or_mol : Union[str, MoleculeHandle, rdkit.Chem.rdchem.Mol]
+        SMILES string, molecule handle or RDKit molecule object
     properties : Any
         Properties to include in the graph
     augmented_features : list
         List of augmented features to include
     augmented_properties : list, optional
         List of augmented properties to include
+    cache : Union[FeaturizationCache, bool], optional
+        Cache used to look up and store the featurization. If None, the shared
+        cache from ``get_featurization_cache`` is used (disabled by default).
+        If False, caching is skipped. SMILES strings are only parsed on a cache miss.
         
     Returns
     -------
     dict
         Graph object dictionary
     """
-    # try:
-    if isinstance(smiles_or_mol, str):
-        mol = Chem.MolFromSmiles(smiles_or_mol)
-    else:
-        mol = smiles_or_mol
-        
-    # atoms
-    atom_features_list = []
-    for atom in mol.GetAtoms():
-        # print(atom.GetSymbol(), atom_to_feature_vector(atom)[0])
-        atom_features_list.append(atom_to_feature_vector(atom))
-
-    x = np.array(atom_features_list, dtype=np.int64)
-
-    # bonds
-    num_bond_features = 3  # bond type, bond stereo, is_conjugated
-    if len(mol.GetBonds()) > 0:  # mol has bonds
-        edges_list = []
-        edge_features_list = []
-        for bond in mol.GetBonds():
-            i = bond.GetBeginAtomIdx()
-            j = bond.GetEndAtomIdx()
-            edge_feature = bond_to_feature_vector(bond)
-            # add edges in both directions
-            edges_list.append((i, j))
-            edge_features_list.append(edge_feature)
-            edges_list.append((j, i))
-            edge_features_list.append(edge_feature)
-
-        # data.edge_index: Graph connectivity in COO format with shape [2, num_edges]
-        edge_index = np.array(edges_list, dtype=np.int64).T
-
-        # data.edge_attr: Edge feature matrix with shape [num_edges, num_edge_features]
-        edge_attr = np.array(edge_features_list, dtype=np.int64)
-
-    else:  # mol has no bonds
-        edge_index = np.empty((2, 0), dtype=np.int64)
-        edge_attr = np.empty((0, num_bond_features), dtype=np.int64)
+    if cache is None:
+        cache = get_featurization_cache()
+    elif cache is False:
+        cache = None
+
+    arrays = None
+    if cache is not None:
+        key = cache.make_key(_cache_identifier(smiles_or_mol), augmented_features, augmented_properties)
+        arrays = cache.get(key)
+    if arrays is None:
+        arrays = featurize_mol(to_mol(smiles_or_mol), augmented_features, augmented_properties)
+        if cache is not None:
+            cache.put(key, arrays)
 
     graph = dict()
-    graph["edge_index"] = edge_index
-    graph["edge_feat"] = edge_attr
-    graph["node_feat"] = x
-    graph["num_nodes"] = len(x)
+    graph["edge_index"] = arrays["edge_index"]
+    graph["edge_feat"] = arrays["edge_feat"]
+    graph["node_feat"] = arrays["node_feat"]
+    graph["num_nodes"] = len(arrays["node_feat"])
 
     # Handle properties and augmented properties
     props_list = []            
     if properties is not None:
         props_list.append(np.array(properties, dtype=np.float32))
-    if augmented_properties is not None:
-        aug_props = get_augmented_property(mol, augmented_properties)
-        if aug_props:
-            props_list.append(np.array(aug_props, dtype=np.float32))
+    if arrays.get("augmented_property") is not None:
+        props_list.append(arrays["augmented_property"])
     if props_list:
         combined_props = np.concatenate(props_list)
         graph['y'] = combined_props.reshape(1, -1)
     else:
         graph['y'] = np.full((1, 1), np.nan, dtype=np.float32)
 
-    # Handle augmented features
-    if augmented_features is not None:
-        graph['morgan'] = add_fingerprint_feature(
-            mol,
-            'morgan' if 'morgan' in augmented_features else None,
-            getmorganfingerprint
+    graph['morgan'] = arrays.get("morgan")
+    graph['maccs'] = arrays.get("maccs")
+
+    return graph
+
+_PACKED_KEYS = ("edge_index", "edge_feat", "node_feat", "y", "morgan", "maccs")
+
+def _pack_graphs(graphs):
+    """Concatenate a list of graph dictionaries into one shared byte buffer.
+
+    All arrays of the chunk live in a single uint8 tensor so that returning the
+    chunk from a worker process costs one shared-memory segment instead of one
+    pickled copy per array.
+    """
+    num_nodes = np.array([graph["num_nodes"] for graph in graphs], dtype=np.int64)
+    num_edges = np.array([graph["edge_index"].shape[1] for graph in graphs], dtype=np.int64)
+    arrays = {"num_nodes": num_nodes, "num_edges": num_edges}
+    arrays["edge_index"] = np.concatenate([graph["edge_index"] for graph in graphs], axis=1)
+    arrays["edge_feat"] = np.concatenate([graph["edge_feat"] for graph in graphs], axis=0)
+    num_atom_features = len(get_atom_feature_dims())
+    arrays["node_feat"] = np.concatenate([graph["node_feat"].reshape(-1, num_atom_features) for graph in graphs], axis=0)
+    arrays["y"] = np.concatenate([graph["y"] for graph in graphs], axis=0)
+    for key in ("morgan", "maccs"):
+        if graphs[0][key] is not None:
+            arrays[key] = np.concatenate([graph[key] for graph in graphs], axis=0)
+
+    meta = {}
+    offset = 0
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[key] = array
+        meta[key] = (offset, array.dtype.str, array.shape)
+        offset += array.nbytes
+    buffer = torch.empty(offset, dtype=torch.uint8)
+    buffer_np = buffer.numpy()
+    for key, array in arrays.items():
+        start = meta[key][0]
+        buffer_np[start:start + array.nbytes] = array.reshape(-1).view(np.uint8)
+    return buffer, meta
+
+def _unpack_graphs(buffer, meta):
+    """Split a packed chunk back into graph dictionaries whose arrays are views of the buffer."""
+    buffer_np = buffer.numpy()
+    arrays = {}
+    for key, (start, dtype, shape) in meta.items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        arrays[key] = buffer_np[start:start + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    node_offsets = np.concatenate([[0], np.cumsum(arrays["num_nodes"])])
+    edge_offsets = np.concatenate([[0], np.cumsum(arrays["num_edges"])])
+    graphs = []
+    for i, num_nodes in enumerate(arrays["num_nodes"]):
+        n_start, n_end = node_offsets[i], node_offsets[i + 1]
+        e_start, e_end = edge_offsets[i], edge_offsets[i + 1]
+        node_feat = arrays["node_feat"][n_start:n_end]
+        graph = {
+            "edge_index": np.ascontiguousarray(arrays["edge_index"][:, e_start:e_end]),
+            "edge_feat": arrays["edge_feat"][e_start:e_end],
+            "node_feat": node_feat if num_nodes > 0 else node_feat.reshape(-1),
+            "num_nodes": int(num_nodes),
+            "y": arrays["y"][i:i + 1],
+        }
+        for key in ("morgan", "maccs"):
+            graph[key] = arrays[key][i:i + 1] if key in arrays else None
+        graphs.append(graph)
+    return graphs
+
+def _featurize_chunk(args):
+    smiles_or_mols, properties, augmented_features, augmented_properties, cache = args
+    graphs = [
+        graph_from_smiles(
+            smiles_or_mol,
+            properties[i] if properties is not None else None,
+            augmented_features,
+            augmented_properties,
+            cache=cache,
         )
-        graph['maccs'] = add_fingerprint_feature(
-            mol,
-            'maccs' if 'maccs' in augmented_features else None,
-            getmaccsfingerprint
+        for i, smiles_or_mol in enumerate(smiles_or_mols)
+    ]
+    return _pack_graphs(graphs)
+
+def graphs_from_smiles(
+    smiles_or_mols,
+    properties=None,
+    augmented_features=None,
+    augmented_properties=None,
+    n_jobs=1,
+    chunk_size=None,
+    progress_bar=False,
+    cache=None,
+):
+    """
+    Converts a list of SMILES strings or RDKit molecules to graph dictionaries,
+    optionally using a pool of worker processes
+
+    Parameters
+    ----------
+    smiles_or_mols : List[Union[str, rdkit.Chem.rdchem.Mol]]
+        SMILES strings or RDKit molecule objects
+    properties : array-like, optional
+        Properties of each molecule, indexed in the same order as ``smiles_or_mols``
+    augmented_features : list, optional
+        List of augmented features to include
+    augmented_properties : list, optional
+        List of augmented properties to include
+    n_jobs : int, default=1
+        Number of worker processes. -1 means using all processors.
+    chunk_size : int, optional
+        Number of molecules featurized per task. Defaults to splitting the input
+        into four chunks per worker.
+    progress_bar : bool, default=False
+        Whether to display a progress bar
+    cache : Union[FeaturizationCache, bool], optional
+        Featurization cache passed to ``graph_from_smiles``
+
+    Returns
+    -------
+    List[dict]
+        Graph dictionaries in the same order as the input
+    """
+    num_samples = len(smiles_or_mols)
+    if n_jobs is None or n_jobs == 0:
+        n_jobs = 1
+    elif n_jobs < 0:
+        n_jobs = max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    n_jobs = min(n_jobs, max(1, num_samples))
+
+    if n_jobs == 1:
+        iterator = range(num_samples)
+        if progress_bar:
+            iterator = tqdm(iterator, desc="Converting molecules to graphs", total=num_samples)
+        return [
+            graph_from_smiles(
+                smiles_or_mols[i],
+                properties[i] if properties is not None else None,
+                augmented_features,
+                augmented_properties,
+                cache=cache,
+            )
+            for i in iterator
+        ]
+
+    # Resolve the shared cache here so that workers use the same one regardless of start method
+    if cache is None:
+        cache = get_featurization_cache() or False
+    if chunk_size is None:
+        chunk_size = math.ceil(num_samples / (n_jobs * 4))
+    tasks = [
+        (
+            list(smiles_or_mols[start:start + chunk_size]),
+            properties[start:start + chunk_size] if properties is not None else None,
+            augmented_features,
+            augmented_properties,
+            cache,
         )
-    else:
-        graph['morgan'] = None
-        graph['maccs'] = None
+        for start in range(0, num_samples, chunk_size)
+    ]
 
-    return graph    
-    
-    # except Exception as e:
-    #     print(f"Error: {e} during converting {smiles_or_mol} to graph")
-    #     return None
+    pbar = tqdm(desc="Converting molecules to graphs", total=num_samples) if progress_bar else None
+    graphs = []
+    with mp.Pool(processes=n_jobs) as pool:
+        # imap keeps the input order, so the output is deterministic
+        for buffer, meta in pool.imap(_featurize_chunk, tasks):
+            chunk = _unpack_graphs(buffer, meta)
+            graphs.extend(chunk)
+            if pbar is not None:
+                pbar.update(len(chunk))
+    if pbar is not None:
+        pbar.close()
+    return graphs
@@ -2,13 +2,19 @@ from rdkit import Chem, RDLogger
 
 RDLogger.DisableLog("rdApp.*")
 
+import os
 import re
+import math
 import random
 import logging
+from functools import lru_cache
 from rdkit import Chem
 from typing import List, Tuple, Optional
 random.seed(0)
+import numpy as np
 import torch
+import torch.multiprocessing as mp
+from ..molecule import to_mol
 
 bond_dict = [
     None,
@@ -20,104 +26,204 @@ bond_dict = [
 
 ATOM_VALENCY = {6: 4, 7: 3, 8: 2, 9: 1, 15: 3, 16: 2, 17: 1, 35: 1, 53: 1}
 
-def graph_to_smiles(molecule_list: List[Tuple], atom_decoder: list) -> List[Optional[str]]:
+def graph_to_smiles(
+    molecule_list: List[Tuple],
+    atom_decoder: list,
+    n_jobs: int = 1,
+    chunk_size: Optional[int] = None,
+) -> List[Optional[str]]:
+    """
+    Converts generated graphs to SMILES strings, optionally using a pool of worker processes
+
+    Parameters
+    ----------
+    molecule_list : List[Tuple]
+        Atom types of shape [num_nodes] and edge types of shape [num_nodes, num_nodes]
+        of each graph
+    atom_decoder : list
+        Atom symbol of each atom type
+    n_jobs : int, default=1
+        Number of worker processes. -1 means using all processors.
+    chunk_size : int, optional
+        Number of graphs decoded per task. Defaults to splitting the input into four
+        chunks per worker.
+
+    Returns
+    -------
+    List[Optional[str]]
+        SMILES string of the largest fragment of each graph (None if invalid), in the
+        same order as the input
+    """
+    num_samples = len(molecule_list)
+    if n_jobs is None or n_jobs == 0:
+        n_jobs = 1
+    elif n_jobs < 0:
+        n_jobs = max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    n_jobs = min(n_jobs, max(1, num_samples))
+
+    if n_jobs == 1:
+        return [_graph_to_smiles(atom_types, edge_types, atom_decoder) for atom_types, edge_types in molecule_list]
+
+    if chunk_size is None:
+        chunk_size = math.ceil(num_samples / (n_jobs * 4))
+    # numpy arrays are cheaper to send to the workers than tensors
+    tasks = [
+        (
+            [(_to_numpy(atom_types), _to_numpy(edge_types)) for atom_types, edge_types in molecule_list[start:start + chunk_size]],
+            atom_decoder,
+        )
+        for start in range(0, num_samples, chunk_size)
+    ]
     smiles_list = []
-    for index, graph in enumerate(molecule_list):
+    with mp.Pool(processes=n_jobs) as pool:
+        # imap keeps the input order
+        for chunk in pool.imap(_decode_chunk, tasks):
+            smiles_list.extend(chunk)
+    return smiles_list
+
+def _decode_chunk(args):
+    graphs, atom_decoder = args
+    return [_graph_to_smiles(atom_types, edge_types, atom_decoder) for atom_types, edge_types in graphs]
+
+def _graph_to_smiles(atom_types, edge_types, atom_decoder) -> Optional[str]:
+    mol_init = None
+    try:
+        mol_init = build_molecule_with_partial_charges(atom_types, edge_types, atom_decoder)
+
+        # Try to correct the molecule with connection=True, then False if needed
+        for connection in (True, False):
+            mol_conn, _ = correct_mol(mol_init, connection=connection)
+            if mol_conn is not None:
+                break
+        else:
+            mol_conn = mol_init  # Fallback to initial molecule
+
+        # Convert to SMILES
+        smiles = mol2smiles(mol_conn)
+        if not smiles:
+            smiles = Chem.MolToSmiles(mol_conn)
+
+        if smiles:
+            mol = get_mol(smiles)
+            if mol is not None:
+                # Get the largest fragment
+                mol_frags = Chem.rdmolops.GetMolFrags(mol, asMols=True, sanitizeFrags=False)
+                largest_mol = max(mol_frags, key=lambda m: m.GetNumAtoms())
+
+                largest_smiles = mol2smiles(largest_mol)
+                if largest_smiles and len(largest_smiles) > 1:
+                    return largest_smiles
+        return None
+
+    except Exception as e:
         try:
-            atom_types, edge_types = graph
-            mol_init = build_molecule_with_partial_charges(atom_types, edge_types, atom_decoder)
-            
-            # Try to correct the molecule with connection=True, then False if needed
-            for connection in (True, False):
-                mol_conn, _ = correct_mol(mol_init, connection=connection)
-                if mol_conn is not None:
-                    break
-            else:
-                mol_conn = mol_init  # Fallback to initial molecule
-
-            # Convert to SMILES
-            smiles = mol2smiles(mol_conn)
-            if not smiles:
-                smiles = Chem.MolToSmiles(mol_conn)
-
-            if smiles:
-                mol = get_mol(smiles)
-                if mol is not None:
-                    # Get the largest fragment
-                    mol_frags = Chem.rdmolops.GetMolFrags(mol, asMols=True, sanitizeFrags=False)
-                    largest_mol = max(mol_frags, key=lambda m: m.GetNumAtoms())
-                    
-                    largest_smiles = mol2smiles(largest_mol)
-                    if largest_smiles and len(largest_smiles) > 1:
-                        smiles_list.append(largest_smiles)
-                    else:
-                        smiles_list.append(None)
-                else:
-                    smiles_list.append(None)
-            else:
-                smiles_list.append(None)
+            # Fallback to RDKit's MolToSmiles if everything else fails
+            fallback_smiles = Chem.MolToSmiles(mol_init)
+            return fallback_smiles if fallback_smiles else None
+        except Exception as e2:
+            return None
 
-        except Exception as e:
-            try:
-                # Fallback to RDKit's MolToSmiles if everything else fails
-                fallback_smiles = Chem.MolToSmiles(mol_init)
-                if fallback_smiles:
-                    smiles_list.append(fallback_smiles)
-                else:
-                    smiles_list.append(None)
-            except Exception as e2:
-                smiles_list.append(None)
+# valence contributed by each edge type to both of its atoms
+BOND_VALENCE = np.array([0.0, 1.0, 2.0, 3.0, 1.5])
 
-    return smiles_list
+@lru_cache(maxsize=None)
+def _max_valence(atomic_num):
+    """Largest valence RDKit permits for an uncharged atom (inf if unrestricted)."""
+    valences = list(Chem.GetPeriodicTable().GetValenceList(atomic_num))
+    if -1 in valences:
+        return math.inf
+    return max(valences)
+
+def _to_numpy(array):
+    if isinstance(array, torch.Tensor):
+        return array.detach().cpu().numpy()
+    return np.asarray(array)
 
 def build_molecule_with_partial_charges(atom_types, edge_types, atom_decoder, verbose=False):
+    """Build an RDKit molecule from atom and edge types, charging over-valent N, O and S atoms.
+
+    Bonds are added in row-major order of the upper triangle of ``edge_types``. When a
+    bond makes an N, O or S atom exceed its default valence by one, the atom gets a
+    formal charge of +1 (e.g. [N+], [O+], [S+]).
+
+    The valence of each atom is tracked while bonds are added, so that the molecule is
+    only sanitized with ``check_valency`` when a bond may have made an atom over-valent
+    (and after each charge adjustment), instead of after every bond. The result is the
+    same as sanitizing after every bond.
+
+    Parameters
+    ----------
+    atom_types : Union[torch.Tensor, np.ndarray]
+        Atom type of each node, of shape [num_nodes]
+    edge_types : Union[torch.Tensor, np.ndarray]
+        Edge type of each pair of nodes, of shape [num_nodes, num_nodes]
+    atom_decoder : list
+        Atom symbol of each atom type
+    verbose : bool, default=False
+        Whether to print the construction steps
+
+    Returns
+    -------
+    rdkit.Chem.RWMol
+        Molecule, which may still contain invalid valences
+    """
     if verbose:
         print("\nbuilding new molecule")
 
+    atom_types = _to_numpy(atom_types).astype(np.int64).reshape(-1)
+    edge_types = np.triu(_to_numpy(edge_types).astype(np.int64), k=1)
+
     mol = Chem.RWMol()
-    for atom in atom_types:
-        a = Chem.Atom(atom_decoder[atom.item()])
+    max_valence = np.empty(len(atom_types))
+    for i, atom in enumerate(atom_types.tolist()):
+        a = Chem.Atom(atom_decoder[atom])
         mol.AddAtom(a)
+        max_valence[i] = _max_valence(a.GetAtomicNum())
         if verbose:
-            print("Atom added: ", atom.item(), atom_decoder[atom.item()])
-
-    edge_types = torch.triu(edge_types)
-    all_bonds = torch.nonzero(edge_types)
-
-    for i, bond in enumerate(all_bonds):
-        if bond[0].item() != bond[1].item():
-            mol.AddBond(
-                bond[0].item(),
-                bond[1].item(),
-                bond_dict[edge_types[bond[0], bond[1]].item()],
-            )
-            if verbose:
-                print(
-                    "bond added:",
-                    bond[0].item(),
-                    bond[1].item(),
-                    edge_types[bond[0], bond[1]].item(),
-                    bond_dict[edge_types[bond[0], bond[1]].item()],
-                )
-            # add formal charge to atom: e.g. [O+], [N+], [S+]
-            # not support [O-], [N-], [S-], [NH+] etc.
-            flag, atomid_valence = check_valency(mol)
+            print("Atom added: ", atom, atom_decoder[atom])
+
+    valence = np.zeros(len(atom_types))
+    # the lowest over-valent atom that cannot be charged: sanitization reports the
+    # first over-valent atom, so atoms after it are never charged
+    blocked = len(atom_types)
+    # whether the molecule may still be invalid after the last sanitization
+    pending = False
+    rows, cols = np.nonzero(edge_types)
+    for begin, end, bond_type in zip(rows.tolist(), cols.tolist(), edge_types[rows, cols].tolist()):
+        mol.AddBond(begin, end, bond_dict[bond_type])
+        if verbose:
+            print("bond added:", begin, end, bond_type, bond_dict[bond_type])
+        valence[begin] += BOND_VALENCE[bond_type]
+        valence[end] += BOND_VALENCE[bond_type]
+        over_valent = (
+            (begin < blocked and math.ceil(valence[begin]) > max_valence[begin])
+            or (end < blocked and math.ceil(valence[end]) > max_valence[end])
+        )
+        if not (over_valent or pending):
+            continue
+
+        flag, atomid_valence = check_valency(mol)
+        if verbose:
+            print("flag, valence", flag, atomid_valence)
+        pending = False
+        if flag:
+            continue
+        if len(atomid_valence) == 2:
+            idx = atomid_valence[0]
+            v = atomid_valence[1]
+            an = mol.GetAtomWithIdx(idx).GetAtomicNum()
             if verbose:
-                print("flag, valence", flag, atomid_valence)
-            if flag:
-                continue
+                print("atomic num of atom with a large valence", an)
+            if an in (7, 8, 16) and (v - ATOM_VALENCY[an]) == 1:
+                mol.GetAtomWithIdx(idx).SetFormalCharge(1)
+                # any further bond to the charged atom may exceed its valence,
+                # and another atom may still be over-valent
+                max_valence[idx] = valence[idx]
+                pending = True
             else:
-                if len(atomid_valence) == 2:
-                    idx = atomid_valence[0]
-                    v = atomid_valence[1]
-                    an = mol.GetAtomWithIdx(idx).GetAtomicNum()
-                    if verbose:
-                        print("atomic num of atom with a large valence", an)
-                    if an in (7, 8, 16) and (v - ATOM_VALENCY[an]) == 1:
-                        mol.GetAtomWithIdx(idx).SetFormalCharge(1)
-                        # print("Formal charge added")
-                else:
-                    continue
+                blocked = min(blocked, idx)
+        else:
+            pending = True
     return mol
 
 
@@ -185,7 +291,7 @@ def get_mol(smiles_or_mol):
     if isinstance(smiles_or_mol, str):
         if len(smiles_or_mol) == 0:
             return None
-        mol = Chem.MolFromSmiles(smiles_or_mol)
+        mol = to_mol(smiles_or_mol)
         if mol is None:
             return None
         try:
@@ -0,0 +1,501 @@
+import os
+import json
+import numpy as np
+from typing import Optional, List, Union
+
+import torch
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+from torch_geometric.data import Data, Batch
+
+from .graph_from_smiles import graphs_from_smiles, featurization_cached
+from .features import get_atom_feature_dims, get_bond_feature_dims
+
+# Compact on-disk dtypes; arrays are cast to the dtypes of graph_from_smiles when batched
+_ARRAY_DTYPES = {
+    "node_feat": np.uint8,
+    "edge_index": np.int32,
+    "edge_feat": np.uint8,
+    "node_ptr": np.int64,
+    "edge_ptr": np.int64,
+    "y": np.float32,
+    "morgan": np.uint8,
+    "maccs": np.uint8,
+}
+
+def _identity_collate(batch):
+    return batch
+
+def _gather_ranges(ptr, indices):
+    """Return the flat positions covered by the CSR ranges ``ptr[i]:ptr[i + 1]`` of ``indices``, and their sizes."""
+    starts = ptr[indices]
+    counts = ptr[indices + 1] - starts
+    total = int(counts.sum())
+    offsets = np.cumsum(counts) - counts
+    positions = np.repeat(starts - offsets, counts) + np.arange(total, dtype=np.int64)
+    return positions, counts
+
+def _make_batch(arrays, y, augmented_features):
+    """Build a PyG batch from arrays gathered by ``PackedGraphDataset._gather``."""
+    node_counts, edge_counts = arrays["node_counts"], arrays["edge_counts"]
+    ptr = np.concatenate([[0], np.cumsum(node_counts)])
+
+    # Shift per-molecule node numbering to positions within the batch
+    edge_index = np.asarray(arrays["edge_index"], dtype=np.int64) + np.repeat(ptr[:-1], edge_counts)
+    batch = Batch(
+        x=torch.from_numpy(np.asarray(arrays["node_feat"], dtype=np.int64).reshape(-1, len(get_atom_feature_dims()))),
+        edge_index=torch.from_numpy(edge_index),
+        edge_attr=torch.from_numpy(np.asarray(arrays["edge_feat"], dtype=np.int64).reshape(-1, len(get_bond_feature_dims()))),
+        y=torch.from_numpy(np.asarray(y, dtype=np.float32)),
+        batch=torch.from_numpy(np.repeat(np.arange(len(node_counts), dtype=np.int64), node_counts)),
+        ptr=torch.from_numpy(ptr.astype(np.int64)),
+    )
+    for key in augmented_features:
+        batch[key] = torch.from_numpy(np.asarray(arrays[key], dtype=np.uint8))
+    batch._num_graphs = len(node_counts)
+    return batch
+
+class PackedGraphDataset(Dataset):
+    """Columnar molecular graph dataset.
+
+    Node features, edge features and edge indices of all molecules are concatenated
+    into single arrays, and ``node_ptr``/``edge_ptr`` offset arrays (CSR layout) locate
+    the rows of each molecule. Compared with a list of ``torch_geometric.data.Data``
+    objects this avoids per-molecule Python objects, and the arrays can be saved as
+    ``.npy`` files and memory-mapped back.
+
+    A packed dataset can be passed in place of SMILES lists to ``fit`` and ``predict``
+    of ``GNNMolecularPredictor`` and its subclasses. Indexing with an integer returns
+    a ``Data`` object; indexing with a list of indices returns a collated ``Batch``.
+
+    Parameters
+    ----------
+    node_feat : np.ndarray
+        Concatenated node features of shape [num_total_nodes, num_atom_features]
+    edge_index : np.ndarray
+        Concatenated edge indices of shape [2, num_total_edges], numbered within each molecule
+    edge_feat : np.ndarray
+        Concatenated edge features of shape [num_total_edges, num_bond_features]
+    node_ptr : np.ndarray
+        Offsets of shape [num_graphs + 1] into the node arrays
+    edge_ptr : np.ndarray
+        Offsets of shape [num_graphs + 1] into the edge arrays
+    y : np.ndarray
+        Targets of shape [num_graphs, num_targets]
+    morgan : np.ndarray, optional
+        Bit-packed Morgan fingerprints of shape [num_graphs, 128]
+    maccs : np.ndarray, optional
+        Bit-packed MACCS fingerprints of shape [num_graphs, 21]
+    """
+    def __init__(
+        self,
+        node_feat: np.ndarray,
+        edge_index: np.ndarray,
+        edge_feat: np.ndarray,
+        node_ptr: np.ndarray,
+        edge_ptr: np.ndarray,
+        y: np.ndarray,
+        morgan: Optional[np.ndarray] = None,
+        maccs: Optional[np.ndarray] = None,
+    ):
+        self.node_feat = node_feat
+        self.edge_index = edge_index
+        self.edge_feat = edge_feat
+        self.node_ptr = node_ptr
+        self.edge_ptr = edge_ptr
+        self.y = y
+        self.morgan = morgan
+        self.maccs = maccs
+        self.path = None # set when memory-mapped from disk
+
+        if len(self.node_ptr) != len(self.edge_ptr) or len(self.y) != len(self.node_ptr) - 1:
+            raise ValueError("node_ptr, edge_ptr and y must describe the same number of graphs.")
+
+    @classmethod
+    def from_smiles(
+        cls,
+        X: List[Union[str, "Chem.Mol"]],
+        y: Optional[Union[List, np.ndarray]] = None,
+        augmented_features: Optional[List[str]] = None,
+        n_jobs: int = 1,
+        chunk_size: int = 10000,
+        progress_bar: bool = False,
+    ) -> "PackedGraphDataset":
+        """Featurize molecules into a packed dataset.
+
+        Parameters
+        ----------
+        X : List[Union[str, Chem.Mol]]
+            SMILES strings or RDKit molecules. SMILES strings are validated, except those
+            whose featurization is already cached.
+        y : Optional[Union[List, np.ndarray]], default=None
+            Targets with one row per molecule
+        augmented_features : Optional[List[str]], default=None
+            Fingerprints to store alongside the graphs (e.g. ["morgan", "maccs"])
+        n_jobs : int, default=1
+            Number of processes used for featurization
+        chunk_size : int, default=10000
+            Number of molecules featurized before being packed, which bounds the
+            number of intermediate per-molecule arrays held in memory
+        progress_bar : bool, default=False
+            Whether to display a progress bar
+
+        Returns
+        -------
+        PackedGraphDataset
+            The packed dataset
+        """
+        from ..checker import MolecularInputChecker
+
+        if y is not None:
+            y = np.asarray(y, dtype=np.float32)
+            if y.ndim == 1:
+                y = y.reshape(-1, 1)
+            if len(y) != len(X):
+                raise ValueError(f"Number of samples in y ({len(y)}) must match length of X ({len(X)}).")
+
+        columns = {key: [] for key in _ARRAY_DTYPES if key not in ("node_ptr", "edge_ptr")}
+        num_nodes, num_edges = [], []
+        for start in range(0, len(X), chunk_size):
+            X_chunk = X[start:start + chunk_size]
+            if any(isinstance(item, str) for item in X_chunk):
+                X_chunk = list(X_chunk)
+                X_chunk, valid, _ = MolecularInputChecker.validate_smiles_batch(
+                    X_chunk, featurization_cached(X_chunk, augmented_features)
+                )
+                if not valid.all():
+                    invalid_idx = start + np.flatnonzero(~valid)
+                    raise ValueError(f"Invalid molecules found at indices {invalid_idx[:10].tolist()}.")
+            y_chunk = y[start:start + chunk_size] if y is not None else None
+            graphs = graphs_from_smiles(
+                X_chunk, y_chunk, augmented_features, n_jobs=n_jobs, progress_bar=progress_bar
+            )
+            for graph in graphs:
+                num_nodes.append(graph["num_nodes"])
+                num_edges.append(graph["edge_index"].shape[1])
+            columns["node_feat"].append(np.concatenate(
+                [graph["node_feat"].reshape(-1, len(get_atom_feature_dims())) for graph in graphs]
+            ).astype(_ARRAY_DTYPES["node_feat"]))
+            columns["edge_index"].append(np.concatenate(
+                [graph["edge_index"] for graph in graphs], axis=1
+            ).astype(_ARRAY_DTYPES["edge_index"]))
+            columns["edge_feat"].append(np.concatenate(
+                [graph["edge_feat"] for graph in graphs]
+            ).astype(_ARRAY_DTYPES["edge_feat"]))
+            columns["y"].append(np.concatenate([graph["y"] for graph in graphs]))
+            for key in ("morgan", "maccs"):
+                if graphs and graphs[0][key] is not None:
+                    columns[key].append(np.concatenate([graph[key] for graph in graphs]))
+
+        if not num_nodes:
+            raise ValueError("X must contain at least one molecule.")
+        return cls(
+            node_feat=np.concatenate(columns["node_feat"]),
+            edge_index=np.concatenate(columns["edge_index"], axis=1),
+            edge_feat=np.concatenate(columns["edge_feat"]),
+            node_ptr=np.concatenate([[0], np.cumsum(num_nodes)]).astype(np.int64),
+            edge_ptr=np.concatenate([[0], np.cumsum(num_edges)]).astype(np.int64),
+            y=np.concatenate(columns["y"]),
+            morgan=np.concatenate(columns["morgan"]) if columns["morgan"] else None,
+            maccs=np.concatenate(columns["maccs"]) if columns["maccs"] else None,
+        )
+
+    def save(self, path: str) -> None:
+        """Save the dataset as a directory of ``.npy`` files that can be memory-mapped.
+
+        Parameters
+        ----------
+        path : str
+            Directory to write the arrays into
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = self._arrays()
+        for key, array in arrays.items():
+            np.save(os.path.join(path, f"{key}.npy"), np.asarray(array, dtype=_ARRAY_DTYPES[key]))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"num_graphs": len(self), "arrays": sorted(arrays)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "PackedGraphDataset":
+        """Load a dataset written by ``save``.
+
+        Parameters
+        ----------
+        path : str
+            Directory containing the arrays
+        mmap : bool, default=True
+            Whether to memory-map the arrays instead of reading them into memory
+
+        Returns
+        -------
+        PackedGraphDataset
+            The loaded dataset
+        """
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No packed graph dataset found at '{path}'.")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode=mmap_mode)
+            for key in meta["arrays"]
+        }
+        dataset = cls(**arrays)
+        if mmap:
+            dataset.path = os.path.abspath(path)
+        return dataset
+
+    def _arrays(self):
+        arrays = {
+            "node_feat": self.node_feat,
+            "edge_index": self.edge_index,
+            "edge_feat": self.edge_feat,
+            "node_ptr": self.node_ptr,
+            "edge_ptr": self.edge_ptr,
+            "y": self.y,
+        }
+        for key in ("morgan", "maccs"):
+            if getattr(self, key) is not None:
+                arrays[key] = getattr(self, key)
+        return arrays
+
+    def __getstate__(self):
+        # Memory-mapped datasets are reopened from disk instead of pickling the arrays,
+        # which keeps DataLoader worker startup cheap.
+        if self.path is not None:
+            return {"path": self.path, "y": self.y}
+        return self.__dict__.copy()
+
+    def __setstate__(self, state):
+        if "node_feat" not in state:
+            loaded = PackedGraphDataset.load(state["path"], mmap=True)
+            self.__dict__.update(loaded.__dict__)
+            self.y = state["y"]
+        else:
+            self.__dict__.update(state)
+
+    @property
+    def num_nodes(self) -> np.ndarray:
+        """Number of nodes of each graph."""
+        return np.diff(self.node_ptr)
+
+    @property
+    def augmented_features(self) -> List[str]:
+        """Fingerprints stored in the dataset."""
+        return [key for key in ("morgan", "maccs") if getattr(self, key) is not None]
+
+    def with_targets(self, y: Union[List, np.ndarray]) -> "PackedGraphDataset":
+        """Return a dataset sharing the graph arrays with the targets replaced by ``y``."""
+        y = np.asarray(y, dtype=np.float32)
+        if y.ndim == 1:
+            y = y.reshape(-1, 1)
+        if len(y) != len(self):
+            raise ValueError(f"Number of samples in y ({len(y)}) must match the dataset size ({len(self)}).")
+        dataset = PackedGraphDataset.__new__(PackedGraphDataset)
+        dataset.__dict__.update(self.__dict__)
+        dataset.y = y
+        return dataset
+
+    def __len__(self) -> int:
+        return len(self.node_ptr) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            if idx < 0:
+                idx += len(self)
+            if not 0 <= idx < len(self):
+                raise IndexError(f"Index {idx} is out of range for a dataset of {len(self)} graphs.")
+            return self._get_graph(int(idx))
+        return self.collate(idx)
+
+    def _get_graph(self, idx: int) -> Data:
+        n_start, n_end = self.node_ptr[idx], self.node_ptr[idx + 1]
+        e_start, e_end = self.edge_ptr[idx], self.edge_ptr[idx + 1]
+        g = Data()
+        g.num_nodes = int(n_end - n_start)
+        g.edge_index = torch.from_numpy(np.asarray(self.edge_index[:, e_start:e_end], dtype=np.int64))
+        g.edge_attr = torch.from_numpy(np.asarray(self.edge_feat[e_start:e_end], dtype=np.int64))
+        g.x = torch.from_numpy(np.asarray(self.node_feat[n_start:n_end], dtype=np.int64))
+        g.y = torch.from_numpy(np.asarray(self.y[idx:idx + 1], dtype=np.float32))
+        for key in self.augmented_features:
+            g[key] = torch.from_numpy(np.asarray(getattr(self, key)[idx:idx + 1], dtype=np.uint8))
+        return g
+
+    def _gather(self, indices: np.ndarray) -> dict:
+        """Gather the rows of ``indices``, with edge indices still numbered within each molecule."""
+        node_pos, node_counts = _gather_ranges(self.node_ptr, indices)
+        edge_pos, edge_counts = _gather_ranges(self.edge_ptr, indices)
+
+        # Contiguous ranges (e.g. sequential inference) are sliced without a gather
+        if len(indices) > 0 and np.all(np.diff(indices) == 1):
+            node_feat = self.node_feat[node_pos[0]:node_pos[-1] + 1] if len(node_pos) else self.node_feat[:0]
+            edge_index = self.edge_index[:, edge_pos[0]:edge_pos[-1] + 1] if len(edge_pos) else self.edge_index[:, :0]
+            edge_feat = self.edge_feat[edge_pos[0]:edge_pos[-1] + 1] if len(edge_pos) else self.edge_feat[:0]
+        else:
+            node_feat = self.node_feat[node_pos]
+            edge_index = self.edge_index[:, edge_pos]
+            edge_feat = self.edge_feat[edge_pos]
+
+        arrays = {
+            "node_feat": node_feat,
+            "edge_index": edge_index,
+            "edge_feat": edge_feat,
+            "node_counts": node_counts,
+            "edge_counts": edge_counts,
+        }
+        for key in self.augmented_features:
+            arrays[key] = getattr(self, key)[indices]
+        return arrays
+
+    def collate(self, indices) -> Batch:
+        """Build a PyG batch for ``indices`` directly from the packed arrays.
+
+        Parameters
+        ----------
+        indices : array-like
+            Indices of the graphs in the batch
+
+        Returns
+        -------
+        Batch
+            Batch with the same attributes as collating the corresponding ``Data`` objects
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        return _make_batch(self._gather(indices), self.y[indices], self.augmented_features)
+
+    def loader(self, batch_size: int, shuffle: bool = False, batch_sampler=None, **kwargs) -> DataLoader:
+        """Return a DataLoader yielding batches collated directly from the packed arrays.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of graphs per batch
+        shuffle : bool, default=False
+            Whether to shuffle the graphs every epoch
+        batch_sampler : Sampler, optional
+            Sampler yielding lists of indices, e.g. a ``BucketBatchSampler`` built from
+            ``num_nodes``. If given, ``batch_size`` and ``shuffle`` are ignored.
+        **kwargs
+            Additional arguments passed to ``torch.utils.data.DataLoader``
+
+        Returns
+        -------
+        DataLoader
+            Loader over ``Batch`` objects
+        """
+        if batch_sampler is None:
+            sampler = RandomSampler(self) if shuffle else SequentialSampler(self)
+            batch_sampler = BatchSampler(sampler, batch_size=batch_size, drop_last=False)
+        return DataLoader(
+            self,
+            sampler=batch_sampler,
+            batch_size=None,
+            collate_fn=_identity_collate,
+            **kwargs,
+        )
+
+class _ConcatPackedGraphDataset(Dataset):
+    """Concatenation of packed datasets that reads graphs from the original arrays.
+
+    Graph arrays are not copied, so memory-mapped datasets stay on disk. Only the
+    targets are concatenated, so that ``with_targets`` can replace them. The view
+    supports the indexing, ``collate`` and ``loader`` interface of ``PackedGraphDataset``
+    for training internals such as the SGIR pseudo-label pool; estimators do not accept
+    it as input.
+
+    Parameters
+    ----------
+    datasets : List[PackedGraphDataset]
+        Datasets storing the same augmented features and number of targets
+    """
+    def __init__(self, datasets: List[PackedGraphDataset]):
+        if not datasets:
+            raise ValueError("datasets must contain at least one dataset.")
+        features = datasets[0].augmented_features
+        if any(dataset.augmented_features != features for dataset in datasets):
+            raise ValueError("All datasets must store the same augmented features.")
+        if len({dataset.y.shape[1] for dataset in datasets}) > 1:
+            raise ValueError("All datasets must have the same number of targets.")
+        self.datasets = list(datasets)
+        self.offsets = np.concatenate([[0], np.cumsum([len(dataset) for dataset in datasets])]).astype(np.int64)
+        self.y = np.concatenate([np.asarray(dataset.y, dtype=np.float32) for dataset in datasets])
+
+    @property
+    def num_nodes(self) -> np.ndarray:
+        """Number of nodes of each graph."""
+        return np.concatenate([dataset.num_nodes for dataset in self.datasets])
+
+    @property
+    def augmented_features(self) -> List[str]:
+        """Fingerprints stored in the datasets."""
+        return self.datasets[0].augmented_features
+
+    def with_targets(self, y: Union[List, np.ndarray]) -> "_ConcatPackedGraphDataset":
+        """Return a view over the same datasets with the targets replaced by ``y``."""
+        y = np.asarray(y, dtype=np.float32)
+        if y.ndim == 1:
+            y = y.reshape(-1, 1)
+        if len(y) != len(self):
+            raise ValueError(f"Number of samples in y ({len(y)}) must match the dataset size ({len(self)}).")
+        dataset = _ConcatPackedGraphDataset.__new__(_ConcatPackedGraphDataset)
+        dataset.__dict__.update(self.__dict__)
+        dataset.y = y
+        return dataset
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            if idx < 0:
+                idx += len(self)
+            if not 0 <= idx < len(self):
+                raise IndexError(f"Index {idx} is out of range for a dataset of {len(self)} graphs.")
+            part = int(np.searchsorted(self.offsets, idx, side="right")) - 1
+            g = self.datasets[part]._get_graph(int(idx - self.offsets[part]))
+            g.y = torch.from_numpy(np.asarray(self.y[idx:idx + 1], dtype=np.float32))
+            return g
+        return self.collate(idx)
+
+    def collate(self, indices) -> Batch:
+        """Build a PyG batch for ``indices``, in order, from the arrays of the datasets.
+
+        Parameters
+        ----------
+        indices : array-like
+            Indices of the graphs in the batch
+
+        Returns
+        -------
+        Batch
+            Batch with the same attributes as collating the corresponding ``Data`` objects
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        part = np.searchsorted(self.offsets, indices, side="right") - 1
+        order = np.argsort(part, kind="stable")
+        pieces = [
+            self.datasets[i]._gather(indices[order][part[order] == i] - self.offsets[i])
+            for i in np.unique(part)
+        ]
+        if len(pieces) == 1:
+            arrays = pieces[0]
+        else:
+            arrays = {
+                key: np.concatenate([piece[key] for piece in pieces], axis=1 if key == "edge_index" else 0)
+                for key in pieces[0]
+            }
+            # graphs are grouped by dataset; gather them back into the order of indices
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            node_ptr = np.concatenate([[0], np.cumsum(arrays["node_counts"])])
+            edge_ptr = np.concatenate([[0], np.cumsum(arrays["edge_counts"])])
+            node_pos, arrays["node_counts"] = _gather_ranges(node_ptr, inverse)
+            edge_pos, arrays["edge_counts"] = _gather_ranges(edge_ptr, inverse)
+            arrays["node_feat"] = arrays["node_feat"][node_pos]
+            arrays["edge_index"] = arrays["edge_index"][:, edge_pos]
+            arrays["edge_feat"] = arrays["edge_feat"][edge_pos]
+            for key in self.augmented_features:
+                arrays[key] = arrays[key][inverse]
+        return _make_batch(arrays, self.y[indices], self.augmented_features)
+
+    loader = PackedGraphDataset.loader
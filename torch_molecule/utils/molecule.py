@@ -0,0 +1,74 @@
+from typing import Optional, Union
+from rdkit import Chem
+
+class MoleculeHandle(str):
+    """SMILES string that carries its parsed RDKit molecule.
+
+    The handle behaves as a plain SMILES string (tokenizers, string checks and
+    dictionaries work unchanged), but the ``Chem.Mol`` is parsed at most once and
+    cached, so code receiving the handle can use ``mol`` instead of parsing the
+    SMILES again. The canonical SMILES is computed lazily and cached as well.
+
+    Parameters
+    ----------
+    smiles : str
+        SMILES string of the molecule
+    mol : Chem.Mol, optional
+        Already parsed molecule for ``smiles``. If None, it is parsed on first access.
+    """
+    def __new__(cls, smiles: str, mol: Optional[Chem.Mol] = None):
+        handle = super().__new__(cls, smiles)
+        handle._mol = mol
+        handle._canonical_smiles = None
+        return handle
+
+    @property
+    def smiles(self) -> str:
+        """The SMILES string as a plain ``str``."""
+        return str.__str__(self)
+
+    @property
+    def mol(self) -> Optional[Chem.Mol]:
+        """The RDKit molecule, parsed on first access. None if the SMILES is invalid."""
+        if self._mol is None:
+            self._mol = Chem.MolFromSmiles(self.smiles)
+        return self._mol
+
+    @property
+    def canonical_smiles(self) -> Optional[str]:
+        """The canonical SMILES computed from ``mol``. None if the SMILES is invalid."""
+        if self._canonical_smiles is None and self.mol is not None:
+            self._canonical_smiles = Chem.MolToSmiles(self.mol)
+        return self._canonical_smiles
+
+    def __reduce__(self):
+        # The molecule is pickled as well, so worker processes do not parse it again
+        return (MoleculeHandle, (self.smiles, self._mol))
+
+def to_mol(smiles_or_mol: Union[str, MoleculeHandle, Chem.Mol]) -> Optional[Chem.Mol]:
+    """Return the RDKit molecule of a SMILES string, a handle or a molecule.
+
+    Handles reuse their cached molecule; plain SMILES strings are parsed.
+
+    Parameters
+    ----------
+    smiles_or_mol : Union[str, MoleculeHandle, Chem.Mol]
+        Molecule to convert
+
+    Returns
+    -------
+    Optional[Chem.Mol]
+        The RDKit molecule, or None if the SMILES string is invalid
+    """
+    if isinstance(smiles_or_mol, MoleculeHandle):
+        return smiles_or_mol.mol
+    if isinstance(smiles_or_mol, str):
+        return Chem.MolFromSmiles(smiles_or_mol)
+    return smiles_or_mol
+
+def to_canonical_smiles(smiles_or_mol: Union[str, MoleculeHandle, Chem.Mol]) -> Optional[str]:
+    """Return the canonical SMILES of a SMILES string, a handle or a molecule."""
+    if isinstance(smiles_or_mol, MoleculeHandle):
+        return smiles_or_mol.canonical_smiles
+    mol = to_mol(smiles_or_mol)
+    return Chem.MolToSmiles(mol) if mol is not None else None